@@ -1,11 +1,23 @@
-from flask import Flask, jsonify, render_template_string
+import chess_boot  # first, so boot timing covers the Flask import
+
+with chess_boot.phase('import_flask'):
+    from flask import Flask, jsonify, render_template_string
 import os
+import chess_metrics
+import chess_profiler
 
 app = Flask(__name__)
 
+# Request latency/count metrics, served at /api/metrics
+chess_metrics.init_app(app)
+
+# Opt-in request profiling report, served at /api/admin/profile
+chess_profiler.init_app(app)
+
 # Import chess web interface
 try:
-    from chess_web import add_chess_routes
+    with chess_boot.phase('import_chess'):
+        from chess_web import add_chess_routes
     add_chess_routes(app)
     CHESS_AVAILABLE = True
 except ImportError as e:
@@ -55,6 +67,10 @@ HOME_TEMPLATE = """
             <h3>GET /api/status</h3>
             <p>Server status information</p>
         </div>
+        <div class="endpoint">
+            <h3>GET /api/metrics</h3>
+            <p>Prometheus metrics (request latency, counts, errors, rules engine timers)</p>
+        </div>
         <div class="endpoint">
             <h3>GET /api/info</h3>
             <p>Application information</p>
@@ -68,6 +84,15 @@ HOME_TEMPLATE = """
 </html>
 """
 
+@app.before_request
+def track_first_request():
+    chess_boot.first_request_started()
+
+@app.after_request
+def track_first_response(response):
+    chess_boot.first_request_finished()
+    return response
+
 @app.route('/')
 def home():
     """Home page"""
@@ -93,7 +118,8 @@ def status():
             'region': 'us-central1',
             'url': 'https://testflaskserver2-1010928307866.us-central1.run.app'
         },
-        'environment': os.environ.get('FLASK_ENV', 'development')
+        'environment': os.environ.get('FLASK_ENV', 'development'),
+        'boot': chess_boot.report()
     })
 
 @app.route('/api/info')
@@ -121,7 +147,8 @@ def not_found(error):
             '/',
             '/api/health',
             '/api/status',
-            '/api/info'
+            '/api/info',
+            '/api/metrics'
         ]
     }), 404
 
@@ -133,6 +160,8 @@ def internal_error(error):
         'message': 'Something went wrong on the server'
     }), 500
 
+chess_boot.mark_ready()
+
 if __name__ == '__main__':
     # Get port from environment variable or default to 5000 for local development
     # Cloud Run uses PORT environment variable
@@ -0,0 +1,363 @@
+"""
+Chess Analysis
+Move hints from a small alpha-beta search, computed off the UI thread
+
+AnalysisWorker runs the search in a separate process, so the GUI frame loop
+and the console prompt never wait for it (or for the GIL). Each submitted
+position supersedes the previous one: the search polls a shared generation
+counter and abandons stale work, and every result carries the key of the
+position it was computed for, so late answers are simply dropped:
+    
+    worker = AnalysisWorker()
+    worker.submit(game.snapshot)
+    ...
+    for result in worker.poll():    # in the event loop; never blocks
+        print(result.best_move_uci, result.score, result.depth)
+"""
+
+import copy
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from chess_game import (ChessBoard, Color, Position, PieceType, PIECE_VALUES, BLACK_FLAG, TYPE_MASK,
+                        PAWN_CODE, HISTORY_LIMIT)
+from chess_mechanics import ChessGame, GameState
+from chess_notation import board_to_fen, game_from_fen, move_to_uci
+from chess_tables import SQUARES
+
+# Score of a side that is checkmated; mates found sooner score further
+# from zero
+MATE_SCORE = 100000
+
+DEFAULT_DEPTH = 3
+
+# Killer moves remembered per search depth
+KILLERS_PER_DEPTH = 2
+
+# (from square index, to square index)
+Move = Tuple[int, int]
+
+class SearchCancelled(Exception):
+    """Raised inside a search whose result is no longer wanted"""
+
+def evaluate(board: ChessBoard) -> int:
+    """Material balance in centipawns from the side to move's point of view"""
+    score = 0
+    for code in board.squares:
+        if code:
+            value = PIECE_VALUES[code & TYPE_MASK]
+            score += -value if code & BLACK_FLAG else value
+    return score if board.current_player == Color.WHITE else -score
+
+def legal_move_list(board: ChessBoard) -> List[Move]:
+    """Legal moves of the side to move, captures first"""
+    squares = board.squares
+    moves = [
+        (from_index, target.row * 8 + target.col)
+        for from_index, targets in board.legal_moves().items()
+        for target in targets
+    ]
+    moves.sort(key=lambda move: -PIECE_VALUES[squares[move[1]] & TYPE_MASK] if squares[move[1]] else 0)
+    return moves
+
+class MoveOrdering:
+    """Killer moves and history scores learned from earlier searches
+    
+    A quiet move that causes a beta cutoff becomes a killer at its depth
+    and gains depth squared history, raising its rank in the
+    ChessBoard.ordered_moves() calls of this and later searches. Keep one
+    instance per game to carry what was learned from query to query.
+    """
+    __slots__ = ('killers', 'history')
+    
+    def __init__(self):
+        self.killers: Dict[int, List[Move]] = {}
+        # Indexed by from square * 64 + to square
+        self.history = [0] * 4096
+    
+    def moves(self, board: ChessBoard, depth: int) -> List[Move]:
+        """Legal moves of the side to move in search order
+        
+        Checks and losing exchanges only change the order where the replies
+        are searched too: one ply from the horizon a check is no better than
+        any quiet move, and no recapture can refute a capture.
+        """
+        return [(from_index, to_index) for from_index, to_index, _ in
+                board.ordered_moves(self.killers.get(depth, ()), self.history, depth > 1)]
+    
+    def record_cutoff(self, board: ChessBoard, move: Move, depth: int):
+        """Learn from a move that refuted the position at depth"""
+        from_index, to_index = move
+        if board.squares[to_index]:
+            # Captures already come first, by MVV-LVA
+            return
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS_PER_DEPTH:]
+        history = self.history
+        index = from_index * 64 + to_index
+        history[index] += depth * depth
+        if history[index] > HISTORY_LIMIT:
+            # Age every score so newer cutoffs can still change the order
+            history[:] = [score // 2 for score in history]
+
+def search(game: ChessGame, depth: int, should_stop: Callable[[], bool] = lambda: False,
+           alpha: int = -MATE_SCORE - 1, beta: int = MATE_SCORE + 1,
+           ordering: Optional[MoveOrdering] = None) -> Tuple[int, Optional[Move], int]:
+    """Negamax alpha-beta search to depth plies
+    
+    Returns (score for the side to move, best move, nodes searched).
+    should_stop is polled at every node; SearchCancelled is raised when it
+    returns True. Moves are searched in the order of ordering (a fresh
+    MoveOrdering if None), which learns from the search's cutoffs.
+    
+    The moves are made and taken back on one copy of the board, so game is
+    left untouched even when the search is cancelled.
+    """
+    if should_stop():
+        raise SearchCancelled()
+    if game.game_state == GameState.CHECKMATE:
+        return -MATE_SCORE - depth, None, 1
+    if game.game_state in (GameState.STALEMATE, GameState.DRAW):
+        return 0, None, 1
+    return _search(copy.deepcopy(game.board), depth, should_stop, alpha, beta,
+                   ordering or MoveOrdering())
+
+def _search(board: ChessBoard, depth: int, should_stop: Callable[[], bool], alpha: int, beta: int,
+            ordering: MoveOrdering) -> Tuple[int, Optional[Move], int]:
+    """search() below the root, playing moves on board and undoing them"""
+    if should_stop():
+        raise SearchCancelled()
+    if not board.has_legal_move(board.current_player):
+        return (-MATE_SCORE - depth if board.is_in_check(board.current_player) else 0), None, 1
+    if depth == 0:
+        return evaluate(board), None, 1
+    
+    nodes = 1
+    best_move = None
+    for move in ordering.moves(board, depth):
+        board.make_move(SQUARES[move[0]], SQUARES[move[1]])
+        score, _, child_nodes = _search(board, depth - 1, should_stop, -beta, -alpha, ordering)
+        board.undo_move()
+        score = -score
+        nodes += child_nodes
+        if score > alpha:
+            alpha = score
+            best_move = move
+        if alpha >= beta:
+            ordering.record_cutoff(board, move, depth)
+            break
+    return alpha, best_move, nodes
+
+def move_uci(board: ChessBoard, move: Move) -> str:
+    """UCI text of a move on board (pawns promote to queens)"""
+    from_index, to_index = move
+    promotion = None
+    if board.squares[from_index] & TYPE_MASK == PAWN_CODE and (to_index < 8 or to_index >= 56):
+        promotion = PieceType.QUEEN
+    return move_to_uci(Position(from_index >> 3, from_index & 7),
+                       Position(to_index >> 3, to_index & 7), promotion)
+
+def hints(game: ChessGame, count: int, depth: int = 0,
+          ordering: Optional[MoveOrdering] = None) -> dict:
+    """The count most promising legal moves, best first
+    
+    Moves are ranked by ChessBoard.ordered_moves() with ordering's killer
+    and history scores; with depth > 0 a search of that many plies (which
+    also trains ordering) puts its best move first and reports its score.
+    Captures carry their static exchange value, and 'hanging' lists the
+    squares of the pieces of the side to move the opponent wins material by
+    capturing.
+    """
+    ordering = ordering or MoveOrdering()
+    board = game.board
+    ranked = board.ordered_moves(ordering.killers.get(depth, ()), ordering.history)
+    best_move = score = None
+    nodes = 0
+    if depth and ranked and not game.is_game_over():
+        score, best_move, nodes = search(game, depth, ordering=ordering)
+        if best_move:
+            ranked.sort(key=lambda move: move[:2] != best_move)
+    moves = []
+    for from_index, to_index, priority in ranked[:count]:
+        hint = {
+            'move': move_uci(board, (from_index, to_index)),
+            'from': Position(from_index >> 3, from_index & 7).to_algebraic(),
+            'to': Position(to_index >> 3, to_index & 7).to_algebraic(),
+            'priority': priority
+        }
+        if board.squares[to_index]:
+            hint['exchange'] = board.see(from_index, to_index)
+        moves.append(hint)
+    return {
+        'moves': moves,
+        'legal_moves': len(ranked),
+        'hanging': [position.to_algebraic() for position in board.hanging_pieces(board.current_player)],
+        'best_move': move_uci(board, best_move) if best_move else None,
+        'score': score,
+        'depth': depth if best_move else 0,
+        'nodes': nodes
+    }
+
+class AnalysisResult:
+    """Analysis of one position, for the position with the given key
+    
+    legal_moves maps each from square index to its target indices;
+    best_move, score (centipawns for the side to move) and depth are None
+    until the first search iteration finishes.
+    """
+    __slots__ = ('key', 'legal_moves', 'best_move', 'score', 'depth', 'nodes', 'seconds')
+    
+    def __init__(self, key: str, legal_moves: Dict[int, List[int]],
+                 best_move: Optional[Move] = None, score: Optional[int] = None,
+                 depth: Optional[int] = None, nodes: int = 0, seconds: float = 0.0):
+        self.key = key
+        self.legal_moves = legal_moves
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+    
+    @property
+    def best_move_uci(self) -> Optional[str]:
+        """The best move as UCI text, e.g. 'e2e4'"""
+        if self.best_move is None:
+            return None
+        from_index, to_index = self.best_move
+        return move_to_uci(Position(from_index >> 3, from_index & 7),
+                           Position(to_index >> 3, to_index & 7))
+
+def analyze(fen: str, key: str, max_depth: int, should_stop: Callable[[], bool],
+            report: Callable[[AnalysisResult], None]):
+    """Report the legal moves of a position, then a hint per finished depth"""
+    start = time.perf_counter()
+    game = game_from_fen(fen)
+    legal_moves = {
+        from_index: [target.row * 8 + target.col for target in targets]
+        for from_index, targets in game.board.legal_moves().items()
+    }
+    report(AnalysisResult(key, legal_moves, seconds=time.perf_counter() - start))
+    if not legal_moves:
+        return
+    
+    nodes = 0
+    ordering = MoveOrdering()
+    for depth in range(1, max_depth + 1):
+        score, best_move, depth_nodes = search(game, depth, should_stop, ordering=ordering)
+        nodes += depth_nodes
+        report(AnalysisResult(key, legal_moves, best_move, score, depth, nodes,
+                              time.perf_counter() - start))
+        if abs(score) >= MATE_SCORE:
+            break
+
+def _analysis_loop(jobs, results, generation, max_depth: int):
+    """Worker loop: analyze the newest job until a None job arrives"""
+    while True:
+        job = jobs.get()
+        # Skip to the newest job; anything older is already stale
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+        if job is None:
+            return
+        job_generation, fen, key = job
+        
+        def should_stop() -> bool:
+            return generation.value != job_generation
+        
+        try:
+            analyze(fen, key, max_depth, should_stop, results.put)
+        except SearchCancelled:
+            pass
+
+class AnalysisWorker:
+    """Analyzes positions in the background, keeping only the newest request
+    
+    By default the work runs in a child process (started lazily on the
+    first submit); with use_process=False it runs in a daemon thread, which
+    is simpler to debug but competes with the caller for the GIL.
+    """
+    def __init__(self, max_depth: int = DEFAULT_DEPTH, use_process: bool = True):
+        self.max_depth = max_depth
+        self.use_process = use_process
+        context = multiprocessing.get_context('spawn')
+        self._context = context
+        self._generation = context.Value('l', 0)
+        self._jobs = None
+        self._results = None
+        self._worker = None
+        self.key: Optional[str] = None
+    
+    def _start(self):
+        """Start the worker process or thread"""
+        if self.use_process:
+            self._jobs = self._context.Queue()
+            self._results = self._context.Queue()
+            self._worker = self._context.Process(
+                target=_analysis_loop,
+                args=(self._jobs, self._results, self._generation, self.max_depth),
+                daemon=True
+            )
+        else:
+            self._jobs = queue.Queue()
+            self._results = queue.Queue()
+            self._worker = threading.Thread(
+                target=_analysis_loop,
+                args=(self._jobs, self._results, self._generation, self.max_depth),
+                daemon=True
+            )
+        self._worker.start()
+    
+    def submit(self, position) -> str:
+        """Analyze a ChessBoard or GameSnapshot, cancelling earlier requests
+        
+        Returns the key results for this position will carry.
+        """
+        if self._worker is None:
+            self._start()
+        fen = board_to_fen(position)
+        key = ' '.join(fen.split()[:4])
+        if key == self.key:
+            return key
+        with self._generation.get_lock():
+            self._generation.value += 1
+            generation = self._generation.value
+        self.key = key
+        self._jobs.put((generation, fen, key))
+        return key
+    
+    def cancel(self):
+        """Abandon the current request"""
+        with self._generation.get_lock():
+            self._generation.value += 1
+        self.key = None
+    
+    def poll(self) -> List[AnalysisResult]:
+        """Results that arrived for the current position, without blocking"""
+        found = []
+        if self._results is None:
+            return found
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return found
+            if result.key == self.key:
+                found.append(result)
+    
+    def close(self):
+        """Stop the worker"""
+        if self._worker is None:
+            return
+        self.cancel()
+        self._jobs.put(None)
+        self._worker.join(timeout=1.0)
+        if self.use_process and self._worker.is_alive():
+            self._worker.terminate()
+        self._worker = None
\ No newline at end of file
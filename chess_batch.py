@@ -0,0 +1,216 @@
+"""
+Chess Batch Validation
+Replay and validate game files across a pool of worker processes
+    
+    python chess_batch.py archive.pgn.gz more_games.uci -o results.jsonl --workers 8
+
+Inputs are PGN files or UCI move lists with one game per line
+('e2e4 e7e5 g1f3 ...', optionally ending in a result token), either of
+which may be .gz/.bz2/.xz compressed. Games are streamed and handed to the
+workers in chunks with a bounded number of chunks in flight, so memory
+stays flat however large the input is. Each game becomes one JSON line in
+the output, in input order, with its final FEN, result and the index of
+the first illegal move (null when the whole game replays). PGN games with
+SetUp/FEN tags are replayed from their FEN position.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from chess_mechanics import ChessGame
+from chess_notation import board_to_fen, game_from_fen, parse_san, parse_uci
+from chess_pgn import RESULTS, game_result, iter_games, open_pgn
+from chess_serializer import dumps
+
+DEFAULT_CHUNK_SIZE = 64
+
+# Chunks queued per worker: enough to keep workers busy without
+# reading the whole input ahead of them
+CHUNKS_PER_WORKER = 4
+
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz')
+UCI_SUFFIXES = ('.uci', '.txt')
+
+# (source, index, notation ('san' or 'uci'), moves, recorded result,
+#  FEN of a set-up starting position or None)
+Job = Tuple[str, int, str, List[str], Optional[str], Optional[str]]
+
+# (game replayed fully, plies played, encoded JSON line)
+Outcome = Tuple[bool, int, bytes]
+
+def detect_format(path: str) -> str:
+    """'pgn' or 'uci', from the file name"""
+    name = path.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return 'uci' if name.endswith(UCI_SUFFIXES) else 'pgn'
+
+def read_jobs(path: str, input_format: Optional[str] = None) -> Iterator[Job]:
+    """Stream the games of one input file as jobs"""
+    input_format = input_format or detect_format(path)
+    if input_format == 'pgn':
+        for index, pgn_game in enumerate(iter_games(path), 1):
+            yield path, index, 'san', pgn_game.moves, pgn_game.result, pgn_game.start_fen
+        return
+    
+    # open_pgn() handles the compressed variants for any text file
+    with open_pgn(path) as f:
+        index = 0
+        for line in f:
+            moves = line.split('#', 1)[0].split()
+            if not moves:
+                continue
+            index += 1
+            recorded = moves.pop() if moves[-1] in RESULTS else None
+            yield path, index, 'uci', moves, recorded, None
+
+def start_game(job: Job) -> ChessGame:
+    """A new game at the job's starting position
+    
+    Raises ValueError for a malformed FEN.
+    """
+    fen = job[5]
+    return game_from_fen(fen) if fen else ChessGame()
+
+def validate_game(job: Job) -> dict:
+    """Replay one game, stopping at the first move that cannot be played
+    
+    A game with a malformed FEN is invalid without playing any move.
+    """
+    source, index, notation, moves, recorded, _ = job
+    illegal_index = None
+    error = None
+    try:
+        game = start_game(job)
+    except ValueError as e:
+        game, error, moves = ChessGame(), f"FEN: {e}", []
+    for ply, text in enumerate(moves):
+        try:
+            if notation == 'san':
+                from_pos, to_pos, promotion = parse_san(game.board, text)
+            else:
+                from_pos, to_pos, promotion = parse_uci(text)
+        except ValueError as e:
+            illegal_index, error = ply, str(e)
+            break
+        if not game.make_move(from_pos, to_pos, promotion):
+            illegal_index, error = ply, f"Illegal move: {text}"
+            break
+    
+    return {
+        'source': source,
+        'index': index,
+        'valid': error is None,
+        'plies': len(game.board.move_history),
+        'final_fen': board_to_fen(game.board),
+        'result': game_result(game),
+        'recorded_result': recorded,
+        'illegal_move_index': illegal_index,
+        'illegal_move': moves[illegal_index] if illegal_index is not None else None,
+        'error': error
+    }
+
+def validate_chunk(chunk: List[Job]) -> List[Outcome]:
+    """Worker entry point: validate a chunk and encode its result lines
+    
+    Encoding in the worker keeps the parent process down to writing bytes.
+    """
+    outcomes = []
+    for job in chunk:
+        result = validate_game(job)
+        outcomes.append((result['valid'], result['plies'], dumps(result)))
+    return outcomes
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Consecutive lists of up to size items"""
+    iterator = iter(items)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
+
+def bounded_map(executor: Executor, func: Callable, items: Iterable,
+                max_pending: int) -> Iterator:
+    """executor.map() in input order with at most max_pending tasks queued
+    
+    Executor.map() submits the whole iterable up front, which would read
+    an entire game archive into memory before the first result is written.
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(executor.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+
+def run_batch(paths: List[str], out, workers: Optional[int] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE,
+              input_format: Optional[str] = None) -> dict:
+    """Validate every game in paths, writing JSON lines to the binary stream out
+    
+    Returns a summary with game counts and throughput.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = itertools.chain.from_iterable(read_jobs(path, input_format) for path in paths)
+    chunks = chunked(jobs, chunk_size)
+    
+    start = time.perf_counter()
+    games = invalid = plies = 0
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor:
+            results = bounded_map(executor, validate_chunk, chunks, workers * CHUNKS_PER_WORKER)
+        else:
+            results = map(validate_chunk, chunks)
+        for outcomes in results:
+            for valid, game_plies, line in outcomes:
+                out.write(line + b'\n')
+                games += 1
+                invalid += not valid
+                plies += game_plies
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    
+    seconds = time.perf_counter() - start
+    return {
+        'games': games,
+        'invalid_games': invalid,
+        'plies': plies,
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'games_per_second': round(games / seconds, 1) if seconds else None,
+        'plies_per_second': round(plies / seconds, 1) if seconds else None
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay and validate chess games in parallel")
+    parser.add_argument('inputs', nargs='+', help="PGN or UCI move-list files")
+    parser.add_argument('-o', '--output', default='-',
+                        help="JSON lines output file (default: stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count, 1 runs in-process)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="games per task sent to a worker")
+    parser.add_argument('-f', '--format', choices=('pgn', 'uci'), default=None,
+                        help="input format (default: from the file extension)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    
+    if args.output == '-':
+        summary = run_batch(args.inputs, sys.stdout.buffer, args.workers,
+                            args.chunk_size, args.format)
+    else:
+        with open(args.output, 'wb') as out:
+            summary = run_batch(args.inputs, out, args.workers, args.chunk_size, args.format)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+Chess Benchmarks
+Micro-benchmarks of the rules engine hot paths over opening, middlegame and
+endgame positions, stored as JSON and compared across commits
+    
+    python chess_bench.py -o baseline.json            # run and save
+    python chess_bench.py --compare baseline.json     # run, compare, exit 1 on regressions
+    python chess_bench.py --compare old.json new.json # compare two saved runs
+    python chess_bench.py -k make_move --repeats 50   # a subset, more samples
+
+Every benchmark runs once per position phase (the Position ones once in
+all). Like timeit, a run is repeated and each repeat times a batch of
+operations, looped until it lasts at least MIN_REPEAT_SECONDS, with the
+garbage collector off; the report keeps the median, minimum and spread of
+the per-operation times. Setup is never timed: the make_move benchmark
+plays each legal move on its own copy of the game, copied before the clock
+starts. The board's caches (tracked checks, legal moves, piece string) are
+cleared before each timed call, so the benchmarks measure the work those
+caches save rather than a lookup. Set CHESS_METRICS=0 to leave the
+hot-path timers of chess_metrics out of the measurements.
+
+A comparison flags every benchmark whose median is more than --threshold
+percent slower than the baseline.
+"""
+
+import argparse
+import copy
+import gc
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from chess_game import Color, Position, PieceType
+from chess_mechanics import ChessGame
+from chess_metrics import METRICS_ENABLED
+from chess_notation import game_from_fen
+from chess_revision import git_commit
+from chess_serializer import board_data
+
+FORMAT = 1
+DEFAULT_REPEATS = 15
+# Shortest timed batch; shorter ones are looped to reduce timer noise
+MIN_REPEAT_SECONDS = 0.005
+# Percent slowdown of the median reported as a regression
+DEFAULT_THRESHOLD = 10.0
+
+CORPUS = {
+    'opening': (
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+        'r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3',
+        'rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5',
+        'rnbqkb1r/ppp2ppp/4pn2/3p4/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 2 4'
+    ),
+    'middlegame': (
+        'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+        'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+        'r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1',
+        'r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8'
+    ),
+    'endgame': (
+        '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+        '8/5pk1/6p1/8/8/6P1/5PK1/8 w - - 0 40',
+        '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 30',
+        '8/8/8/4k3/8/8/3QK3/8 w - - 0 1'
+    )
+}
+
+# factory(games) -> (run, operations): builds the untimed state of one
+# repeat and returns a callable doing that many operations
+Factory = Callable[[List[ChessGame]], Tuple[Callable[[], None], int]]
+
+def _pieces(games: List[ChessGame], piece_type: Optional[PieceType] = None,
+            side_to_move: bool = False) -> list:
+    """(board, piece) pairs of the games, optionally of one type or the side to move"""
+    pairs = []
+    for game in games:
+        board = game.board
+        colors = (board.current_player,) if side_to_move else (Color.WHITE, Color.BLACK)
+        for color in colors:
+            pairs.extend((board, piece) for piece in board.get_all_pieces(color)
+                         if piece_type is None or piece.piece_type == piece_type)
+    return pairs
+
+def _legal_moves(game: ChessGame) -> List[Tuple[Position, Position]]:
+    """(from, to) positions of the legal moves of the side to move"""
+    return [(Position(*divmod(index, 8)), target)
+            for index, targets in game.board.legal_moves().items() for target in targets]
+
+def bench_position_init(games):
+    coordinates = [divmod(index, 8) for index in range(64)] * 16
+    def run():
+        for row, col in coordinates:
+            Position(row, col)
+    return run, len(coordinates)
+
+def bench_position_eq(games):
+    positions = [Position(*divmod(index, 8)) for index in range(64)]
+    pairs = list(zip(positions, positions[1:] + positions[:1])) * 8
+    pairs += [(position, Position(position.row, position.col)) for position in positions] * 8
+    def run():
+        for a, b in pairs:
+            a == b
+    return run, len(pairs)
+
+def bench_possible_moves(piece_type: PieceType) -> Factory:
+    def factory(games):
+        pairs = _pieces(games, piece_type)
+        def run():
+            for board, piece in pairs:
+                piece.get_possible_moves(board)
+        return run, len(pairs)
+    return factory
+
+def bench_get_valid_moves(games):
+    pairs = _pieces(games, side_to_move=True)
+    def run():
+        for board, piece in pairs:
+            board.invalidate_caches()
+            board.get_valid_moves(piece)
+    return run, len(pairs)
+
+def bench_is_in_check(games):
+    boards = [game.board for game in games]
+    def run():
+        for board in boards:
+            board.invalidate_caches()
+            board.is_in_check(Color.WHITE)
+            board.is_in_check(Color.BLACK)
+    return run, 2 * len(boards)
+
+def bench_would_be_in_check(games):
+    calls = [(game.board, from_pos, to_pos, game.board.current_player)
+             for game in games for from_pos, to_pos in _legal_moves(game)]
+    def run():
+        for board, from_pos, to_pos, color in calls:
+            board.would_be_in_check(from_pos, to_pos, color)
+    return run, len(calls)
+
+def bench_see(games):
+    # Every legal move, not just captures: the openings have few of those
+    calls = [(game.board, index, target.row * 8 + target.col)
+             for game in games for index, targets in game.board.legal_moves().items()
+             for target in targets]
+    def run():
+        for board, from_index, to_index in calls:
+            board.see(from_index, to_index)
+    return run, len(calls)
+
+def bench_make_move(games):
+    moves = [(copy.deepcopy(game), from_pos, to_pos)
+             for game in games for from_pos, to_pos in _legal_moves(game)]
+    def run():
+        for game, from_pos, to_pos in moves:
+            game.make_move(from_pos, to_pos)
+    return run, len(moves)
+
+def bench_update_game_state(games):
+    def run():
+        for game in games:
+            game.board.invalidate_caches()
+            game._update_game_state()
+    return run, len(games)
+
+def bench_get_board_data(games):
+    boards = [game.board for game in games]
+    def run():
+        for board in boards:
+            board.invalidate_caches()
+            board_data(board)
+    return run, len(boards)
+
+BENCHMARKS: Dict[str, Factory] = {
+    'Position.__init__': bench_position_init,
+    'Position.__eq__': bench_position_eq,
+    **{f'{piece_type.value.title()}.get_possible_moves': bench_possible_moves(piece_type)
+       for piece_type in PieceType},
+    'ChessBoard.get_valid_moves': bench_get_valid_moves,
+    'ChessBoard.is_in_check': bench_is_in_check,
+    'ChessBoard.would_be_in_check': bench_would_be_in_check,
+    'ChessBoard.see': bench_see,
+    'ChessGame.make_move': bench_make_move,
+    'ChessGame._update_game_state': bench_update_game_state,
+    'get_board_data': bench_get_board_data
+}
+
+# Benchmarks that do not depend on the position, run once rather than per phase
+PHASE_INDEPENDENT = {'Position.__init__', 'Position.__eq__'}
+# Benchmarks whose run() changes its state, so every loop needs a new factory() call
+SINGLE_SHOT = {'ChessGame.make_move'}
+
+def _timed(runs: List[Callable[[], None]]) -> float:
+    """Seconds taken by calling every run, with the garbage collector off"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for run in runs:
+            run()
+        return time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+def measure(factory: Factory, games: List[ChessGame], repeats: int,
+            single_shot: bool = False) -> Optional[dict]:
+    """Per-operation times of one benchmark, or None when it has nothing to do"""
+    # An untimed warm-up call, which also sizes the batches
+    run, operations = factory(games)
+    if not operations:
+        return None
+    loops = max(1, int(MIN_REPEAT_SECONDS / max(_timed([run]), 1e-9)) + 1)
+    
+    samples = []
+    for _ in range(repeats):
+        if single_shot:
+            runs = [factory(games)[0] for _ in range(loops)]
+        else:
+            run, _ = factory(games)
+            runs = [run] * loops
+        samples.append(_timed(runs) / (operations * loops) * 1e6)
+    return {
+        'median_us': round(statistics.median(samples), 4),
+        'min_us': round(min(samples), 4),
+        'stdev_us': round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        'operations': operations * loops,
+        'repeats': repeats
+    }
+
+def run_benchmarks(pattern: Optional[str] = None, repeats: int = DEFAULT_REPEATS) -> dict:
+    """Run the benchmarks whose name matches pattern over every phase"""
+    results = {}
+    for number, (phase, fens) in enumerate(CORPUS.items()):
+        games = [game_from_fen(fen) for fen in fens]
+        for name, factory in BENCHMARKS.items():
+            if name in PHASE_INDEPENDENT:
+                if number:
+                    continue
+                key = name
+            else:
+                key = f'{name}[{phase}]'
+            if pattern and not re.search(pattern, key):
+                continue
+            result = measure(factory, games, repeats, name in SINGLE_SHOT)
+            if result is not None:
+                results[key] = result
+    return {
+        'format': FORMAT,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'metrics_enabled': METRICS_ENABLED,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'benchmarks': results
+    }
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """Median change of every benchmark in both runs, in percent"""
+    rows = []
+    for key, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(key)
+        if base is None:
+            continue
+        change = (result['median_us'] / base['median_us'] - 1) * 100
+        rows.append({
+            'benchmark': key,
+            'baseline_us': base['median_us'],
+            'current_us': result['median_us'],
+            'change_percent': round(change, 1),
+            'regression': change > threshold
+        })
+    return rows
+
+def load_report(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def print_results(report: dict, out=sys.stdout):
+    width = max((len(key) for key in report['benchmarks']), default=0)
+    for key, result in report['benchmarks'].items():
+        print(f"{key:<{width}}  {result['median_us']:>10.3f} us  "
+              f"(min {result['min_us']:.3f}, sd {result['stdev_us']:.3f}, "
+              f"{result['operations']} ops)", file=out)
+
+def print_comparison(rows: List[dict], out=sys.stdout):
+    width = max((len(row['benchmark']) for row in rows), default=0)
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<{width}}  {row['baseline_us']:>10.3f} -> "
+              f"{row['current_us']:>10.3f} us  {row['change_percent']:+6.1f}%{flag}", file=out)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the chess rules engine")
+    parser.add_argument('-o', '--output', default=None, help="save the results as JSON")
+    parser.add_argument('--compare', nargs='+', metavar='REPORT',
+                        help="baseline report, and optionally a report to compare "
+                             "instead of running the benchmarks")
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="percent slowdown flagged as a regression")
+    parser.add_argument('-k', '--filter', default=None,
+                        help="only benchmarks whose name[phase] matches this regex")
+    parser.add_argument('-r', '--repeats', type=int, default=DEFAULT_REPEATS,
+                        help="timed repeats per benchmark")
+    args = parser.parse_args(argv)
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline and at most one more report")
+    
+    if args.compare and len(args.compare) == 2:
+        current = load_report(args.compare[1])
+    else:
+        current = run_benchmarks(args.filter, args.repeats)
+        print_results(current)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(current, f, indent=2)
+    
+    if not args.compare:
+        return 0
+    rows = compare(load_report(args.compare[0]), current, args.threshold)
+    print_comparison(rows)
+    regressions = sum(row['regression'] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:g}% in {len(rows)} benchmarks",
+          file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
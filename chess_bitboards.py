@@ -0,0 +1,252 @@
+"""
+Chess Bitboards
+Vectorized move counts, attack maps and check detection for many positions
+
+Positions are packed into NumPy uint64 bitboards, one per piece code and
+color, with bit i standing for ChessBoard square index i (a8 = bit 0,
+h1 = bit 63). Every statistic is then computed for the whole batch at once
+with shift and mask operations, instead of one ChessBoard at a time:
+    
+    batch = PositionBatch.from_boards(game.snapshot for game in games)
+    stats = batch.analyze()
+
+Requires NumPy 2 (pip install -r requirements_analysis.txt).
+"""
+
+from typing import Dict, Iterable
+import numpy as np
+from chess_game import (Color, BLACK_FLAG, PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE,
+                        QUEEN_CODE, KING_CODE, WHITE_KINGSIDE, WHITE_QUEENSIDE,
+                        BLACK_KINGSIDE, BLACK_QUEENSIDE, square_index)
+
+U64 = np.uint64
+
+# Plane order of PositionBatch.pieces: white pawn..king, then black pawn..king
+PIECE_PLANES = tuple(
+    code | flag
+    for flag in (0, BLACK_FLAG)
+    for code in (PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, KING_CODE)
+)
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+BLACK_PLANES = 6
+
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+ALL_SQUARES = 0xFFFFFFFFFFFFFFFF
+
+def _rank_row(row: int) -> int:
+    """Bitboard of one board row (row 0 is rank 8)"""
+    return 0xFF << (row * 8)
+
+# Shift amounts (positive: towards higher indices, i.e. south/east) and the
+# mask removing squares that wrapped around a board edge
+NORTH, SOUTH, EAST, WEST = (-8, ALL_SQUARES), (8, ALL_SQUARES), (1, ~FILE_A), (-1, ~FILE_H)
+NORTH_EAST, NORTH_WEST = (-7, ~FILE_A), (-9, ~FILE_H)
+SOUTH_EAST, SOUTH_WEST = (9, ~FILE_A), (7, ~FILE_H)
+ROOK_DIRECTIONS = (NORTH, SOUTH, EAST, WEST)
+BISHOP_DIRECTIONS = (NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+KING_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_DIRECTIONS = (
+    (17, ~FILE_A), (15, ~FILE_H), (10, ~(FILE_A | FILE_B)), (6, ~(FILE_G | FILE_H)),
+    (-6, ~(FILE_A | FILE_B)), (-10, ~(FILE_G | FILE_H)), (-15, ~FILE_A), (-17, ~FILE_H)
+)
+
+# Pawn moves per color: (push, (capture directions), row a double push
+# passes through)
+PAWN_MOVES = {
+    0: (NORTH, (NORTH_WEST, NORTH_EAST), 5),
+    1: (SOUTH, (SOUTH_WEST, SOUTH_EAST), 2)
+}
+
+# Castling per color: (rights bit, king square, rook square, squares that
+# must be empty, squares that must not be attacked)
+CASTLING = {
+    0: ((WHITE_KINGSIDE, 60, 63, (61, 62), (60, 61)), (WHITE_QUEENSIDE, 60, 56, (57, 58, 59), (60, 59))),
+    1: ((BLACK_KINGSIDE, 4, 7, (5, 6), (4, 5)), (BLACK_QUEENSIDE, 4, 0, (1, 2, 3), (4, 3)))
+}
+
+# Positions analyzed per pass, so the working arrays stay in cache
+CHUNK_SIZE = 16384
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(bitboards: np.ndarray) -> np.ndarray:
+        """Number of set bits in each bitboard"""
+        return np.bitwise_count(bitboards)
+else:  # NumPy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    
+    def popcount(bitboards: np.ndarray) -> np.ndarray:
+        """Number of set bits in each bitboard"""
+        counts = _BYTE_COUNTS[np.ascontiguousarray(bitboards).view(np.uint8)]
+        return counts.reshape(bitboards.shape + (8,)).sum(axis=-1)
+
+def shift(bitboards: np.ndarray, direction) -> np.ndarray:
+    """Move every bit one step in a direction, dropping bits that leave the board"""
+    amount, mask = direction
+    if amount > 0:
+        moved = bitboards << U64(amount)
+    else:
+        moved = bitboards >> U64(-amount)
+    if mask != ALL_SQUARES:
+        moved &= U64(mask & ALL_SQUARES)
+    return moved
+
+def slide(pieces: np.ndarray, empty: np.ndarray, direction) -> np.ndarray:
+    """Squares attacked along one direction by sliding pieces (Kogge-Stone fill)
+    
+    Each attack ray stops at, and includes, the first occupied square.
+    """
+    amount, mask = direction
+    empty = empty & U64(mask & ALL_SQUARES)
+    reached = pieces.copy()
+    for step in (1, 2, 4):
+        step_direction = (amount * step, ALL_SQUARES)
+        reached |= empty & shift(reached, step_direction)
+        if step != 4:
+            empty &= shift(empty, step_direction)
+    return shift(reached, direction)
+
+def _piece_attacks(planes: np.ndarray, color: int, empty: np.ndarray):
+    """Per-direction attack bitboards of one color
+    
+    Returns the pawn capture directions and all other directions
+    separately. In a single direction each target has at most one attacker
+    (a nearer piece blocks the ones behind it), so popcounts of these add up
+    to per-piece move counts.
+    """
+    base = color * BLACK_PLANES
+    _, captures, _ = PAWN_MOVES[color]
+    pawn_attacks = [shift(planes[base + PAWN], direction) for direction in captures]
+    attacks = [shift(planes[base + KNIGHT], direction) for direction in KNIGHT_DIRECTIONS]
+    attacks += [shift(planes[base + KING], direction) for direction in KING_DIRECTIONS]
+    queens = planes[base + QUEEN]
+    rooks = planes[base + ROOK] | queens
+    bishops = planes[base + BISHOP] | queens
+    attacks += [slide(rooks, empty, direction) for direction in ROOK_DIRECTIONS]
+    attacks += [slide(bishops, empty, direction) for direction in BISHOP_DIRECTIONS]
+    return pawn_attacks, attacks
+
+class PositionBatch:
+    """Many positions as bitboard arrays
+    
+    pieces is a (12, N) uint64 array, one contiguous plane per entry of
+    PIECE_PLANES; side (0 white, 1 black), castling (ChessBoard rights
+    bits) and en_passant (square index, -1 for none) are length-N arrays.
+    """
+    def __init__(self, pieces: np.ndarray, side: np.ndarray, castling: np.ndarray,
+                 en_passant: np.ndarray):
+        self.pieces = pieces
+        self.side = side
+        self.castling = castling
+        self.en_passant = en_passant
+    
+    def __len__(self):
+        return self.pieces.shape[1]
+    
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, side: np.ndarray, castling: np.ndarray,
+                   en_passant: np.ndarray) -> 'PositionBatch':
+        """Pack an (N, 64) uint8 array of ChessBoard piece codes"""
+        codes = np.asarray(codes, dtype=np.uint8).reshape(-1, 64)
+        pieces = np.empty((len(PIECE_PLANES), len(codes)), dtype=U64)
+        for plane, code in enumerate(PIECE_PLANES):
+            bits = np.packbits(codes == code, axis=1, bitorder='little')
+            pieces[plane] = bits.view('<u8')[:, 0]
+        return cls(pieces, np.asarray(side, dtype=np.uint8),
+                   np.asarray(castling, dtype=np.uint8), np.asarray(en_passant, dtype=np.int8))
+    
+    @classmethod
+    def from_boards(cls, boards: Iterable) -> 'PositionBatch':
+        """Pack ChessBoards or GameSnapshots"""
+        squares, side, castling, en_passant = [], [], [], []
+        for board in boards:
+            squares.append(bytes(board.squares))
+            side.append(board.current_player == Color.BLACK)
+            castling.append(board.castling)
+            target = board.en_passant_target
+            en_passant.append(square_index(target) if target else -1)
+        codes = np.frombuffer(b''.join(squares), dtype=np.uint8)
+        return cls.from_codes(codes, side, castling, en_passant)
+    
+    def analyze(self, chunk_size: int = CHUNK_SIZE) -> Dict[str, np.ndarray]:
+        """Per-position statistics for white and black, each an (N, 2) array
+        
+        move_counts: pseudo-legal moves, counted as ChessBoard generates
+        them (a promotion is one move, en passant only for the side to move);
+        attack_maps: bitboards of the attacked squares, defended ones
+        included; attacked_squares: their popcounts; in_check: whether the
+        king is attacked.
+        """
+        size = len(self)
+        results = {
+            'move_counts': np.empty((size, 2), dtype=np.int64),
+            'attack_maps': np.empty((size, 2), dtype=U64),
+            'attacked_squares': np.empty((size, 2), dtype=np.int64),
+            'in_check': np.empty((size, 2), dtype=bool)
+        }
+        for start in range(0, size, chunk_size):
+            window = slice(start, start + chunk_size)
+            self._analyze_chunk(self.pieces[:, window], self.side[window],
+                                self.castling[window], self.en_passant[window],
+                                {name: array[window] for name, array in results.items()})
+        return results
+    
+    @staticmethod
+    def _analyze_chunk(planes, side, castling, en_passant, out):
+        """analyze() for one chunk, writing into the out arrays"""
+        occupancy = (np.bitwise_or.reduce(planes[:BLACK_PLANES], axis=0),
+                     np.bitwise_or.reduce(planes[BLACK_PLANES:], axis=0))
+        empty = ~(occupancy[0] | occupancy[1])
+        ep_squares = np.where(en_passant >= 0, U64(1) << en_passant.clip(0).astype(U64), U64(0))
+        
+        for color in (0, 1):
+            own, enemy = occupancy[color], occupancy[1 - color]
+            base = color * BLACK_PLANES
+            pawn_attacks, attacks = _piece_attacks(planes, color, empty)
+            
+            attack_map = pawn_attacks[0] | pawn_attacks[1]
+            for bitboard in attacks:
+                attack_map |= bitboard
+            out['attack_maps'][:, color] = attack_map
+            out['attacked_squares'][:, color] = popcount(attack_map)
+            out['in_check'][:, 1 - color] = (planes[BLACK_PLANES - base + KING] & attack_map) != 0
+            
+            # Piece moves: attacked squares not holding an own piece
+            targets = ~own
+            count = np.zeros(planes.shape[1], dtype=np.int64)
+            for bitboard in attacks:
+                bitboard &= targets
+                count += popcount(bitboard)
+            
+            # Pawns: captures (en passant for the side to move), pushes and
+            # double pushes
+            push, _, passing_row = PAWN_MOVES[color]
+            capturable = enemy | np.where(side == color, ep_squares, U64(0))
+            for bitboard in pawn_attacks:
+                bitboard &= capturable
+                count += popcount(bitboard)
+            single = shift(planes[base + PAWN], push) & empty
+            double = shift(single & U64(_rank_row(passing_row)), push) & empty
+            count += popcount(single)
+            count += popcount(double)
+            out['move_counts'][:, color] = count
+        
+        # Castling, as ChessBoard offers it: rights, king and rook at home,
+        # empty squares between them, and neither the king nor the square it
+        # crosses attacked
+        for color in (0, 1):
+            base = color * BLACK_PLANES
+            kings, rooks = planes[base + KING], planes[base + ROOK]
+            enemy_attacks = out['attack_maps'][:, 1 - color]
+            for bit, king_square, rook_square, between, safe in CASTLING[color]:
+                between_mask = U64(sum(1 << square for square in between))
+                safe_mask = U64(sum(1 << square for square in safe))
+                out['move_counts'][:, color] += (
+                    ((castling & bit) != 0) &
+                    ((kings >> U64(king_square)) & U64(1) != 0) &
+                    ((rooks >> U64(rook_square)) & U64(1) != 0) &
+                    ((empty & between_mask) == between_mask) &
+                    ((enemy_attacks & safe_mask) == 0)
+                )
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Chess Boot
+Startup timing and the build-time snapshot of static data
+
+The Docker build runs `python chess_boot.py build`, which precomputes the
+move tables, the compiled page template and the initial position payload
+into chess_snapshot.pickle. At startup each module asks for its section
+with snapshot_section() and falls back to computing it when the snapshot
+is missing or was built from different sources.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+BOOT_STARTED = time.perf_counter()
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_PATH = os.environ.get(
+    'CHESS_SNAPSHOT',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chess_snapshot.pickle')
+)
+
+_phases: Dict[str, float] = {}
+_snapshot: Optional[Dict[str, Any]] = None
+_snapshot_status = 'not loaded'
+_ready_at: Optional[float] = None
+_first_request_started: Optional[float] = None
+_first_request_seconds: Optional[float] = None
+
+@contextmanager
+def phase(name: str):
+    """Record the duration of a startup phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = _phases.get(name, 0.0) + time.perf_counter() - start
+
+def mark_ready():
+    """Mark the application as ready to serve requests"""
+    global _ready_at
+    if _ready_at is None:
+        _ready_at = time.perf_counter()
+
+def first_request_started():
+    """Called before each request; only the first one is recorded"""
+    global _first_request_started
+    if _first_request_started is None:
+        _first_request_started = time.perf_counter()
+
+def first_request_finished():
+    """Called after each request; only the first one is recorded"""
+    global _first_request_seconds
+    if _first_request_seconds is None and _first_request_started is not None:
+        _first_request_seconds = time.perf_counter() - _first_request_started
+
+def source_key(*parts: str) -> str:
+    """Key tying a snapshot section to the sources and interpreter that built it"""
+    digest = hashlib.sha1(sys.version.encode('utf-8'))
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+def file_key(*paths: str) -> str:
+    """source_key() of the contents of one or more files"""
+    contents = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            contents.append(f.read())
+    return source_key(*contents)
+
+def _load_snapshot() -> Dict[str, Any]:
+    """Load the snapshot file once"""
+    global _snapshot, _snapshot_status
+    if _snapshot is None:
+        _snapshot = {}
+        start = time.perf_counter()
+        try:
+            with open(SNAPSHOT_PATH, 'rb') as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            _snapshot_status = 'missing'
+        except Exception as e:
+            _snapshot_status = f'unreadable: {e}'
+        else:
+            if data.get('format') == SNAPSHOT_FORMAT and data.get('python') == sys.version:
+                _snapshot = data['sections']
+                _snapshot_status = 'loaded'
+            else:
+                _snapshot_status = 'stale'
+        _phases['load_snapshot'] = time.perf_counter() - start
+    return _snapshot
+
+def snapshot_section(name: str, key: Optional[str] = None) -> Any:
+    """A section of the snapshot, or None if missing or built from other sources"""
+    section = _load_snapshot().get(name)
+    if section is None or section['key'] != key:
+        return None
+    return section['data']
+
+def report() -> dict:
+    """Startup timings for the status endpoint (milliseconds)"""
+    def ms(seconds: Optional[float]) -> Optional[float]:
+        return None if seconds is None else round(seconds * 1000, 3)
+    
+    return {
+        'snapshot': _snapshot_status,
+        'phases_ms': {name: ms(seconds) for name, seconds in _phases.items()},
+        'boot_ms': ms(_ready_at - BOOT_STARTED) if _ready_at else None,
+        'first_request_ms': ms(_first_request_seconds)
+    }
+
+def build_snapshot(path: str = SNAPSHOT_PATH):
+    """Precompute all snapshot sections and write them to path"""
+    import marshal
+    from app import app
+    import chess_mechanics
+    import chess_tables
+    import chess_serializer
+    import chess_web
+    
+    sections = {
+        'tables': {
+            'key': chess_tables.tables_key(),
+            'data': chess_tables.build_tables()
+        },
+        'chess_template': {
+            'key': chess_web.template_key(),
+            'data': marshal.dumps(chess_web.compile_template(app.jinja_env))
+        },
+        'initial_position': {
+            'key': chess_serializer.precomputed_key(),
+            'data': chess_serializer.precompute(chess_mechanics.ChessGame().board)
+        }
+    }
+    with open(path, 'wb') as f:
+        pickle.dump({'format': SNAPSHOT_FORMAT, 'python': sys.version, 'sections': sections},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"Wrote {path} ({os.path.getsize(path)} bytes)")
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        print("Usage: python chess_boot.py build")
+        sys.exit(1)
+    # The other modules import chess_boot by name, so build through that
+    # instance and make it ignore any existing snapshot
+    import chess_boot
+    chess_boot._snapshot = {}
+    chess_boot._snapshot_status = 'building'
+    chess_boot.build_snapshot(SNAPSHOT_PATH)
\ No newline at end of file
@@ -3,15 +3,22 @@ Console Chess Game
 A text-based version of the chess game for testing and playing without GUI
 """
 
+from chess_analysis import AnalysisWorker
 from chess_mechanics import ChessGame, GameState
-from chess_game import Position, Color
+from chess_game import Position, Color, square_index
 import sys
+from typing import Optional
 
 class ConsoleChess:
     """Console interface for the chess game"""
     
     def __init__(self):
         self.game = ChessGame()
+        # Hints and legal moves are worked out in the background while the
+        # prompt waits for input; 'hint' and 'moves' show what is ready. The
+        # worker starts on the first of them, then gets every new position
+        self.analysis: Optional[AnalysisWorker] = None
+        self.latest_analysis = None
     
     def display_board(self):
         """Display the current board state"""
@@ -20,6 +27,53 @@ class ConsoleChess:
         print("="*50)
         print(f"Status: {self.game.get_game_status()}")
         print("="*50)
+        self.latest_analysis = None
+        if self.analysis:
+            self.analysis.submit(self.game.snapshot)
+    
+    def collect_analysis(self):
+        """Take the newest background result for the current position, if any
+        
+        Starts the worker on the current position when first called.
+        """
+        if self.analysis is None:
+            self.analysis = AnalysisWorker()
+            self.analysis.submit(self.game.snapshot)
+        for result in self.analysis.poll():
+            self.latest_analysis = result
+        return self.latest_analysis
+    
+    def display_hint(self):
+        """Show the best move found so far"""
+        result = self.collect_analysis()
+        if result is None or result.best_move is None:
+            if result and not result.legal_moves:
+                print("No legal moves.")
+            else:
+                print("Still analysing, try again in a moment.")
+            return
+        print(f"Hint: {result.best_move_uci} (score {result.score / 100:+.2f}, "
+              f"depth {result.depth}, {result.nodes} positions)")
+    
+    def display_legal_moves(self):
+        """Show every legal move of the side to move"""
+        result = self.collect_analysis()
+        if result is not None:
+            legal_moves = result.legal_moves
+        else:
+            # Not ready yet: work them out here rather than make the user wait
+            legal_moves = {
+                from_index: [square_index(target) for target in targets]
+                for from_index, targets in self.game.board.legal_moves().items()
+            }
+        if not legal_moves:
+            print("No legal moves.")
+            return
+        print("\nLegal moves:")
+        for from_index, targets in sorted(legal_moves.items()):
+            from_square = Position(from_index // 8, from_index % 8).to_algebraic()
+            to_squares = ' '.join(Position(target // 8, target % 8).to_algebraic() for target in targets)
+            print(f"  {from_square}: {to_squares}")
     
     def get_position_input(self, prompt: str) -> Position:
         """Get a position input from the user"""
@@ -44,13 +98,18 @@ class ConsoleChess:
         print("- Type 'quit' to exit the game")
         print("- Type 'new' to start a new game")
         print("- Type 'undo' to undo the last move")
-        print("- Type 'history' to see move history")
+        print("- Type 'history' to see move history ('history 5' for the last 5 moves)")
         print("- Type 'status' to see current game status")
+        print("- Type 'hint' for a suggested move")
+        print("- Type 'moves' to list all legal moves")
         print("\nPosition format: column (a-h) + row (1-8), e.g., 'e4', 'a1'")
     
-    def display_move_history(self):
-        """Display the move history"""
-        history = self.game.get_move_history_algebraic()
+    def display_move_history(self, count: Optional[int] = None):
+        """Display the move history, or just its last count lines"""
+        if count is None:
+            history = self.game.get_move_history_algebraic()
+        else:
+            history = self.game.get_recent_history(count)
         if not history:
             print("No moves have been made yet.")
             return
@@ -91,9 +150,18 @@ class ConsoleChess:
                 elif user_input == 'history':
                     self.display_move_history()
                     continue
+                elif user_input.startswith('history ') and user_input[8:].strip().isdigit():
+                    self.display_move_history(int(user_input[8:]))
+                    continue
                 elif user_input == 'status':
                     print(f"Game Status: {self.game.get_game_status()}")
                     continue
+                elif user_input == 'hint':
+                    self.display_hint()
+                    continue
+                elif user_input == 'moves':
+                    self.display_legal_moves()
+                    continue
                 
                 # Parse move input
                 parts = user_input.split()
@@ -162,6 +230,8 @@ class ConsoleChess:
         
         if self.game.is_game_over():
             print(f"\nFinal Result: {self.game.get_game_status()}")
+        if self.analysis:
+            self.analysis.close()
 
 def main():
     """Main function to start the console chess game"""
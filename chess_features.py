@@ -0,0 +1,256 @@
+"""
+Chess Feature Export
+Training positions from game files as packed bitboard planes in .npy shards
+
+Every position before a move becomes one record: the 12 piece planes of
+chess_bitboards packed as 12 uint64 bitboards (bit i = square index i,
+a8 = 0), the side to move, castling rights, en passant square, the move
+played and the game result. Shards are plain .npy files of POSITION_DTYPE,
+so training jobs can memory-map them instead of loading them:
+    
+    python chess_features.py archive.pgn.gz -o shards/ --shard-size 1000000
+    
+    for records in load_shards('shards/'):
+        planes = unpack_planes(records[:4096])   # (4096, 12, 8, 8) uint8
+
+Games are replayed across a process pool in chunks (see chess_batch.py);
+each chunk comes back as one packed record array and is copied straight
+into the shard buffer, so memory is bounded by one shard plus the chunks in
+flight. Games containing an illegal move are skipped.
+
+Requires NumPy 2 (pip install -r requirements_analysis.txt).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+from chess_batch import (CHUNKS_PER_WORKER, DEFAULT_CHUNK_SIZE, Job, bounded_map, chunked,
+                         read_jobs, start_game)
+from chess_bitboards import PIECE_PLANES, PositionBatch
+from chess_game import Color, PIECE_CODES, square_index
+from chess_notation import parse_san, parse_uci
+from chess_pgn import game_result
+
+POSITION_DTYPE = np.dtype([
+    ('planes', '<u8', (len(PIECE_PLANES),)),
+    ('side', 'u1'),           # 0 white, 1 black to move
+    ('castling', 'u1'),       # ChessBoard castling rights bits
+    ('en_passant', 'i1'),     # square index, -1 for none
+    ('from_square', 'u1'),    # the move played from this position
+    ('to_square', 'u1'),
+    ('promotion', 'u1'),      # piece code of the promotion, 0 for none
+    ('result', 'i1'),         # 1 white won, -1 black won, 0 draw, UNKNOWN_RESULT
+    ('ply', '<u2'),
+    ('game', '<u4')           # game number across all inputs, from 0
+])
+
+RESULT_VALUES = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
+UNKNOWN_RESULT = -128
+
+DEFAULT_SHARD_SIZE = 1 << 20
+MANIFEST_NAME = 'manifest.json'
+
+def extract_chunk(chunk: List[Tuple[int, Job]]) -> Tuple[np.ndarray, int, int]:
+    """Worker entry point: replay numbered games into packed records
+    
+    Returns the records, the number of games exported and the number
+    skipped for an illegal move or a malformed FEN.
+    """
+    codes = bytearray()
+    side, castling, from_squares, to_squares, promotions = (array('B') for _ in range(5))
+    en_passant, results = array('b'), array('b')
+    plies, games = array('H'), array('I')
+    skipped = 0
+    
+    for game_number, job in chunk:
+        _, _, notation, moves, recorded, _ = job
+        try:
+            game = start_game(job)
+        except ValueError:
+            skipped += 1
+            continue
+        board = game.board
+        start = len(plies)
+        for ply, text in enumerate(moves):
+            try:
+                if notation == 'san':
+                    from_pos, to_pos, promotion = parse_san(board, text)
+                else:
+                    from_pos, to_pos, promotion = parse_uci(text)
+            except ValueError:
+                break
+            target = board.en_passant_target
+            codes += board.squares
+            side.append(board.current_player == Color.BLACK)
+            castling.append(board.castling)
+            en_passant.append(square_index(target) if target else -1)
+            from_squares.append(square_index(from_pos))
+            to_squares.append(square_index(to_pos))
+            promotions.append(PIECE_CODES[promotion] if promotion else 0)
+            plies.append(ply)
+            if not game.make_move(from_pos, to_pos, promotion):
+                break
+        else:
+            result = RESULT_VALUES.get(recorded, RESULT_VALUES.get(game_result(game), UNKNOWN_RESULT))
+            count = len(plies) - start
+            results.extend([result] * count)
+            games.extend([game_number] * count)
+            continue
+        
+        # Drop the rows of a game with an illegal move
+        skipped += 1
+        del codes[start * 64:]
+        for column in (side, castling, en_passant, from_squares, to_squares, promotions, plies):
+            del column[start:]
+    
+    records = np.empty(len(plies), dtype=POSITION_DTYPE)
+    if len(records):
+        batch = PositionBatch.from_codes(np.frombuffer(codes, dtype=np.uint8), side,
+                                         castling, en_passant)
+        records['planes'] = batch.pieces.T
+    for name, column in (('side', side), ('castling', castling), ('en_passant', en_passant),
+                         ('from_square', from_squares), ('to_square', to_squares),
+                         ('promotion', promotions), ('result', results), ('ply', plies),
+                         ('game', games)):
+        records[name] = np.frombuffer(column, dtype=column.typecode) if len(column) else 0
+    return records, len(chunk) - skipped, skipped
+
+class ShardWriter:
+    """Buffers position records and writes them as fixed-size .npy shards
+    
+    Each shard is written to a temporary name and renamed when complete, so
+    readers never see a partial shard. close() writes the last, short shard
+    and a manifest listing every shard.
+    """
+    def __init__(self, directory: str, prefix: str = 'positions',
+                 shard_size: int = DEFAULT_SHARD_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer = np.empty(shard_size, dtype=POSITION_DTYPE)
+        self.filled = 0
+        self.shards: List[dict] = []
+    
+    @property
+    def positions(self) -> int:
+        """Positions written so far, including the buffered ones"""
+        return sum(shard['positions'] for shard in self.shards) + self.filled
+    
+    def write(self, records: np.ndarray):
+        """Add records, writing out every shard that fills up"""
+        while len(records):
+            take = min(len(records), len(self.buffer) - self.filled)
+            self.buffer[self.filled:self.filled + take] = records[:take]
+            self.filled += take
+            records = records[take:]
+            if self.filled == len(self.buffer):
+                self.flush()
+    
+    def flush(self):
+        """Write the buffered records as a shard"""
+        if not self.filled:
+            return
+        name = f"{self.prefix}-{len(self.shards):05d}.npy"
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'wb') as f:
+            # A contiguous slice is written straight from the buffer
+            np.save(f, self.buffer[:self.filled])
+        os.replace(path + '.tmp', path)
+        self.shards.append({'file': name, 'positions': self.filled})
+        self.filled = 0
+    
+    def close(self):
+        """Flush the last shard and write the manifest"""
+        self.flush()
+        manifest = {
+            'dtype': [list(field) for field in POSITION_DTYPE.descr],
+            'piece_planes': list(PIECE_PLANES),
+            'shards': self.shards
+        }
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+def load_shards(directory: str) -> Iterator[np.ndarray]:
+    """Memory-map every shard listed in a directory's manifest"""
+    with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+        manifest = json.load(f)
+    for shard in manifest['shards']:
+        yield np.load(os.path.join(directory, shard['file']), mmap_mode='r')
+
+def unpack_planes(records: np.ndarray) -> np.ndarray:
+    """(N, 12, 8, 8) uint8 piece planes of records, row 0 being rank 8"""
+    planes = np.ascontiguousarray(records['planes'])
+    bits = np.unpackbits(planes.view(np.uint8), bitorder='little')
+    return bits.reshape(len(records), len(PIECE_PLANES), 8, 8)
+
+def export_features(paths: List[str], directory: str, workers: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, shard_size: int = DEFAULT_SHARD_SIZE,
+                    input_format: Optional[str] = None) -> dict:
+    """Replay every game in paths into position shards under directory
+    
+    Returns a summary with counts and throughput.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = itertools.chain.from_iterable(read_jobs(path, input_format) for path in paths)
+    chunks = chunked(enumerate(jobs), chunk_size)
+    writer = ShardWriter(directory, shard_size=shard_size)
+    
+    start = time.perf_counter()
+    games = skipped = 0
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor:
+            results = bounded_map(executor, extract_chunk, chunks, workers * CHUNKS_PER_WORKER)
+        else:
+            results = map(extract_chunk, chunks)
+        for records, chunk_games, chunk_skipped in results:
+            writer.write(records)
+            games += chunk_games
+            skipped += chunk_skipped
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    writer.close()
+    
+    seconds = time.perf_counter() - start
+    positions = writer.positions
+    return {
+        'games': games,
+        'skipped_games': skipped,
+        'positions': positions,
+        'shards': len(writer.shards),
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'positions_per_second': round(positions / seconds, 1) if seconds else None
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export game positions as packed feature shards")
+    parser.add_argument('inputs', nargs='+', help="PGN or UCI move-list files")
+    parser.add_argument('-o', '--output', required=True, help="shard directory")
+    parser.add_argument('-s', '--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help="positions per shard")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count, 1 runs in-process)")
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="games per task sent to a worker")
+    parser.add_argument('-f', '--format', choices=('pgn', 'uci'), default=None,
+                        help="input format (default: from the file extension)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1 or args.shard_size < 1:
+        parser.error("--chunk-size and --shard-size must be at least 1")
+    
+    summary = export_features(args.inputs, args.output, args.workers, args.chunk_size,
+                              args.shard_size, args.format)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
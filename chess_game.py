@@ -3,9 +3,10 @@ Chess Game Implementation
 A complete chess game with GUI using Python and Pygame
 """
 
+from array import array
 from enum import Enum
-from typing import List, Optional, Tuple, Dict
-import copy
+from typing import List, Optional, Sequence, Tuple, Dict
+from chess_metrics import timed
 
 class Color(Enum):
     WHITE = "white"
@@ -43,21 +44,264 @@ class Position:
     def to_algebraic(self) -> str:
         """Convert to algebraic notation (e.g., 'e4')"""
         return chr(ord('a') + self.col) + str(8 - self.row)
+    
+    @classmethod
+    def from_algebraic(cls, square: str) -> 'Position':
+        """Create a position from algebraic notation (e.g., 'e4')"""
+        square = square.strip().lower()
+        if len(square) != 2 or square[0] not in 'abcdefgh' or square[1] not in '12345678':
+            raise ValueError(f"'{square}' is not a valid square")
+        return cls(8 - int(square[1]), ord(square[0]) - ord('a'))
+
+# Symbols used for board display, keyed by piece type
+PIECE_SYMBOLS = {
+    PieceType.PAWN: 'P',
+    PieceType.ROOK: 'R',
+    PieceType.KNIGHT: 'N',
+    PieceType.BISHOP: 'B',
+    PieceType.QUEEN: 'Q',
+    PieceType.KING: 'K'
+}
+
+UNICODE_SYMBOLS = {
+    Color.WHITE: {
+        PieceType.PAWN: '♙',
+        PieceType.ROOK: '♖',
+        PieceType.KNIGHT: '♘',
+        PieceType.BISHOP: '♗',
+        PieceType.QUEEN: '♕',
+        PieceType.KING: '♔'
+    },
+    Color.BLACK: {
+        PieceType.PAWN: '♟',
+        PieceType.ROOK: '♜',
+        PieceType.KNIGHT: '♞',
+        PieceType.BISHOP: '♝',
+        PieceType.QUEEN: '♛',
+        PieceType.KING: '♚'
+    }
+}
+
+# Compact piece codes: the piece type in the low three bits, plus
+# BLACK_FLAG for black pieces; 0 is an empty square
+PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, KING_CODE = range(1, 7)
+TYPE_MASK = 7
+BLACK_FLAG = 8
+
+PIECE_CODES = {
+    PieceType.PAWN: PAWN_CODE,
+    PieceType.KNIGHT: KNIGHT_CODE,
+    PieceType.BISHOP: BISHOP_CODE,
+    PieceType.ROOK: ROOK_CODE,
+    PieceType.QUEEN: QUEEN_CODE,
+    PieceType.KING: KING_CODE
+}
+CODE_TYPES = (None,) + tuple(PIECE_CODES)
+COLOR_FLAGS = {Color.WHITE: 0, Color.BLACK: BLACK_FLAG}
+FLAG_COLORS = {0: Color.WHITE, BLACK_FLAG: Color.BLACK}
+
+# Material values in centipawns, by piece type code
+PIECE_VALUES = {
+    PAWN_CODE: 100,
+    KNIGHT_CODE: 320,
+    BISHOP_CODE: 330,
+    ROOK_CODE: 500,
+    QUEEN_CODE: 900,
+    KING_CODE: 0
+}
+
+# Piece order for has_legal_move(): cheapest and likeliest moves first
+MOVE_SEARCH_ORDER = (KING_CODE, PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE)
+
+# Castling rights bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = 15
+
+# Rights kept when a move starts or ends on a square: moving a king or
+# rook, or capturing a rook on its home square, gives up castling
+CASTLING_KEEP = bytearray([ALL_CASTLING] * 64)
+CASTLING_KEEP[0] &= ~BLACK_QUEENSIDE
+CASTLING_KEEP[4] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[7] &= ~BLACK_KINGSIDE
+CASTLING_KEEP[56] &= ~WHITE_QUEENSIDE
+CASTLING_KEEP[60] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEEP[63] &= ~WHITE_KINGSIDE
+
+# Rook (from, to) squares of a castling move, by the king's target square
+CASTLING_ROOK_MOVES = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# Piece type codes a pawn may promote to
+PROMOTION_CODES = (QUEEN_CODE, ROOK_CODE, BISHOP_CODE, KNIGHT_CODE)
+
+# Move ordering priorities of ordered_moves(): captures (by MVV-LVA) and
+# promotions, then checks, then killer moves, then quiet moves by their
+# history score, which is capped below the killers. A capture that loses
+# material in the exchange scores CAPTURE_PRIORITY plus that (negative)
+# exchange value, after the other captures.
+CAPTURE_PRIORITY = 100000
+CHECK_PRIORITY = 60000
+KILLER_PRIORITY = 50000
+HISTORY_LIMIT = 40000
+
+# Value of a king in an exchange: more than anything it could win, so a
+# king only captures when the square is no longer defended
+KING_EXCHANGE_VALUE = 20000
+# How each piece code attacks a square from each of its QUEEN_RAYS
+# directions (four rook directions, then four bishop ones): 2 from any
+# distance, 1 only from the adjacent square (kings, and pawns on the two
+# diagonals they capture along), 0 not at all
+EXCHANGE_ATTACKS = tuple(
+    bytes(
+        2 if code & TYPE_MASK in ((ROOK_CODE, QUEEN_CODE) if direction < 4 else (BISHOP_CODE, QUEEN_CODE))
+        else 1 if code & TYPE_MASK == KING_CODE or (
+            code & TYPE_MASK == PAWN_CODE and direction in ((6, 7) if code & BLACK_FLAG else (4, 5)))
+        else 0
+        for code in range(16)
+    )
+    for direction in range(8)
+)
+
+# Display symbols indexed by piece code
+_ASCII_BY_CODE = '.' + ''.join(PIECE_SYMBOLS[t] for t in PIECE_CODES) + '..' + \
+    ''.join(PIECE_SYMBOLS[t].lower() for t in PIECE_CODES) + '.'
+_ASCII_TABLE = bytes.maketrans(bytes(range(16)), _ASCII_BY_CODE.encode('ascii'))
+_UNICODE_BY_CODE = ('.',) + tuple(UNICODE_SYMBOLS[Color.WHITE][t] for t in PIECE_CODES) + \
+    ('.', '.') + tuple(UNICODE_SYMBOLS[Color.BLACK][t] for t in PIECE_CODES) + ('.',)
+
+# Piece classes by type, filled in as chess_pieces defines them
+PIECE_CLASSES: Dict[PieceType, type] = {}
+
+def square_index(position: Position) -> int:
+    """Index of a position in ChessBoard.squares (a8 = 0, h1 = 63)"""
+    return position.row * 8 + position.col
+
+def piece_from_code(code: int, position: Position) -> 'Piece':
+    """Piece object for a piece code standing on position"""
+    piece_class = PIECE_CLASSES[CODE_TYPES[code & TYPE_MASK]]
+    return piece_class(FLAG_COLORS[code & BLACK_FLAG], position)
+
+# Move words of MoveHistory: from square (bits 0-5), to square (6-11),
+# moving piece code (12-15), captured piece code (16-19), promotion piece
+# type code (20-22) and the move flags. An en passant capture implies the
+# captured pawn (beside the from square, on the to square's file), and
+# castling implies the rook move of CASTLING_ROOK_MOVES.
+MOVE_EN_PASSANT = 1 << 23
+MOVE_CASTLING = 1 << 24
+PROMOTION_SHIFT = 20
+
+# Undo words: castling rights (bits 0-3), en passant target square index
+# plus one (4-10, 0 for none) and the halfmove clock (11-31)
+UNDO_EN_PASSANT_SHIFT = 4
+UNDO_CLOCK_SHIFT = 11
+
+class MoveHistory:
+    """The moves played on a board, packed into two 32-bit words per move
+    
+    One array holds the moves and a parallel one the state each move
+    destroyed (castling rights, en passant target, halfmove clock), so a
+    long game costs 8 bytes per ply plus its SAN text instead of a dict of
+    objects. Indexing, iterating and pop() decode moves on demand into the
+    dicts the rest of the code reads ('from', 'to', 'piece', 'captured',
+    'promotion', 'en_passant_target', 'halfmove_clock', 'castling', 'san').
+    """
+    __slots__ = ('moves', 'undo', 'san')
+    
+    def __init__(self):
+        self.moves = array('I')
+        self.undo = array('I')
+        # SAN of each move, None until rendered
+        self.san: List[Optional[str]] = []
+    
+    def __len__(self) -> int:
+        return len(self.moves)
+    
+    def __getitem__(self, index: int) -> Dict:
+        return self._decode(self.moves[index], self.undo[index], self.san[index])
+    
+    def __iter__(self):
+        for move, undo, san in zip(self.moves, self.undo, self.san):
+            yield self._decode(move, undo, san)
+    
+    def __deepcopy__(self, memo):
+        history = MoveHistory()
+        history.moves = array('I', self.moves)
+        history.undo = array('I', self.undo)
+        history.san = list(self.san)
+        return history
+    
+    def record(self, from_index: int, to_index: int, code: int, captured: int, flags: int,
+               castling: int, en_passant_index: int, halfmove_clock: int):
+        """Append a move and the state needed to take it back"""
+        self.moves.append(from_index | to_index << 6 | code << 12 | captured << 16 | flags)
+        self.undo.append(castling | (en_passant_index + 1) << UNDO_EN_PASSANT_SHIFT |
+                         halfmove_clock << UNDO_CLOCK_SHIFT)
+        self.san.append(None)
+    
+    def pop(self) -> Dict:
+        """Remove and decode the last move"""
+        return self._decode(self.moves.pop(), self.undo.pop(), self.san.pop())
+    
+    @staticmethod
+    def _decode(move: int, undo: int, san: Optional[str]) -> Dict:
+        en_passant = (undo >> UNDO_EN_PASSANT_SHIFT & 127) - 1
+        return {
+            'from': Position(move >> 3 & 7, move & 7),
+            'to': Position(move >> 9 & 7, move >> 6 & 7),
+            'piece': move >> 12 & 15,
+            'captured': move >> 16 & 15,
+            'promotion': CODE_TYPES[move >> PROMOTION_SHIFT & TYPE_MASK],
+            'en_passant': bool(move & MOVE_EN_PASSANT),
+            'castling_move': bool(move & MOVE_CASTLING),
+            'en_passant_target': Position(en_passant >> 3, en_passant & 7) if en_passant >= 0 else None,
+            'halfmove_clock': undo >> UNDO_CLOCK_SHIFT,
+            'castling': undo & ALL_CASTLING,
+            'san': san
+        }
 
 class Piece:
-    """Base class for all chess pieces"""
+    """Base class for all chess pieces
+    
+    Pieces are a thin facade: the board stores only a piece code per
+    square, and get_piece() creates Piece objects on demand for the GUI and
+    console. Two pieces are equal when they are the same kind of piece on
+    the same square.
+    """
+    __slots__ = ('color', 'position')
+    piece_type: Optional[PieceType] = None
+    
     def __init__(self, color: Color, position: Position):
         self.color = color
         self.position = position
-        self.has_moved = False
-        self.piece_type = None
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.piece_type is not None:
+            PIECE_CLASSES[cls.piece_type] = cls
+    
+    def __eq__(self, other):
+        if not isinstance(other, Piece):
+            return False
+        return (self.piece_type == other.piece_type and self.color == other.color and
+                self.position == other.position)
+    
+    def __hash__(self):
+        return hash((self.piece_type, self.color, self.position.row, self.position.col))
     
     def __str__(self):
         return f"{self.color.value} {self.piece_type.value if self.piece_type else 'piece'}"
     
+    @property
+    def code(self) -> int:
+        """Compact code of this piece, as stored on the board"""
+        return PIECE_CODES[self.piece_type] | COLOR_FLAGS[self.color]
+    
     def get_possible_moves(self, board) -> List[Position]:
         """Get all possible moves for this piece"""
-        raise NotImplementedError("Subclasses must implement get_possible_moves")
+        from chess_pieces import possible_moves
+        return possible_moves(board, square_index(self.position), self.code)
     
     def is_valid_move(self, target: Position, board) -> bool:
         """Check if a move to target position is valid"""
@@ -67,250 +311,671 @@ class Piece:
     def move_to(self, target: Position):
         """Move piece to target position"""
         self.position = target
-        self.has_moved = True
 
 class ChessBoard:
-    """Represents the chess board and manages piece positions"""
+    """Represents the chess board and manages piece positions
+    
+    The position is a 64-byte array of piece codes indexed by square_index(),
+    a castling rights bit mask and the king squares; get_piece() and the
+    board property give Piece objects for code that wants them.
+    
+    The moves played are kept packed in a MoveHistory, which also holds
+    what undoing each one needs.
+    
+    Checks and pins against each king are tracked from the squares set_code()
+    changes: only the king rays through a changed square are rescanned. The
+    legal moves of the side to move are cached until the position changes.
+    """
+    __slots__ = ('squares', 'castling', 'king_squares', 'current_player', 'move_history',
+                 'captured_pieces', 'en_passant_target', 'halfmove_clock', 'fullmove_number',
+                 '_piece_string', '_changes', '_seen', '_tracked_kings', '_rays', '_checks',
+                 '_legal_moves')
+    
     def __init__(self):
-        self.board: List[List[Optional[Piece]]] = [[None for _ in range(8)] for _ in range(8)]
+        self.squares = bytearray(64)
+        self.castling = 0
+        # King square indices, white then black
+        self.king_squares = bytearray((60, 4))
         self.current_player = Color.WHITE
-        self.move_history: List[Dict] = []
-        self.captured_pieces: Dict[Color, List[Piece]] = {Color.WHITE: [], Color.BLACK: []}
-        self.king_positions = {Color.WHITE: Position(7, 4), Color.BLACK: Position(0, 4)}
+        self.move_history = MoveHistory()
+        # Codes of the pieces each color has captured
+        self.captured_pieces: Dict[Color, bytearray] = {Color.WHITE: bytearray(), Color.BLACK: bytearray()}
         self.en_passant_target: Optional[Position] = None
-        
+        # Plies since the last capture or pawn move, and the FEN move number
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self._piece_string: Optional[str] = None
+        # Squares changed by set_code(), and per color (white, black) how
+        # many of them its checks have seen (-1: rescan everything)
+        self._changes: List[int] = []
+        self._seen = [-1, -1]
+        # Per color: the king square the rays were scanned from, the
+        # scan_king_ray() result of each direction, and the resulting
+        # ([(checker, line)], {pinned: line}) pair
+        self._tracked_kings = bytearray(2)
+        self._rays: List[list] = [[], []]
+        self._checks: List[tuple] = [([], {}), ([], {})]
+        # ((side to move, en passant target, castling), moves by from square)
+        self._legal_moves: Optional[tuple] = None
+    
+    @property
+    def board(self) -> List[List[Optional[Piece]]]:
+        """The position as an 8x8 grid of Piece objects (a copy)"""
+        return [[self.get_piece(Position(row, col)) for col in range(8)] for row in range(8)]
+    
+    @property
+    def king_positions(self) -> Dict[Color, Position]:
+        """King positions by color"""
+        return {
+            color: Position(*divmod(self.king_squares[flag >> 3], 8))
+            for color, flag in COLOR_FLAGS.items()
+        }
+    
     def get_piece(self, position: Position) -> Optional[Piece]:
         """Get piece at given position"""
         if not position.is_valid():
             return None
-        return self.board[position.row][position.col]
+        code = self.squares[position.row * 8 + position.col]
+        return piece_from_code(code, position) if code else None
     
     def set_piece(self, position: Position, piece: Optional[Piece]):
         """Set piece at given position"""
         if position.is_valid():
-            self.board[position.row][position.col] = piece
-            if piece:
-                piece.position = position
+            self.set_code(position.row * 8 + position.col, piece.code if piece else 0)
+    
+    def set_code(self, index: int, code: int):
+        """Set the piece code of a square, keeping the king squares current"""
+        self.squares[index] = code
+        self._piece_string = None
+        self._legal_moves = None
+        self._changes.append(index)
+        if code & TYPE_MASK == KING_CODE:
+            self.king_squares[code >> 3] = index
     
     def remove_piece(self, position: Position) -> Optional[Piece]:
         """Remove and return piece at given position"""
         piece = self.get_piece(position)
         if piece:
-            self.board[position.row][position.col] = None
+            self.set_code(position.row * 8 + position.col, 0)
         return piece
     
+    def clear(self):
+        """Remove all pieces and castling rights"""
+        self.squares = bytearray(64)
+        self.castling = 0
+        self.en_passant_target = None
+        self._changes = []
+        self.invalidate_caches()
+    
+    def invalidate_caches(self):
+        """Drop the cached checks, legal moves and piece string
+        
+        They are rebuilt from the squares when next needed; the benchmarks
+        call this to time that work rather than a cache lookup.
+        """
+        self._piece_string = None
+        self._seen = [-1, -1]
+        self._legal_moves = None
+    
     def is_empty(self, position: Position) -> bool:
         """Check if position is empty"""
-        return self.get_piece(position) is None
+        return not position.is_valid() or not self.squares[position.row * 8 + position.col]
     
     def is_enemy_piece(self, position: Position, color: Color) -> bool:
         """Check if position contains an enemy piece"""
-        piece = self.get_piece(position)
-        return piece is not None and piece.color != color
+        if not position.is_valid():
+            return False
+        code = self.squares[position.row * 8 + position.col]
+        return code != 0 and code & BLACK_FLAG != COLOR_FLAGS[color]
     
     def is_friendly_piece(self, position: Position, color: Color) -> bool:
         """Check if position contains a friendly piece"""
-        piece = self.get_piece(position)
-        return piece is not None and piece.color == color
+        if not position.is_valid():
+            return False
+        code = self.squares[position.row * 8 + position.col]
+        return code != 0 and code & BLACK_FLAG == COLOR_FLAGS[color]
     
     def get_all_pieces(self, color: Color) -> List[Piece]:
         """Get all pieces of given color"""
-        pieces = []
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    pieces.append(piece)
-        return pieces
+        flag = COLOR_FLAGS[color]
+        return [
+            piece_from_code(code, Position(index >> 3, index & 7))
+            for index, code in enumerate(self.squares)
+            if code and code & BLACK_FLAG == flag
+        ]
     
+    @timed('is_in_check')
     def is_in_check(self, color: Color) -> bool:
         """Check if the king of given color is in check"""
-        king_pos = self.king_positions[color]
-        enemy_color = Color.BLACK if color == Color.WHITE else Color.WHITE
+        return bool(self._tracked_checks(COLOR_FLAGS[color])[0])
+    
+    def get_checkers(self, color: Color) -> List[Position]:
+        """Positions of the pieces giving check to the king of given color"""
+        return [Position(*divmod(square, 8)) for square, _ in self._tracked_checks(COLOR_FLAGS[color])[0]]
+    
+    def get_pinned_pieces(self, color: Color) -> List[Position]:
+        """Positions of the pieces of given color pinned to their king"""
+        return [Position(*divmod(square, 8)) for square in self._tracked_checks(COLOR_FLAGS[color])[1]]
+    
+    def _tracked_checks(self, flag: int) -> Tuple[List[Tuple[int, Tuple[int, ...]]], Dict[int, Tuple[int, ...]]]:
+        """([(checker, line)], {pinned: line}) for the king of a color flag"""
+        side = flag >> 3
+        if self._seen[side] != len(self._changes):
+            self._update_checks(flag)
+        return self._checks[side]
+    
+    def _update_checks(self, flag: int):
+        """Rescan the king rays affected by the squares changed since the last update
         
-        # Check if any enemy piece can attack the king
-        for piece in self.get_all_pieces(enemy_color):
-            if king_pos in piece.get_possible_moves(self):
-                return True
-        return False
+        A ray's check or pin can only change when a square on it changed, so
+        just those rays are rescanned; a king that moved (or a cleared board)
+        gets all eight.
+        """
+        from chess_pieces import scan_king_ray, knight_checkers
+        from chess_tables import RAY_DIRECTIONS
+        squares = self.squares
+        changes = self._changes
+        side = flag >> 3
+        king = self.king_squares[side]
+        rays = self._rays[side]
+        seen = self._seen[side]
+        if seen < 0 or king != self._tracked_kings[side]:
+            rays[:] = [scan_king_ray(squares, king, flag, direction) for direction in range(8)]
+            self._tracked_kings[side] = king
+        else:
+            directions = RAY_DIRECTIONS[king]
+            for direction in {directions[square] for square in changes[seen:]}:
+                if direction >= 0:
+                    rays[direction] = scan_king_ray(squares, king, flag, direction)
+        
+        checks = [(square, (square,)) for square in knight_checkers(squares, king, flag)]
+        pins = {}
+        for checker, pinned, line in rays:
+            if checker >= 0:
+                checks.append((checker, line))
+            elif pinned >= 0:
+                pins[pinned] = line
+        self._checks[side] = (checks, pins)
+        
+        # Drop the changes once both colors have seen them
+        if self._seen[side ^ 1] == len(changes):
+            changes.clear()
+            self._seen = [0, 0]
+        else:
+            self._seen[side] = len(changes)
+    
+    def _leaves_king_safe(self, from_index: int, to_index: int, code: int) -> bool:
+        """Whether moving the piece code from from_index to to_index keeps its king safe
+        
+        Uses the tracked checks and pins: outside check an unpinned piece may
+        go anywhere and a pinned one only along its pin; in check it must
+        also capture or block the single checker. King moves and en passant
+        (which can uncover a check along the rank) are tried on the board.
+        """
+        flag = code & BLACK_FLAG
+        piece_code = code & TYPE_MASK
+        if piece_code == KING_CODE:
+            return not self._would_be_in_check(from_index, to_index, flag)
+        if piece_code == PAWN_CODE and self.en_passant_target:
+            target = self.en_passant_target
+            if to_index == target.row * 8 + target.col:
+                return not self._would_be_in_check(from_index, to_index, flag)
+        
+        checks, pins = self._tracked_checks(flag)
+        if checks and (len(checks) > 1 or to_index not in checks[0][1]):
+            return False
+        line = pins.get(from_index)
+        return line is None or to_index in line
     
     def would_be_in_check(self, move_from: Position, move_to: Position, color: Color) -> bool:
         """Check if making a move would put the king in check"""
-        # Create a copy of the board state
-        original_piece = self.get_piece(move_from)
-        captured_piece = self.get_piece(move_to)
+        return self._would_be_in_check(square_index(move_from), square_index(move_to),
+                                       COLOR_FLAGS[color])
+    
+    def _would_be_in_check(self, from_index: int, to_index: int, flag: int) -> bool:
+        """would_be_in_check() on square indices and a color flag"""
+        from chess_pieces import is_attacked
+        squares = self.squares
         
-        # Make the move temporarily
-        self.set_piece(move_to, original_piece)
-        self.set_piece(move_from, None)
+        # Make the move temporarily (the cached piece string stays valid,
+        # since the board is restored before returning)
+        moving = squares[from_index]
+        captured = squares[to_index]
+        squares[to_index] = moving
+        squares[from_index] = 0
         
-        # Update king position if king moved
-        if original_piece.piece_type == PieceType.KING:
-            old_king_pos = self.king_positions[color]
-            self.king_positions[color] = move_to
+        # An en passant capture also empties the captured pawn's square,
+        # which can open a line to the king along the rank
+        passed_index = -1
+        target = self.en_passant_target
+        if (moving & TYPE_MASK == PAWN_CODE and target and
+                to_index == target.row * 8 + target.col):
+            passed_index = (from_index & ~7) | (to_index & 7)
+            passed = squares[passed_index]
+            squares[passed_index] = 0
         
-        # Check if in check
-        in_check = self.is_in_check(color)
+        king_index = to_index if moving & TYPE_MASK == KING_CODE else self.king_squares[flag >> 3]
+        in_check = is_attacked(self, king_index, flag ^ BLACK_FLAG)
         
         # Restore the board state
-        self.set_piece(move_from, original_piece)
-        self.set_piece(move_to, captured_piece)
-        
-        # Restore king position if king moved
-        if original_piece.piece_type == PieceType.KING:
-            self.king_positions[color] = move_from
-        
+        squares[from_index] = moving
+        squares[to_index] = captured
+        if passed_index >= 0:
+            squares[passed_index] = passed
         return in_check
     
+    @timed('get_valid_moves')
     def get_valid_moves(self, piece: Piece) -> List[Position]:
         """Get all valid moves for a piece (excluding moves that would put king in check)"""
-        from chess_pieces import King
+        from chess_pieces import possible_moves, castling_moves
         
-        # Get possible moves
-        if isinstance(piece, King):
-            # For kings, get moves including castling
-            possible_moves = piece.get_possible_moves_with_castling(self)
-        else:
-            possible_moves = piece.get_possible_moves(self)
+        index = square_index(piece.position)
+        code = piece.code
+        if piece.color == self.current_player and self.squares[index] == code:
+            return list(self.legal_moves().get(index, ()))
+        
+        possible = possible_moves(self, index, code)
+        if code & TYPE_MASK == KING_CODE:
+            # For kings, add castling
+            possible += castling_moves(self, index, code)
+        
+        return [
+            move for move in possible
+            if not self.would_be_in_check(piece.position, move, piece.color)
+        ]
+    
+    def legal_moves(self) -> Dict[int, List[Position]]:
+        """Legal moves of the side to move, by from square index
+        
+        Computed once per position and cached until the next change, so
+        repeated selections and status checks cost a lookup. Do not modify
+        the returned lists.
+        """
+        from chess_pieces import possible_moves, castling_moves
+        key = (self.current_player, self.en_passant_target, self.castling)
+        if self._legal_moves is None or self._legal_moves[0] != key:
+            flag = COLOR_FLAGS[self.current_player]
+            moves = {}
+            for index, code in enumerate(self.squares):
+                if not code or code & BLACK_FLAG != flag:
+                    continue
+                targets = possible_moves(self, index, code)
+                if code & TYPE_MASK == KING_CODE:
+                    targets += castling_moves(self, index, code)
+                legal = [
+                    target for target in targets
+                    if self._leaves_king_safe(index, target.row * 8 + target.col, code)
+                ]
+                if legal:
+                    moves[index] = legal
+            self._legal_moves = (key, moves)
+        return self._legal_moves[1]
+    
+    def ordered_moves(self, killers: Sequence[Tuple[int, int]] = (),
+                      history: Optional[Sequence[int]] = None,
+                      replies: bool = True) -> List[Tuple[int, int, int]]:
+        """Legal moves of the side to move, most promising first
+        
+        Returns (from index, to index, priority) triples. Captures rank by
+        most valuable victim, then least valuable attacker, alongside
+        promotions (scored as queen promotions); then come moves giving
+        check, the killer moves, and the other quiet moves by
+        history[from * 64 + to]. Captures of a cheaper piece that lose
+        material in the exchange (see()) move behind the other captures.
+        Ties keep generation order.
+        
+        With replies False, for moves whose replies will not be looked at,
+        neither checks nor exchanges are tested: they change nothing then.
+        """
+        squares = self.squares
+        target = self.en_passant_target
+        en_passant = target.row * 8 + target.col if target else -1
+        scored = []
+        for from_index, targets in self.legal_moves().items():
+            code = squares[from_index]
+            piece_code = code & TYPE_MASK
+            attacker = PIECE_VALUES[piece_code]
+            for position in targets:
+                to_index = position.row * 8 + position.col
+                victim = squares[to_index]
+                priority = 0
+                if victim:
+                    value = PIECE_VALUES[victim & TYPE_MASK]
+                    priority = CAPTURE_PRIORITY + 10 * value - attacker
+                    if replies and value < attacker:
+                        exchange = self.see(from_index, to_index)
+                        if exchange < 0:
+                            priority = CAPTURE_PRIORITY + exchange
+                elif piece_code == PAWN_CODE and to_index == en_passant:
+                    priority = CAPTURE_PRIORITY + 10 * PIECE_VALUES[PAWN_CODE] - attacker
+                if piece_code == PAWN_CODE and (to_index < 8 or to_index >= 56):
+                    priority += (0 if priority else CAPTURE_PRIORITY) + PIECE_VALUES[QUEEN_CODE]
+                if not priority:
+                    if replies and self._gives_check(from_index, to_index, code):
+                        priority = CHECK_PRIORITY
+                    elif (from_index, to_index) in killers:
+                        priority = KILLER_PRIORITY
+                    elif history is not None:
+                        priority = min(history[from_index * 64 + to_index], HISTORY_LIMIT)
+                scored.append((from_index, to_index, priority))
+        scored.sort(key=lambda move: -move[2])
+        return scored
+    
+    def see(self, from_index: int, to_index: int) -> int:
+        """Static exchange evaluation of the capture from from_index to to_index
         
-        valid_moves = []
+        The material the moving side wins (negative: loses) in centipawns
+        if both sides then keep recapturing on to_index with their least
+        valuable piece, each stopping when recapturing would lose. A non-
+        capture scores what the moved piece risks. Pins and checks are
+        ignored, and promotions count as pawns.
+        """
+        squares = self.squares
+        victim = squares[to_index]
+        ignored = -1
+        if not victim and squares[from_index] & TYPE_MASK == PAWN_CODE:
+            target = self.en_passant_target
+            if target and to_index == target.row * 8 + target.col:
+                victim = PAWN_CODE
+                ignored = (from_index & ~7) | (to_index & 7)
+            else:
+                # A push: the pawn does not attack to_index, and pieces
+                # behind it on the file do once it has moved
+                ignored = from_index
+        return self._exchange(to_index, squares[from_index] & BLACK_FLAG, victim, from_index, ignored)
+    
+    def hanging_pieces(self, color: Color) -> List[Position]:
+        """Positions of the pieces of color the opponent wins material by capturing"""
+        flag = COLOR_FLAGS[color]
+        return [
+            Position(*divmod(index, 8)) for index, code in enumerate(self.squares)
+            if code and code & BLACK_FLAG == flag and code & TYPE_MASK != KING_CODE and
+            self._exchange(index, flag ^ BLACK_FLAG, code) > 0
+        ]
+    
+    def _exchange(self, to_index: int, flag: int, victim: int, from_index: int = -1,
+                  ignored: int = -1) -> int:
+        """Net gain of side flag from the exchange on to_index, capturing victim
         
-        for move in possible_moves:
-            if not self.would_be_in_check(piece.position, move, piece.color):
-                valid_moves.append(move)
+        The first capture is made from from_index, or by the least valuable
+        attacker when it is -1 (0 when there is none). The attackers are
+        collected once, as lines that each capture in order: a knight, or
+        the pieces of a ray from to_index that can attack along it, nearest
+        first, so taking the front one uncovers the next. ignored is a
+        square treated as empty; when it is from_index, the piece there
+        (a pushed pawn) starts on to_index without attacking it.
+        """
+        from chess_tables import KNIGHT_TARGETS, QUEEN_RAYS
+        squares = self.squares
+        lines = [[square] for square in KNIGHT_TARGETS[to_index]
+                 if squares[square] & TYPE_MASK == KNIGHT_CODE]
+        for direction, ray in enumerate(QUEEN_RAYS[to_index]):
+            attacks = EXCHANGE_ATTACKS[direction]
+            line = []
+            for square in ray:
+                code = squares[square]
+                if code and square != ignored:
+                    kind = attacks[code]
+                    if kind == 2 or (kind and square == ray[0]):
+                        line.append(square)
+                    else:
+                        break
+            if line:
+                lines.append(line)
         
-        return valid_moves
+        def take(side: int, first: int) -> int:
+            """Remove side's least valuable attacker (or the one on first), returning its value"""
+            best_value = 0
+            best = None
+            for line in lines:
+                if not line:
+                    continue
+                square = line[0]
+                code = squares[square]
+                if code & BLACK_FLAG != side or (first >= 0 and square != first):
+                    continue
+                value = PIECE_VALUES[code & TYPE_MASK] or KING_EXCHANGE_VALUE
+                if best is None or value < best_value:
+                    best_value, best = value, line
+            if best is not None:
+                del best[0]
+            return best_value
+        
+        if from_index >= 0 and from_index == ignored:
+            on_square = PIECE_VALUES[squares[from_index] & TYPE_MASK]
+        else:
+            on_square = take(flag, from_index)
+            if not on_square:
+                return 0
+        gains = [PIECE_VALUES[victim & TYPE_MASK] if victim else 0]
+        side = flag ^ BLACK_FLAG
+        while True:
+            value = take(side, -1)
+            if not value:
+                break
+            gains.append(on_square - gains[-1])
+            if on_square == KING_EXCHANGE_VALUE:
+                # A king captured into a defended square: the side will have
+                # stopped before that capture
+                break
+            on_square = value
+            side ^= BLACK_FLAG
+        # Each side either stops or recaptures, whichever is better for it
+        for depth in range(len(gains) - 1, 0, -1):
+            gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+        return gains[0]
+    
+    def _gives_check(self, from_index: int, to_index: int, code: int) -> bool:
+        """Whether the quiet move of code from from_index to to_index checks the other king"""
+        from chess_pieces import is_attacked
+        squares = self.squares
+        flag = code & BLACK_FLAG
+        rook_from = rook_to = -1
+        if code & TYPE_MASK == KING_CODE and abs(to_index - from_index) == 2:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_index]
+            squares[rook_to] = squares[rook_from]
+            squares[rook_from] = 0
+        squares[to_index] = code
+        squares[from_index] = 0
+        gives_check = is_attacked(self, self.king_squares[(flag >> 3) ^ 1], flag)
+        squares[from_index] = code
+        squares[to_index] = 0
+        if rook_from >= 0:
+            squares[rook_from] = squares[rook_to]
+            squares[rook_to] = 0
+        return gives_check
     
-    def make_move(self, from_pos: Position, to_pos: Position) -> bool:
-        """Make a move on the board"""
-        piece = self.get_piece(from_pos)
-        if not piece or piece.color != self.current_player:
+    def is_legal(self, from_pos: Position, to_pos: Position) -> bool:
+        """Check whether the side to move may play from_pos to to_pos
+        
+        Verifies just this move's geometry and king safety, without
+        generating the piece's other moves.
+        """
+        from chess_pieces import can_reach
+        if not (from_pos.is_valid() and to_pos.is_valid()):
+            return False
+        from_index = square_index(from_pos)
+        to_index = square_index(to_pos)
+        code = self.squares[from_index]
+        flag = COLOR_FLAGS[self.current_player]
+        if not code or code & BLACK_FLAG != flag:
             return False
+        return (can_reach(self, from_index, to_index, code) and
+                self._leaves_king_safe(from_index, to_index, code))
+    
+    def has_legal_move(self, color: Color) -> bool:
+        """Check whether color has any legal move, stopping at the first one
         
-        valid_moves = self.get_valid_moves(piece)
-        if to_pos not in valid_moves:
+        Pieces are tried in a cheap-first order: the king (at most eight
+        steps, and the usual way out of check), then pawns and knights,
+        then the sliding pieces.
+        """
+        from chess_pieces import possible_moves, castling_moves
+        if color == self.current_player and self._legal_moves is not None:
+            return bool(self.legal_moves())
+        flag = COLOR_FLAGS[color]
+        squares = self.squares
+        for piece_code in MOVE_SEARCH_ORDER:
+            code = piece_code | flag
+            for from_index in range(64):
+                if squares[from_index] != code:
+                    continue
+                targets = possible_moves(self, from_index, code)
+                if piece_code == KING_CODE:
+                    targets += castling_moves(self, from_index, code)
+                for target in targets:
+                    if self._leaves_king_safe(from_index, target.row * 8 + target.col, code):
+                        return True
+        return False
+    
+    def make_move(self, from_pos: Position, to_pos: Position,
+                  promotion: Optional[PieceType] = None) -> bool:
+        """Make a move on the board, including the rook of a castling move,
+        the pawn taken en passant and the piece a pawn promotes to (a queen
+        unless promotion says otherwise)
+        """
+        if promotion is not None and PIECE_CODES.get(promotion) not in PROMOTION_CODES:
+            return False
+        if not self.is_legal(from_pos, to_pos):
             return False
         
         # Record the move
-        captured_piece = self.get_piece(to_pos)
-        move_record = {
-            'from': from_pos,
-            'to': to_pos,
-            'piece': piece,
-            'captured': captured_piece,
-            'en_passant_target': self.en_passant_target
-        }
+        from_index = square_index(from_pos)
+        to_index = square_index(to_pos)
+        code = self.squares[from_index]
+        captured = self.squares[to_index]
+        en_passant_target = self.en_passant_target
+        castling = self.castling
+        halfmove_clock = self.halfmove_clock
+        flags = 0
         
         # Handle captures
-        if captured_piece:
-            self.captured_pieces[self.current_player].append(captured_piece)
-        
-        # Handle en passant
-        if piece.piece_type == PieceType.PAWN and to_pos == self.en_passant_target:
-            # Remove the captured pawn
-            capture_row = to_pos.row + (1 if piece.color == Color.WHITE else -1)
-            captured_pawn = self.remove_piece(Position(capture_row, to_pos.col))
-            if captured_pawn:
-                self.captured_pieces[self.current_player].append(captured_pawn)
-        
-        # Make the move
-        self.set_piece(to_pos, piece)
-        self.set_piece(from_pos, None)
-        piece.move_to(to_pos)
-        
-        # Update king position
-        if piece.piece_type == PieceType.KING:
-            self.king_positions[piece.color] = to_pos
+        if captured:
+            self.captured_pieces[self.current_player].append(captured)
+        
+        piece_code = code & TYPE_MASK
+        is_pawn = piece_code == PAWN_CODE
+        if is_pawn and to_pos == en_passant_target:
+            flags = MOVE_EN_PASSANT
+            # Remove the pawn that passed, beside the capturing pawn
+            capture_index = (from_index & ~7) | (to_index & 7)
+            self.captured_pieces[self.current_player].append(self.squares[capture_index])
+            self.set_code(capture_index, 0)
+        elif piece_code == KING_CODE and abs(to_index - from_index) == 2:
+            flags = MOVE_CASTLING
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_index]
+            self.set_code(rook_to, self.squares[rook_from])
+            self.set_code(rook_from, 0)
+        
+        # Make the move (set_code also tracks the king squares)
+        moved = code
+        if is_pawn and to_pos.row in (0, 7):
+            promoted = PIECE_CODES[promotion] if promotion else QUEEN_CODE
+            flags |= promoted << PROMOTION_SHIFT
+            moved = promoted | (code & BLACK_FLAG)
+        self.set_code(to_index, moved)
+        self.set_code(from_index, 0)
+        self.castling &= CASTLING_KEEP[from_index] & CASTLING_KEEP[to_index]
         
         # Handle pawn double move for en passant
         self.en_passant_target = None
-        if (piece.piece_type == PieceType.PAWN and 
-            abs(to_pos.row - from_pos.row) == 2):
+        if is_pawn and abs(to_pos.row - from_pos.row) == 2:
             self.en_passant_target = Position(
                 (from_pos.row + to_pos.row) // 2, 
                 to_pos.col
             )
         
+        # Update the move clocks
+        if is_pawn or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.current_player == Color.BLACK:
+            self.fullmove_number += 1
+        
         # Record move and switch players
-        self.move_history.append(move_record)
+        self.move_history.record(
+            from_index, to_index, code, captured, flags, castling,
+            square_index(en_passant_target) if en_passant_target else -1, halfmove_clock
+        )
         self.current_player = Color.BLACK if self.current_player == Color.WHITE else Color.WHITE
         
         return True
     
+    def undo_move(self) -> Optional[Dict]:
+        """Take back the last move, returning it decoded (None if there is none)"""
+        if not self.move_history:
+            return None
+        move = self.move_history.pop()
+        code = move['piece']
+        color = FLAG_COLORS[code & BLACK_FLAG]
+        from_index = square_index(move['from'])
+        to_index = square_index(move['to'])
+        
+        # Put the piece back (as the pawn it was, after a promotion) and
+        # restore what it captured
+        self.set_code(from_index, code)
+        self.set_code(to_index, move['captured'])
+        if move['en_passant']:
+            self.set_code((from_index & ~7) | (to_index & 7), PAWN_CODE | (code & BLACK_FLAG ^ BLACK_FLAG))
+        elif move['castling_move']:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_index]
+            self.set_code(rook_from, self.squares[rook_to])
+            self.set_code(rook_to, 0)
+        if move['captured'] or move['en_passant']:
+            self.captured_pieces[color].pop()
+        
+        # Restore castling rights, en passant target, move clocks and turn
+        self.castling = move['castling']
+        self.en_passant_target = move['en_passant_target']
+        self.halfmove_clock = move['halfmove_clock']
+        if color == Color.BLACK:
+            self.fullmove_number -= 1
+        self.current_player = color
+        return move
+    
     def setup_initial_position(self):
         """Set up the initial chess position"""
         # Clear the board
-        self.board = [[None for _ in range(8)] for _ in range(8)]
+        self.clear()
         
         # We'll implement piece classes next and then set up the initial position
         pass
 
+    def to_piece_string(self) -> str:
+        """64-character board string (rank 8 to rank 1, '.' for empty squares)
+        
+        The string is cached until the next set_piece/remove_piece call, so
+        repeated serialization of an unchanged position is free.
+        """
+        if self._piece_string is None:
+            self._piece_string = self.squares.translate(_ASCII_TABLE).decode('ascii')
+        return self._piece_string
+    
     def __str__(self):
         """String representation of the board"""
-        result = "  a b c d e f g h\n"
-        for row in range(8):
-            result += f"{8-row} "
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece:
-                    symbol = self.get_piece_symbol(piece)
-                    result += f"{symbol} "
-                else:
-                    result += ". "
-            result += f"{8-row}\n"
-        result += "  a b c d e f g h"
-        return result
+        return self._format_board(self.to_piece_string())
     
     def to_unicode_string(self):
         """Unicode string representation of the board for web display"""
-        result = "  a b c d e f g h\n"
+        symbols = ''.join(_UNICODE_BY_CODE[code] for code in self.squares)
+        return self._format_board(symbols)
+    
+    @staticmethod
+    def _format_board(symbols: str) -> str:
+        """Lay out 64 square symbols as a labelled 8x8 grid"""
+        lines = ["  a b c d e f g h"]
         for row in range(8):
-            result += f"{8-row} "
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece:
-                    symbol = self.get_piece_symbol(piece, use_unicode=True)
-                    result += f"{symbol} "
-                else:
-                    result += ". "
-            result += f"{8-row}\n"
-        result += "  a b c d e f g h"
-        return result
+            rank = str(8 - row)
+            lines.append(f"{rank} {' '.join(symbols[row * 8:row * 8 + 8])} {rank}")
+        lines.append("  a b c d e f g h")
+        return "\n".join(lines)
 
     def get_piece_symbol(self, piece: Piece, use_unicode: bool = False) -> str:
         """Get symbol for piece display with Unicode option"""
         if use_unicode:
             # Unicode chess piece symbols for web display
-            white_symbols = {
-                PieceType.PAWN: '♙',
-                PieceType.ROOK: '♖',
-                PieceType.KNIGHT: '♘',
-                PieceType.BISHOP: '♗',
-                PieceType.QUEEN: '♕',
-                PieceType.KING: '♔'
-            }
-            black_symbols = {
-                PieceType.PAWN: '♟',
-                PieceType.ROOK: '♜',
-                PieceType.KNIGHT: '♞',
-                PieceType.BISHOP: '♝',
-                PieceType.QUEEN: '♛',
-                PieceType.KING: '♚'
-            }
-            
-            if piece.color == Color.WHITE:
-                return white_symbols.get(piece.piece_type, '?')
-            else:
-                return black_symbols.get(piece.piece_type, '?')
-        else:
-            # ASCII symbols for console compatibility
-            symbols = {
-                PieceType.PAWN: 'P',
-                PieceType.ROOK: 'R',
-                PieceType.KNIGHT: 'N',
-                PieceType.BISHOP: 'B',
-                PieceType.QUEEN: 'Q',
-                PieceType.KING: 'K'
-            }
-            symbol = symbols.get(piece.piece_type, '?')
-            return symbol if piece.color == Color.WHITE else symbol.lower()
\ No newline at end of file
+            return UNICODE_SYMBOLS[piece.color].get(piece.piece_type, '?')
+        # ASCII symbols for console compatibility
+        symbol = PIECE_SYMBOLS.get(piece.piece_type, '?')
+        return symbol if piece.color == Color.WHITE else symbol.lower()
\ No newline at end of file
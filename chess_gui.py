@@ -1,17 +1,35 @@
 """
 Chess GUI using Pygame
 Provides a graphical interface for the chess game
+
+By default only the parts of the window that changed are redrawn: the board
+and highlight surfaces are rendered once, each frame compares the square
+contents with the last frame, and pygame.display.update() gets just the
+changed rectangles. Press F for a frame-time overlay, H for move hints,
+which a background process computes (see chess_analysis.py) while the
+frame loop keeps running, along with the legal moves that the move
+highlights are drawn from, and A to shade the squares the opponent attacks
+(from the attack counts cached per position). For measurements the GUI
+runs headless on SDL's dummy driver:
+    
+    python chess_gui.py --benchmark 2000            # dirty rectangles
+    python chess_gui.py --benchmark 2000 --full-redraw
 """
 
 import pygame
+import argparse
+import json
+import random
 import sys
 import os
+import time
+from collections import deque
+from chess_analysis import AnalysisWorker
 from chess_mechanics import ChessGame, GameState
-from chess_game import Position, Color, PieceType
-from typing import Tuple, Optional
-
-# Initialize Pygame
-pygame.init()
+from chess_game import Position, Color, PieceType, PIECE_CODES, COLOR_FLAGS, BLACK_FLAG, square_index
+from chess_pieces import attack_counts
+from chess_tables import SQUARES
+from typing import List, Tuple, Optional
 
 # Constants
 BOARD_SIZE = 640
@@ -27,17 +45,33 @@ HIGHLIGHT = (255, 255, 0, 128)
 VALID_MOVE = (0, 255, 0, 128)
 CHECK = (255, 0, 0, 128)
 SELECTED = (0, 0, 255, 128)
+# Attack overlay: squares the opponent attacks, and pieces of the side to
+# move attacked more often than they are defended
+ATTACKED = (255, 140, 0, 64)
+THREATENED = (255, 0, 255, 112)
 
 # UI Colors
 UI_BG = (50, 50, 50)
 UI_TEXT = (255, 255, 255)
 BUTTON_COLOR = (70, 70, 70)
 BUTTON_HOVER = (90, 90, 90)
+BACKGROUND = (255, 255, 255)
+OVERLAY_TEXT = (0, 0, 0)
+
+FPS = 60
+# Frames averaged by the frame-time overlay, and how often it is redrawn
+FRAME_SAMPLES = 120
+OVERLAY_INTERVAL = 0.5
+OVERLAY_RECT = pygame.Rect(0, BOARD_SIZE, BOARD_SIZE, WINDOW_HEIGHT - BOARD_SIZE)
+SIDEBAR_RECT = pygame.Rect(BOARD_SIZE, 0, SIDEBAR_WIDTH, WINDOW_HEIGHT)
 
 class ChessGUI:
     """Chess game GUI using Pygame"""
     
-    def __init__(self):
+    def __init__(self, dirty_rects: bool = True, show_frame_times: bool = False):
+        # Initialized here rather than on import: the analysis worker's
+        # spawned process imports this module too
+        pygame.init()
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("Python Chess Game")
         self.clock = pygame.time.Clock()
@@ -53,6 +87,48 @@ class ChessGUI:
         # UI Elements
         self.buttons = self._create_buttons()
         
+        # Pre-rendered surfaces shared by both rendering modes
+        self.board_surface = pygame.Surface((BOARD_SIZE, BOARD_SIZE))
+        self.draw_board(self.board_surface)
+        self.highlight_surfaces = {}
+        for color in (HIGHLIGHT, SELECTED, VALID_MOVE, CHECK, ATTACKED, THREATENED):
+            surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+            surface.fill(color)
+            self.highlight_surfaces[color] = surface
+        self.code_images = {
+            PIECE_CODES[piece_type] | COLOR_FLAGS[color]: image
+            for (color, piece_type), image in self.piece_images.items()
+        }
+        
+        # Dirty-rectangle rendering: the frame without the dragged piece is
+        # kept on a canvas, and each square's last drawn state is remembered
+        self.dirty_rects = dirty_rects
+        self.canvas = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.square_rects = [
+            pygame.Rect(index % 8 * SQUARE_SIZE, index // 8 * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+            for index in range(64)
+        ]
+        self.drawn_squares: Optional[List[tuple]] = None
+        self.drawn_key = None
+        self.sidebar_key = None
+        self.drag_rect: Optional[pygame.Rect] = None
+        
+        # Frame-time overlay
+        self.show_frame_times = show_frame_times
+        self.frame_times = deque(maxlen=FRAME_SAMPLES)
+        self.rect_counts = deque(maxlen=FRAME_SAMPLES)
+        self.overlay_drawn = 0.0
+        
+        # Legal moves and hints from the background analysis worker, started
+        # on first use; hint is its newest result for analyzed_snapshot
+        self.show_hints = False
+        self.analysis: Optional[AnalysisWorker] = None
+        self.analyzed_snapshot = None
+        self.hint = None
+        
+        # Attack overlay
+        self.show_attacks = False
+        
     def _load_piece_images(self) -> dict:
         """Load piece images (using text representations for now)"""
         # For simplicity, we'll use text representations
@@ -111,37 +187,44 @@ class ChessGUI:
         y = position.row * SQUARE_SIZE
         return (x, y)
     
-    def draw_board(self):
-        """Draw the chess board"""
+    def draw_board(self, surface: Optional[pygame.Surface] = None):
+        """Draw the chess board (on the screen unless another surface is given)"""
+        surface = surface or self.screen
         for row in range(8):
             for col in range(8):
                 color = WHITE if (row + col) % 2 == 0 else BLACK
                 rect = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
-                pygame.draw.rect(self.screen, color, rect)
+                pygame.draw.rect(surface, color, rect)
                 
                 # Draw coordinates
                 if col == 0:  # Row numbers
                     text = self.font.render(str(8 - row), True, (0, 0, 0))
-                    self.screen.blit(text, (5, row * SQUARE_SIZE + 5))
+                    surface.blit(text, (5, row * SQUARE_SIZE + 5))
                 if row == 7:  # Column letters
                     text = self.font.render(chr(ord('a') + col), True, (0, 0, 0))
-                    self.screen.blit(text, (col * SQUARE_SIZE + SQUARE_SIZE - 15, BOARD_SIZE - 20))
+                    surface.blit(text, (col * SQUARE_SIZE + SQUARE_SIZE - 15, BOARD_SIZE - 20))
     
     def draw_highlights(self):
         """Draw square highlights"""
+        # Shade attacked squares and threatened pieces
+        for index, level in enumerate(self._attack_levels()):
+            if level:
+                surface = self.highlight_surfaces[THREATENED if level == 2 else ATTACKED]
+                self.screen.blit(surface, self.square_rects[index])
+        
+        # Highlight the hinted move's squares
+        for index in self._hint_squares():
+            self.screen.blit(self.highlight_surfaces[HIGHLIGHT], self.square_rects[index])
+        
         # Highlight selected square
         if self.game.selected_position:
             x, y = self.get_screen_pos(self.game.selected_position)
-            highlight_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-            highlight_surface.fill(SELECTED)
-            self.screen.blit(highlight_surface, (x, y))
+            self.screen.blit(self.highlight_surfaces[SELECTED], (x, y))
         
         # Highlight valid moves
         for move in self.game.valid_moves:
             x, y = self.get_screen_pos(move)
-            highlight_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-            highlight_surface.fill(VALID_MOVE)
-            self.screen.blit(highlight_surface, (x, y))
+            self.screen.blit(self.highlight_surfaces[VALID_MOVE], (x, y))
             
             # Draw a circle for empty squares, border for captures
             center_x = x + SQUARE_SIZE // 2
@@ -155,9 +238,7 @@ class ChessGUI:
         if self.game.game_state == GameState.CHECK:
             king_pos = self.game.board.king_positions[self.game.board.current_player]
             x, y = self.get_screen_pos(king_pos)
-            highlight_surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-            highlight_surface.fill(CHECK)
-            self.screen.blit(highlight_surface, (x, y))
+            self.screen.blit(self.highlight_surfaces[CHECK], (x, y))
     
     def draw_pieces(self):
         """Draw all pieces on the board"""
@@ -183,33 +264,39 @@ class ChessGUI:
                 piece_y = y - image.get_height() // 2
                 self.screen.blit(image, (piece_x, piece_y))
     
-    def draw_sidebar(self):
+    def draw_sidebar(self, surface: Optional[pygame.Surface] = None):
         """Draw the sidebar with game information"""
+        surface = surface or self.screen
         # Background
         sidebar_rect = pygame.Rect(BOARD_SIZE, 0, SIDEBAR_WIDTH, WINDOW_HEIGHT)
-        pygame.draw.rect(self.screen, UI_BG, sidebar_rect)
+        pygame.draw.rect(surface, UI_BG, sidebar_rect)
         
         # Title
         title_text = self.title_font.render("Chess Game", True, UI_TEXT)
-        self.screen.blit(title_text, (BOARD_SIZE + 20, 20))
+        surface.blit(title_text, (BOARD_SIZE + 20, 20))
         
         # Game status
         status_text = self.font.render(self.game.get_game_status(), True, UI_TEXT)
-        self.screen.blit(status_text, (BOARD_SIZE + 20, 160))
+        surface.blit(status_text, (BOARD_SIZE + 20, 160))
         
         # Current player
         player_text = f"Current: {self.game.board.current_player.value.capitalize()}"
         player_surface = self.font.render(player_text, True, UI_TEXT)
-        self.screen.blit(player_surface, (BOARD_SIZE + 20, 190))
+        surface.blit(player_surface, (BOARD_SIZE + 20, 190))
         
         # Move history (last 10 moves)
-        history = self.game.get_move_history_algebraic()
+        history = self.game.get_recent_history(10)
         history_title = self.font.render("Move History:", True, UI_TEXT)
-        self.screen.blit(history_title, (BOARD_SIZE + 20, 230))
+        surface.blit(history_title, (BOARD_SIZE + 20, 230))
         
-        for i, move in enumerate(history[-10:]):
+        for i, move in enumerate(history):
             move_text = self.font.render(move, True, UI_TEXT)
-            self.screen.blit(move_text, (BOARD_SIZE + 20, 250 + i * 20))
+            surface.blit(move_text, (BOARD_SIZE + 20, 250 + i * 20))
+        
+        # Move hint
+        if self.show_hints:
+            hint_surface = self.font.render(self._hint_text(), True, UI_TEXT)
+            surface.blit(hint_surface, (BOARD_SIZE + 20, 480))
         
         # Captured pieces
         white_captured = len(self.game.board.captured_pieces[Color.WHITE])
@@ -217,10 +304,11 @@ class ChessGUI:
         
         captured_text = f"Captured - W: {white_captured}, B: {black_captured}"
         captured_surface = self.font.render(captured_text, True, UI_TEXT)
-        self.screen.blit(captured_surface, (BOARD_SIZE + 20, 450))
+        surface.blit(captured_surface, (BOARD_SIZE + 20, 450))
     
-    def draw_buttons(self):
+    def draw_buttons(self, surface: Optional[pygame.Surface] = None):
         """Draw UI buttons"""
+        surface = surface or self.screen
         mouse_pos = pygame.mouse.get_pos()
         
         for button in self.buttons:
@@ -228,13 +316,13 @@ class ChessGUI:
             color = BUTTON_HOVER if button["rect"].collidepoint(mouse_pos) else BUTTON_COLOR
             
             # Draw button
-            pygame.draw.rect(self.screen, color, button["rect"])
-            pygame.draw.rect(self.screen, UI_TEXT, button["rect"], 2)
+            pygame.draw.rect(surface, color, button["rect"])
+            pygame.draw.rect(surface, UI_TEXT, button["rect"], 2)
             
             # Draw button text
             text_surface = self.font.render(button["text"], True, UI_TEXT)
             text_rect = text_surface.get_rect(center=button["rect"].center)
-            self.screen.blit(text_surface, text_rect)
+            surface.blit(text_surface, text_rect)
     
     def handle_button_click(self, pos: Tuple[int, int]):
         """Handle button clicks"""
@@ -262,7 +350,7 @@ class ChessGUI:
                     self.drag_piece = piece
                     self.drag_pos = pos
                 else:
-                    self.game.select_square(square)
+                    self.select_square(square)
     
     def handle_mouse_up(self, pos: Tuple[int, int], button: int):
         """Handle mouse button up events"""
@@ -270,12 +358,16 @@ class ChessGUI:
             square = self.get_square_from_pos(pos)
             if square and self.drag_piece:
                 # Try to move the piece
-                self.game.select_square(self.drag_piece.position)
-                self.game.select_square(square)
+                self.select_square(self.drag_piece.position)
+                self.select_square(square)
             
             self.dragging = False
             self.drag_piece = None
     
+    def select_square(self, square: Position):
+        """Select a square, taking the piece's targets from the analysis worker when it has them"""
+        self.game.select_square(square, self._legal_targets(square))
+    
     def handle_mouse_motion(self, pos: Tuple[int, int]):
         """Handle mouse motion events"""
         if self.dragging:
@@ -300,29 +392,316 @@ class ChessGUI:
                         self.game.reset_game()
                     elif event.key == pygame.K_u:  # U key to undo
                         self.game.undo_last_move()
+                    elif event.key == pygame.K_f:  # F key toggles frame times
+                        self.show_frame_times = not self.show_frame_times
+                        self.overlay_drawn = 0.0
+                    elif event.key == pygame.K_h:  # H key toggles move hints
+                        self.show_hints = not self.show_hints
+                    elif event.key == pygame.K_a:  # A key toggles the attack overlay
+                        self.show_attacks = not self.show_attacks
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.invalidate()
             
-            # Clear screen
-            self.screen.fill((255, 255, 255))
-            
-            # Draw everything
-            self.draw_board()
-            self.draw_highlights()
-            self.draw_pieces()
-            self.draw_dragging_piece()
-            self.draw_sidebar()
-            self.draw_buttons()
-            
-            # Update display
-            pygame.display.flip()
-            self.clock.tick(60)
+            self.update_analysis()
+            self.render_frame()
+            self.clock.tick(FPS)
         
+        if self.analysis:
+            self.analysis.close()
         pygame.quit()
         sys.exit()
+    
+    def update_analysis(self):
+        """Hand a changed position to the analysis worker and collect its results
+        
+        The worker starts when hints are first shown or a piece is first
+        picked up, and from then on gets every new position for its legal
+        moves; with hints off the search is cancelled once they arrive.
+        Never blocks: results arrive through the worker's queue and the ones
+        for earlier positions are dropped.
+        """
+        if self.analysis is None:
+            if not (self.show_hints or self.game.selected_position or self.dragging):
+                return
+            self.analysis = AnalysisWorker()
+        snapshot = self.game.snapshot
+        if snapshot is not self.analyzed_snapshot or (self.show_hints and self.analysis.key is None):
+            key = self.analysis.key
+            # A new snapshot of the same position keeps its result
+            if self.analysis.submit(snapshot) != key:
+                self.hint = None
+            self.analyzed_snapshot = snapshot
+        for result in self.analysis.poll():
+            self.hint = result
+        if not self.show_hints and self.hint is not None and self.analysis.key is not None:
+            self.analysis.cancel()
+    
+    def _legal_targets(self, square: Position) -> Optional[List[Position]]:
+        """Legal targets of the piece on square from the analysis worker, or
+        None until its result for the current position has arrived
+        """
+        if self.hint is None or self.analyzed_snapshot is not self.game.snapshot:
+            return None
+        return [SQUARES[index] for index in self.hint.legal_moves.get(square_index(square), ())]
+    
+    def _hint_squares(self) -> Tuple[int, ...]:
+        """From and to square of the hinted move, if one is shown"""
+        if self.show_hints and self.hint and self.hint.best_move:
+            return self.hint.best_move
+        return ()
+    
+    def _attack_levels(self) -> Tuple[int, ...]:
+        """Per square: 2 for a threatened piece of the side to move, 1 for a
+        square the opponent attacks, 0 otherwise; () when the overlay is off
+        """
+        if not self.show_attacks:
+            return ()
+        snapshot = self.game.snapshot
+        flag = COLOR_FLAGS[snapshot.current_player]
+        counts = attack_counts(snapshot.squares)
+        own, enemy = counts[flag >> 3], counts[(flag >> 3) ^ 1]
+        return tuple(
+            0 if not enemy[index] else
+            2 if code and code & BLACK_FLAG == flag and enemy[index] > own[index] else 1
+            for index, code in enumerate(snapshot.squares)
+        )
+    
+    def _hint_text(self) -> str:
+        """Sidebar line describing the current hint"""
+        hint = self.hint
+        if hint is None or hint.best_move is None:
+            if hint and not hint.legal_moves:
+                return "Hint: no legal moves"
+            return "Hint: thinking..."
+        return f"Hint: {hint.best_move_uci} ({hint.score / 100:+.2f}, depth {hint.depth})"
+    
+    def render_frame(self) -> int:
+        """Draw one frame and return the number of rectangles updated"""
+        start = time.perf_counter()
+        if self.dirty_rects:
+            rects = self._render_dirty()
+            if rects:
+                pygame.display.update(rects)
+        else:
+            rects = [self.screen.get_rect()]
+            self._render_full()
+            pygame.display.flip()
+        self.frame_times.append(time.perf_counter() - start)
+        self.rect_counts.append(len(rects))
+        return len(rects)
+    
+    def invalidate(self):
+        """Force the next frame to redraw the whole window"""
+        self.drawn_squares = None
+        self.drawn_key = None
+        self.sidebar_key = None
+        self.overlay_drawn = 0.0
+    
+    def _render_full(self):
+        """Redraw everything on the screen"""
+        # Clear screen
+        self.screen.fill(BACKGROUND)
+        
+        # Draw everything
+        self.draw_board()
+        self.draw_highlights()
+        self.draw_pieces()
+        self.draw_dragging_piece()
+        self.draw_sidebar()
+        self.draw_buttons()
+        if self.show_frame_times:
+            self.draw_frame_times(self.screen)
+    
+    def _render_dirty(self) -> List[pygame.Rect]:
+        """Redraw only what changed since the last frame, returning the changed rectangles"""
+        canvas = self.canvas
+        rects = []
+        if self.drawn_squares is None:
+            canvas.fill(BACKGROUND)
+            rects.append(canvas.get_rect())
+        
+        # Board squares: compare each square's contents and highlights with
+        # what was drawn last, but only when the position or selection changed
+        game = self.game
+        selected = square_index(game.selected_position) if game.selected_position else -1
+        drag_from = square_index(self.drag_piece.position) if self.dragging and self.drag_piece else -1
+        hint_squares = self._hint_squares()
+        key = (game.snapshot, selected, drag_from, game.game_state, hint_squares,
+               tuple(square_index(move) for move in game.valid_moves), self.show_attacks)
+        if key != self.drawn_key:
+            squares = self._square_states(selected, drag_from, hint_squares, self._attack_levels())
+            drawn = self.drawn_squares
+            for index, state in enumerate(squares):
+                if drawn is None or drawn[index] != state:
+                    self._draw_square(index, state)
+                    rects.append(self.square_rects[index])
+            self.drawn_squares = squares
+            self.drawn_key = key
+        
+        # Sidebar: re-rendered when the game or the hovered button changes
+        mouse_pos = pygame.mouse.get_pos()
+        hovered = tuple(button["rect"].collidepoint(mouse_pos) for button in self.buttons)
+        sidebar_key = (game.snapshot, hovered, self.show_hints and self._hint_text())
+        if sidebar_key != self.sidebar_key:
+            self.draw_sidebar(canvas)
+            self.draw_buttons(canvas)
+            self.sidebar_key = sidebar_key
+            rects.append(SIDEBAR_RECT)
+        
+        if self.show_frame_times and time.perf_counter() - self.overlay_drawn >= OVERLAY_INTERVAL:
+            canvas.fill(BACKGROUND, OVERLAY_RECT)
+            self.draw_frame_times(canvas)
+            self.overlay_drawn = time.perf_counter()
+            rects.append(OVERLAY_RECT)
+        elif not self.show_frame_times and self.overlay_drawn:
+            canvas.fill(BACKGROUND, OVERLAY_RECT)
+            self.overlay_drawn = 0.0
+            rects.append(OVERLAY_RECT)
+        
+        # The dragged piece lives only on the screen: restore the canvas
+        # under its old position and draw it at the new one
+        drag_rect = None
+        if self.dragging and self.drag_piece:
+            image = self.piece_images.get((self.drag_piece.color, self.drag_piece.piece_type))
+            if image:
+                x, y = self.drag_pos
+                drag_rect = image.get_rect(topleft=(x - image.get_width() // 2,
+                                                    y - image.get_height() // 2))
+        if drag_rect != self.drag_rect:
+            if self.drag_rect:
+                rects.append(self.drag_rect)
+            if drag_rect:
+                rects.append(drag_rect)
+        elif drag_rect and rects:
+            rects.append(drag_rect)
+        self.drag_rect = drag_rect
+        
+        for rect in rects:
+            self.screen.blit(canvas, rect, rect)
+        if drag_rect and rects:
+            self.draw_dragging_piece()
+        return rects
+    
+    def _square_states(self, selected: int, drag_from: int, hint_squares: Tuple[int, ...],
+                       attack_levels: Tuple[int, ...] = ()) -> List[tuple]:
+        """(piece code shown, attack level, hinted, selected, move target, in check, occupied) per square"""
+        board = self.game.board
+        targets = {square_index(move) for move in self.game.valid_moves}
+        check = -1
+        if self.game.game_state == GameState.CHECK:
+            check = board.king_squares[COLOR_FLAGS[board.current_player] >> 3]
+        return [
+            (0 if index == drag_from else code, attack_levels[index] if attack_levels else 0,
+             index in hint_squares, index == selected, index in targets, index == check, code != 0)
+            for index, code in enumerate(board.squares)
+        ]
+    
+    def _draw_square(self, index: int, state: tuple):
+        """Draw one square on the canvas, in the layer order of a full redraw"""
+        code, attack_level, hinted, selected, target, check, occupied = state
+        canvas = self.canvas
+        rect = self.square_rects[index]
+        canvas.blit(self.board_surface, rect, rect)
+        if attack_level:
+            canvas.blit(self.highlight_surfaces[THREATENED if attack_level == 2 else ATTACKED], rect)
+        if hinted:
+            canvas.blit(self.highlight_surfaces[HIGHLIGHT], rect)
+        if selected:
+            canvas.blit(self.highlight_surfaces[SELECTED], rect)
+        if target:
+            canvas.blit(self.highlight_surfaces[VALID_MOVE], rect)
+            if occupied:
+                pygame.draw.circle(canvas, (150, 0, 0), rect.center, SQUARE_SIZE // 2 - 5, 3)
+            else:
+                pygame.draw.circle(canvas, (0, 150, 0), rect.center, 10)
+        if check:
+            canvas.blit(self.highlight_surfaces[CHECK], rect)
+        if code:
+            image = self.code_images[code]
+            canvas.blit(image, (rect.x + (SQUARE_SIZE - image.get_width()) // 2,
+                                rect.y + (SQUARE_SIZE - image.get_height()) // 2))
+    
+    def draw_frame_times(self, surface: pygame.Surface):
+        """Draw the frame-time overlay below the board"""
+        if not self.frame_times:
+            return
+        average = sum(self.frame_times) / len(self.frame_times)
+        text = (f"frame {average * 1000:.2f} ms avg, {max(self.frame_times) * 1000:.2f} ms max | "
+                f"{self.clock.get_fps():.0f} fps | "
+                f"{sum(self.rect_counts) / len(self.rect_counts):.1f} rects")
+        surface.blit(self.font.render(text, True, OVERLAY_TEXT), (10, BOARD_SIZE + 10))
+    
+    def benchmark(self, frames: int, seed: int = 0) -> dict:
+        """Render frames of scripted play and report the time spent per frame
+        
+        Every move is a drag: press on a random legal move's piece, ten
+        frames of motion, release on the target. The display is updated as
+        in run(), without waiting for the frame clock.
+        """
+        rng = random.Random(seed)
+        wall, cpu, rect_counts = [], [], []
+        step = 0
+        from_pos = to_pos = None
+        for _ in range(frames):
+            if step == 0:
+                moves = [
+                    (from_index, target)
+                    for from_index, targets in self.game.board.legal_moves().items()
+                    for target in targets
+                ]
+                if not moves or self.game.is_game_over():
+                    self.game.reset_game()
+                    continue
+                from_index, target = rng.choice(moves)
+                from_pos = self.get_screen_pos(Position(from_index // 8, from_index % 8))
+                from_pos = (from_pos[0] + SQUARE_SIZE // 2, from_pos[1] + SQUARE_SIZE // 2)
+                x, y = self.get_screen_pos(target)
+                to_pos = (x + SQUARE_SIZE // 2, y + SQUARE_SIZE // 2)
+                self.handle_mouse_down(from_pos, 1)
+            elif step <= 10:
+                self.handle_mouse_motion((from_pos[0] + (to_pos[0] - from_pos[0]) * step // 10,
+                                          from_pos[1] + (to_pos[1] - from_pos[1]) * step // 10))
+            else:
+                self.handle_mouse_up(to_pos, 1)
+            step = (step + 1) % 12
+            
+            pygame.event.pump()
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            rect_counts.append(self.render_frame())
+            wall.append(time.perf_counter() - wall_start)
+            cpu.append(time.process_time() - cpu_start)
+        
+        wall.sort()
+        return {
+            'mode': 'dirty_rects' if self.dirty_rects else 'full_redraw',
+            'frames': len(wall),
+            'moves': len(self.game.board.move_history),
+            'frame_ms_mean': round(sum(wall) / len(wall) * 1000, 3),
+            'frame_ms_p95': round(wall[int(len(wall) * 0.95)] * 1000, 3),
+            'cpu_ms_per_frame': round(sum(cpu) / len(cpu) * 1000, 3),
+            'max_fps': round(len(wall) / sum(wall), 1),
+            'rects_per_frame': round(sum(rect_counts) / len(rect_counts), 2)
+        }
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main function to start the chess game"""
+    parser = argparse.ArgumentParser(description="Chess GUI")
+    parser.add_argument('--full-redraw', action='store_true',
+                        help="redraw the whole window every frame")
+    parser.add_argument('--frame-times', action='store_true', help="show the frame-time overlay")
+    parser.add_argument('--benchmark', type=int, metavar='FRAMES',
+                        help="render scripted frames headless and print timings as JSON")
+    args = parser.parse_args(argv)
+    
+    if args.benchmark:
+        # Headless: ChessGUI initializes pygame on the dummy driver
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        gui = ChessGUI(dirty_rects=not args.full_redraw)
+        print(json.dumps(gui.benchmark(args.benchmark)))
+        return
+    
     try:
-        game = ChessGUI()
+        game = ChessGUI(dirty_rects=not args.full_redraw, show_frame_times=args.frame_times)
         game.run()
     except Exception as e:
         print(f"Error running chess game: {e}")
@@ -0,0 +1,406 @@
+"""
+Chess Load Test
+Replays games against the chess endpoints with concurrent virtual users and
+reports latency percentiles and throughput per route
+    
+    python chess_loadtest.py --concurrency 8 --games 50 -o load.json
+    python chess_loadtest.py --gunicorn --concurrency 16 --games 200 games.uci
+
+Each virtual user restarts the game (POST /chess), then for every move of
+its game posts the move (POST /chess/move) and polls the status
+(GET /api/chess/status), loading the page (GET /chess) every few moves.
+Like a browser, a user sends If-None-Match with the last ETag it got for a
+read route. The games come from PGN or UCI files, or are seeded random
+self-play games. All users share the server's one game, so with more than
+one user some moves are refused. Refused moves are counted as 'rejected'
+and timed separately (under 'rejected_latency'), so the move percentiles
+only cover moves the server validated and made.
+
+Requests go through the Flask test client in this process (the default),
+to a gunicorn started on a free local port (--gunicorn, configured like
+the Dockerfile) or to a running server (--url). The JSON report holds
+p50/p95/p99 latency, throughput and status counts per route, plus the git
+commit and settings, so reports from different commits can be compared.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+from chess_batch import read_jobs
+from chess_mechanics import ChessGame
+from chess_notation import parse_san, parse_uci
+from chess_revision import git_commit
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_GAMES = 20
+DEFAULT_MAX_PLIES = 60
+# Moves between page loads of a virtual user
+PAGE_EVERY = 10
+PERCENTILES = (50, 95, 99)
+
+GUNICORN_WORKERS = 1
+GUNICORN_THREADS = 8
+STARTUP_TIMEOUT = 30.0
+
+ROUTES = ('POST /chess', 'POST /chess/move', 'GET /api/chess/status', 'GET /chess')
+
+# (status code, ETag or None, body)
+Response = Tuple[int, Optional[str], bytes]
+
+class TestClientTransport:
+    """Requests through the Flask test client of an app in this process"""
+    def __init__(self, app):
+        self.client = app.test_client()
+    
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Response:
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.headers.get('ETag'), response.get_data()
+    
+    def close(self):
+        pass
+
+class HTTPTransport:
+    """Requests over one keep-alive HTTP connection"""
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.connection = None
+    
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Response:
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body, headers or {})
+                response = self.connection.getresponse()
+                return response.status, response.getheader('ETag'), response.read()
+            except (ConnectionError, http.client.HTTPException):
+                # The server closed the kept-alive connection; retry once on a new one
+                self.close()
+                if attempt:
+                    raise
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+class RouteStats:
+    """Latencies and status counts of one route"""
+    __slots__ = ('latencies', 'rejected_latencies', 'statuses', 'rejected', 'errors')
+    
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.rejected_latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.rejected = 0
+        self.errors = 0
+    
+    def merge(self, other: 'RouteStats'):
+        self.latencies.extend(other.latencies)
+        self.rejected_latencies.extend(other.rejected_latencies)
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.rejected += other.rejected
+        self.errors += other.errors
+
+def percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+def move_accepted(content: bytes) -> bool:
+    """Whether a /chess/move response reports the move as made"""
+    return bool(json.loads(content).get('success'))
+
+def game_squares(job) -> List[Tuple[str, str]]:
+    """(from, to) square names of a game's moves, up to its first illegal move
+    
+    The server always starts from the standard position, so a game set up
+    from a FEN has none.
+    """
+    _, _, notation, moves, _, fen = job
+    if fen:
+        return []
+    game = ChessGame()
+    squares = []
+    for text in moves:
+        try:
+            if notation == 'san':
+                from_pos, to_pos, promotion = parse_san(game.board, text)
+            else:
+                from_pos, to_pos, promotion = parse_uci(text)
+        except ValueError:
+            break
+        if not game.make_move(from_pos, to_pos, promotion):
+            break
+        squares.append((from_pos.to_algebraic(), to_pos.to_algebraic()))
+    return squares
+
+def load_games(paths: List[str], games: int, max_plies: int, seed: int) -> List[List[Tuple[str, str]]]:
+    """Move sequences of the games in paths, or of seeded random self-play games"""
+    if paths:
+        jobs = itertools.chain.from_iterable(read_jobs(path) for path in paths)
+        sequences = [game_squares(job)[:max_plies] for job in itertools.islice(jobs, games)]
+    else:
+        from chess_selfplay import play_game
+        sequences = []
+        for number in range(games):
+            record = play_game((number, 'random', 'random', seed + number, max_plies, 1))
+            sequences.append([(text[:2], text[2:4]) for text in record['moves'].split()])
+    return [sequence for sequence in sequences if sequence]
+
+class VirtualUser(threading.Thread):
+    """Plays games taken from a shared iterator until it runs out or time is up"""
+    def __init__(self, transport, games: Iterator, lock: threading.Lock,
+                 deadline: Optional[float], page_every: int):
+        super().__init__(daemon=True)
+        self.transport = transport
+        self.games = games
+        self.lock = lock
+        self.deadline = deadline
+        self.page_every = page_every
+        self.stats = {route: RouteStats() for route in ROUTES}
+        self.etags: Dict[str, str] = {}
+        self.error: Optional[BaseException] = None
+    
+    def call(self, route: str, body: Optional[bytes] = None,
+             headers: Optional[Dict[str, str]] = None,
+             accepted: Optional[Callable[[bytes], bool]] = None) -> Optional[bytes]:
+        """Time one request, returning the body of a 200 response
+        
+        A 200 response that accepted() refuses is counted as rejected and
+        timed apart from the other requests of the route.
+        """
+        method, path = route.split(' ', 1)
+        headers = dict(headers or {})
+        if method == 'GET' and route in self.etags:
+            headers['If-None-Match'] = self.etags[route]
+        stats = self.stats[route]
+        start = time.perf_counter()
+        try:
+            status, etag, content = self.transport.request(method, path, body, headers)
+        except OSError:
+            stats.errors += 1
+            return None
+        elapsed = time.perf_counter() - start
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if etag:
+            self.etags[route] = etag
+        if status >= 500:
+            stats.errors += 1
+        if status == 200 and accepted is not None and not accepted(content):
+            stats.rejected += 1
+            stats.rejected_latencies.append(elapsed)
+        else:
+            stats.latencies.append(elapsed)
+        return content if status == 200 else None
+    
+    def play(self, moves: List[Tuple[str, str]]):
+        """One game: restart, then move and poll"""
+        self.call('POST /chess', urlencode({'action': 'restart'}).encode(),
+                  {'Content-Type': 'application/x-www-form-urlencoded'})
+        for ply, (from_square, to_square) in enumerate(moves):
+            body = json.dumps({'from_pos': from_square, 'to_pos': to_square}).encode()
+            self.call('POST /chess/move', body, {'Content-Type': 'application/json'}, move_accepted)
+            self.call('GET /api/chess/status')
+            if ply % self.page_every == 0:
+                self.call('GET /chess')
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                return
+    
+    def run(self):
+        try:
+            while self.deadline is None or time.perf_counter() < self.deadline:
+                with self.lock:
+                    moves = next(self.games, None)
+                if moves is None:
+                    return
+                self.play(moves)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.transport.close()
+
+def free_port() -> int:
+    """A TCP port that is free on localhost right now"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_until_ready(host: str, port: int, process: subprocess.Popen):
+    """Block until the server answers /api/health"""
+    deadline = time.perf_counter() + STARTUP_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"gunicorn did not answer within {STARTUP_TIMEOUT}s")
+
+def start_gunicorn(workers: int = GUNICORN_WORKERS,
+                   threads: int = GUNICORN_THREADS) -> Tuple[subprocess.Popen, int]:
+    """Serve app:app with gunicorn on a free local port"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--threads', str(threads), '--timeout', '0', 'app:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready('127.0.0.1', port, process)
+    except BaseException:
+        process.terminate()
+        process.wait()
+        raise
+    return process, port
+
+def latency_summary(latencies: List[float], summary: dict) -> dict:
+    """Add the mean, percentiles and maximum of latencies to summary"""
+    ordered = sorted(latencies)
+    if ordered:
+        summary['mean_ms'] = round(sum(ordered) / len(ordered) * 1000, 3)
+        for percent in PERCENTILES:
+            summary[f'p{percent}_ms'] = round(percentile(ordered, percent) * 1000, 3)
+        summary['max_ms'] = round(ordered[-1] * 1000, 3)
+    return summary
+
+def route_summary(stats: RouteStats, seconds: float) -> dict:
+    """Percentiles, throughput and counts of one route
+    
+    The percentiles cover the requests that were not rejected; rejected
+    requests have their own under 'rejected_latency'.
+    """
+    requests = len(stats.latencies) + len(stats.rejected_latencies)
+    summary = latency_summary(stats.latencies, {
+        'requests': requests,
+        'errors': stats.errors,
+        'rejected': stats.rejected,
+        'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+        'requests_per_second': round(requests / seconds, 1) if seconds else None
+    })
+    if stats.rejected_latencies:
+        summary['rejected_latency'] = latency_summary(stats.rejected_latencies, {})
+    return summary
+
+def run_load_test(games: List[List[Tuple[str, str]]], concurrency: int = DEFAULT_CONCURRENCY,
+                  target: str = 'inprocess', url: Optional[str] = None,
+                  duration: Optional[float] = None, page_every: int = PAGE_EVERY,
+                  gunicorn_workers: int = GUNICORN_WORKERS,
+                  gunicorn_threads: int = GUNICORN_THREADS) -> dict:
+    """Replay games with concurrent users; target is 'inprocess', 'gunicorn' or 'url'
+    
+    Returns the report.
+    """
+    process = None
+    if target == 'inprocess':
+        from app import app
+        def transport():
+            return TestClientTransport(app)
+    else:
+        if target == 'gunicorn':
+            process, port = start_gunicorn(gunicorn_workers, gunicorn_threads)
+            host = '127.0.0.1'
+        else:
+            parts = urlsplit(url)
+            host, port = parts.hostname, parts.port or 80
+        def transport():
+            return HTTPTransport(host, port)
+    
+    try:
+        lock = threading.Lock()
+        iterator = iter(games)
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+        users = [VirtualUser(transport(), iterator, lock, deadline, page_every)
+                 for _ in range(concurrency)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        seconds = time.perf_counter() - start
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    
+    for user in users:
+        if user.error is not None:
+            raise user.error
+    
+    totals = {route: RouteStats() for route in ROUTES}
+    for user in users:
+        for route, stats in user.stats.items():
+            totals[route].merge(stats)
+    combined = RouteStats()
+    for stats in totals.values():
+        combined.merge(stats)
+    
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'target': target,
+        'concurrency': concurrency,
+        'games': len(games),
+        'seconds': round(seconds, 3),
+        'routes': {route: route_summary(stats, seconds) for route, stats in totals.items()},
+        'total': route_summary(combined, seconds)
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the chess endpoints")
+    parser.add_argument('inputs', nargs='*',
+                        help="PGN or UCI games to replay (default: random self-play games)")
+    parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="concurrent virtual users")
+    parser.add_argument('-n', '--games', type=int, default=DEFAULT_GAMES, help="games to replay")
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES,
+                        help="moves replayed per game")
+    parser.add_argument('--duration', type=float, default=None,
+                        help="stop after this many seconds even if games remain")
+    parser.add_argument('--page-every', type=int, default=PAGE_EVERY,
+                        help="moves between page loads")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the self-play games")
+    targets = parser.add_mutually_exclusive_group()
+    targets.add_argument('--gunicorn', action='store_true',
+                         help="start gunicorn on a free local port and load-test it")
+    targets.add_argument('--url', default=None, help="load-test a running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument('--gunicorn-workers', type=int, default=GUNICORN_WORKERS)
+    parser.add_argument('--gunicorn-threads', type=int, default=GUNICORN_THREADS)
+    parser.add_argument('-o', '--output', default=None, help="write the JSON report here too")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or args.games < 1 or args.page_every < 1:
+        parser.error("--concurrency, --games and --page-every must be at least 1")
+    
+    target = 'gunicorn' if args.gunicorn else 'url' if args.url else 'inprocess'
+    games = load_games(args.inputs, args.games, args.max_plies, args.seed)
+    report = run_load_test(games, args.concurrency, target, args.url, args.duration,
+                           args.page_every, args.gunicorn_workers, args.gunicorn_threads)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
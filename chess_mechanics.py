@@ -3,10 +3,14 @@ Chess Game Mechanics
 Handles game rules, checkmate detection, and game state management
 """
 
-from chess_game import ChessBoard, Color, Position, PieceType
+from chess_game import (ChessBoard, Color, Position, PieceType, ALL_CASTLING, CODE_TYPES,
+                        TYPE_MASK, piece_from_code, square_index)
 from chess_pieces import Pawn, Rook, Knight, Bishop, Queen, King
+from chess_notation import PIECE_LETTERS, PROMOTION_TYPES, san_prefix, san_suffix
 from typing import List, Optional, Tuple
 from enum import Enum
+import hashlib
+from chess_metrics import timed
 
 class GameState(Enum):
     PLAYING = "playing"
@@ -15,6 +19,69 @@ class GameState(Enum):
     STALEMATE = "stalemate"
     DRAW = "draw"
 
+class GameSnapshot:
+    """Immutable state of a game at one version, for lock-free readers
+    
+    ChessGame publishes a new snapshot after every change by rebinding
+    game.snapshot, which is atomic, so a reader on another thread sees the
+    old or the new position but never a half-applied move. Only the 64 piece
+    codes are copied; the other fields are immutable values shared with the
+    game.
+    """
+    __slots__ = ('version', 'squares', 'piece_string', 'current_player', 'castling',
+                 'en_passant_target', 'halfmove_clock', 'fullmove_number', 'move_count',
+                 'game_state', 'status', 'position_hash')
+    
+    def __init__(self, game: 'ChessGame'):
+        board = game.board
+        set_field = object.__setattr__
+        set_field(self, 'version', game.version)
+        set_field(self, 'squares', bytes(board.squares))
+        set_field(self, 'piece_string', board.to_piece_string())
+        set_field(self, 'current_player', board.current_player)
+        set_field(self, 'castling', board.castling)
+        set_field(self, 'en_passant_target', board.en_passant_target)
+        set_field(self, 'halfmove_clock', board.halfmove_clock)
+        set_field(self, 'fullmove_number', board.fullmove_number)
+        set_field(self, 'move_count', len(board.move_history))
+        set_field(self, 'game_state', game.game_state)
+        set_field(self, 'status', game.get_game_status())
+        set_field(self, 'position_hash', game.position_hash())
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("GameSnapshot is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError("GameSnapshot is immutable")
+    
+    def __setstate__(self, state):
+        for name, value in state[1].items():
+            object.__setattr__(self, name, value)
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
+    
+    def __str__(self):
+        return ChessBoard._format_board(self.piece_string)
+    
+    def to_piece_string(self) -> str:
+        """64-character board string, as ChessBoard.to_piece_string()"""
+        return self.piece_string
+    
+    def get_piece(self, position: Position):
+        """Piece at a position, as ChessBoard.get_piece()"""
+        if not position.is_valid():
+            return None
+        code = self.squares[square_index(position)]
+        return piece_from_code(code, position) if code else None
+    
+    def is_game_over(self) -> bool:
+        """Check if the game was over at this version"""
+        return self.game_state in [GameState.CHECKMATE, GameState.STALEMATE, GameState.DRAW]
+
 class ChessGame:
     """Main chess game class that manages the complete game"""
     def __init__(self):
@@ -23,12 +90,21 @@ class ChessGame:
         self.selected_piece = None
         self.selected_position = None
         self.valid_moves = []
+        self.version = 0
+        self._position_hash: Optional[Tuple[int, str]] = None
+        # Numbered history lines ('1. e4 e5') and the plies they cover,
+        # extended as moves are made
+        self._history_lines: List[str] = []
+        self._history_plies = 0
+        # Replaced (never mutated) after every change, starting with the
+        # setup below; never cleared, so a reset is invisible to readers
+        self.snapshot: GameSnapshot
         self.setup_initial_position()
     
     def setup_initial_position(self):
         """Set up the initial chess position"""
         # Clear the board
-        self.board.board = [[None for _ in range(8)] for _ in range(8)]
+        self.board.clear()
         
         # Place pawns
         for col in range(8):
@@ -44,21 +120,30 @@ class ChessGame:
             # White pieces
             self.board.set_piece(Position(7, col), piece_class(Color.WHITE, Position(7, col)))
         
-        # Set king positions
-        self.board.king_positions = {
-            Color.WHITE: Position(7, 4),
-            Color.BLACK: Position(0, 4)
-        }
-        
         # Reset game state
+        self.board.castling = ALL_CASTLING
         self.board.current_player = Color.WHITE
+        self.board.halfmove_clock = 0
+        self.board.fullmove_number = 1
         self.game_state = GameState.PLAYING
         self.selected_piece = None
         self.selected_position = None
         self.valid_moves = []
+        self.mark_changed()
+    
+    def mark_changed(self):
+        """Bump the version and publish a new snapshot after the position changed"""
+        self.version += 1
+        self.snapshot = GameSnapshot(self)
     
-    def select_square(self, position: Position) -> bool:
-        """Select a square on the board"""
+    def select_square(self, position: Position,
+                      targets: Optional[List[Position]] = None) -> bool:
+        """Select a square on the board
+        
+        targets are the legal target squares of the piece on position when
+        the caller already knows them (e.g. from background analysis); they
+        are worked out here otherwise.
+        """
         piece = self.board.get_piece(position)
         
         # If no piece is selected
@@ -66,7 +151,7 @@ class ChessGame:
             if piece and piece.color == self.board.current_player:
                 self.selected_piece = piece
                 self.selected_position = position
-                self.valid_moves = self.board.get_valid_moves(piece)
+                self.valid_moves = targets if targets is not None else self.board.get_valid_moves(piece)
                 return True
             return False
         
@@ -81,7 +166,7 @@ class ChessGame:
             if piece and piece.color == self.board.current_player:
                 self.selected_piece = piece
                 self.selected_position = position
-                self.valid_moves = self.board.get_valid_moves(piece)
+                self.valid_moves = targets if targets is not None else self.board.get_valid_moves(piece)
                 return True
             
             # Try to make a move
@@ -100,59 +185,43 @@ class ChessGame:
         self.selected_position = None
         self.valid_moves = []
     
-    def make_move(self, from_pos: Position, to_pos: Position) -> bool:
-        """Make a move and update game state"""
-        # Handle castling
+    def make_move(self, from_pos: Position, to_pos: Position,
+                  promotion: Optional[PieceType] = None) -> bool:
+        """Make a move and update game state
+        
+        promotion is the piece type a pawn reaching the last rank becomes
+        (a queen when not given).
+        """
         piece = self.board.get_piece(from_pos)
-        if (piece and piece.piece_type == PieceType.KING and 
-            abs(to_pos.col - from_pos.col) == 2):
-            return self._handle_castling(from_pos, to_pos)
+        if not piece or piece.color != self.board.current_player:
+            return False
+        if promotion is not None and promotion not in PROMOTION_TYPES:
+            return False
+        
+        # SAN disambiguation depends on the position before the move
+        san = san_prefix(self.board, from_pos, to_pos, promotion)
+        
+        # The board applies castling, en passant and promotion itself
+        success = self.board.make_move(from_pos, to_pos, promotion)
         
-        # Make the move
-        success = self.board.make_move(from_pos, to_pos)
         if success:
-            # Handle pawn promotion
-            self._handle_pawn_promotion(to_pos)
-            
             # Update game state
             self._update_game_state()
+            san += san_suffix(self)
+            self.board.move_history.san[-1] = san
+            if self._history_plies == len(self.board.move_history) - 1:
+                self._append_history(san)
+            self.mark_changed()
         
         return success
     
-    def _handle_castling(self, king_from: Position, king_to: Position) -> bool:
-        """Handle castling move"""
-        if not self.board.make_move(king_from, king_to):
-            return False
-        
-        # Move the rook
-        if king_to.col == 6:  # Kingside castling
-            rook_from = Position(king_from.row, 7)
-            rook_to = Position(king_from.row, 5)
-        else:  # Queenside castling
-            rook_from = Position(king_from.row, 0)
-            rook_to = Position(king_from.row, 3)
-        
-        rook = self.board.get_piece(rook_from)
-        if rook:
-            self.board.set_piece(rook_to, rook)
-            self.board.set_piece(rook_from, None)
-            rook.move_to(rook_to)
-        
-        return True
-    
-    def _handle_pawn_promotion(self, position: Position):
-        """Handle pawn promotion"""
-        piece = self.board.get_piece(position)
-        if (piece and piece.piece_type == PieceType.PAWN and 
-            (position.row == 0 or position.row == 7)):
-            # For now, always promote to queen
-            # In a full implementation, this would prompt the player
-            new_queen = Queen(piece.color, position)
-            new_queen.has_moved = True
-            self.board.set_piece(position, new_queen)
-    
+    @timed('update_game_state')
     def _update_game_state(self):
-        """Update the game state after a move"""
+        """Update the game state after a move
+        
+        The board tracks checks incrementally and caches the legal moves it
+        finds, so selecting pieces afterwards costs no further search.
+        """
         current_color = self.board.current_player
         
         # Check if current player is in check
@@ -172,10 +241,7 @@ class ChessGame:
     
     def _has_valid_moves(self, color: Color) -> bool:
         """Check if a player has any valid moves"""
-        for piece in self.board.get_all_pieces(color):
-            if self.board.get_valid_moves(piece):
-                return True
-        return False
+        return self.board.has_legal_move(color)
     
     def is_game_over(self) -> bool:
         """Check if the game is over"""
@@ -202,31 +268,95 @@ class ChessGame:
         else:
             return f"{self.board.current_player.value.capitalize()} to move"
     
+    def position_hash(self) -> str:
+        """Short hash of the position, side to move, game state and move count
+        
+        The hash is recomputed only when the game version changes (after a
+        move, undo or reset), so it is cheap to call on every request.
+        """
+        if self._position_hash is None or self._position_hash[0] != self.version:
+            board = self.board
+            en_passant = board.en_passant_target.to_algebraic() if board.en_passant_target else '-'
+            key = '|'.join((
+                board.to_piece_string(),
+                board.current_player.value,
+                str(board.castling),
+                en_passant,
+                self.game_state.value,
+                str(len(board.move_history))
+            ))
+            digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+            self._position_hash = (self.version, digest)
+        return self._position_hash[1]
+    
+    def get_san_moves(self) -> List[str]:
+        """Get the SAN of every move played, one entry per ply
+        
+        Moves made directly on the board have no recorded SAN; theirs is
+        rendered here once and kept in the history.
+        """
+        history = self.board.move_history
+        sans = history.san
+        for index, san in enumerate(sans):
+            if san is None:
+                sans[index] = self._move_to_algebraic(history[index])
+        return list(sans)
+    
     def get_move_history_algebraic(self) -> List[str]:
-        """Get move history in algebraic notation"""
-        moves = []
-        for i, move in enumerate(self.board.move_history):
-            move_str = self._move_to_algebraic(move)
-            if i % 2 == 0:
-                moves.append(f"{i//2 + 1}. {move_str}")
-            else:
-                moves[-1] += f" {move_str}"
-        return moves
+        """Get move history in algebraic notation, one numbered line per move pair"""
+        return list(self._history())
+    
+    def get_recent_history(self, count: int) -> List[str]:
+        """The last count lines of get_move_history_algebraic()
+        
+        Costs O(count) however long the game is, so it can be called on
+        every frame.
+        """
+        return self._history()[-count:] if count > 0 else []
+    
+    def _history(self) -> List[str]:
+        """The cached history lines, rebuilt if moves were made on the board directly"""
+        if self._history_plies != len(self.board.move_history):
+            self._history_lines = []
+            self._history_plies = 0
+            for san in self.get_san_moves():
+                self._append_history(san)
+        return self._history_lines
+    
+    def _append_history(self, san: str):
+        """Add one ply to the cached history lines"""
+        if self._history_plies % 2 == 0:
+            self._history_lines.append(f"{self._history_plies // 2 + 1}. {san}")
+        else:
+            self._history_lines[-1] += f" {san}"
+        self._history_plies += 1
+    
+    def _remove_history(self):
+        """Take the last ply off the cached history lines"""
+        self._history_plies -= 1
+        if self._history_plies % 2 == 0:
+            self._history_lines.pop()
+        else:
+            self._history_lines[-1] = self._history_lines[-1].rsplit(' ', 1)[0]
     
     def _move_to_algebraic(self, move) -> str:
-        """Convert a move to algebraic notation"""
-        piece = move['piece']
+        """Convert a move to simplified algebraic notation
+        
+        Only used for moves made directly on the board, which have no
+        recorded SAN.
+        """
+        piece_type = CODE_TYPES[move['piece'] & TYPE_MASK]
         from_pos = move['from']
         to_pos = move['to']
         captured = move['captured']
         
         # Basic piece notation
-        if piece.piece_type == PieceType.PAWN:
+        if piece_type == PieceType.PAWN:
             notation = ""
             if captured:
                 notation = chr(ord('a') + from_pos.col) + "x"
         else:
-            notation = piece.piece_type.value[0].upper()
+            notation = PIECE_LETTERS[piece_type]
             if captured:
                 notation += "x"
         
@@ -238,34 +368,28 @@ class ChessGame:
         return notation
     
     def reset_game(self):
-        """Reset the game to initial state"""
-        self.__init__()
+        """Reset the game to initial state
+        
+        The game gets a fresh board and move history but keeps its version,
+        which setup_initial_position() bumps through mark_changed(), so the
+        version only ever counts up.
+        """
+        self.board = ChessBoard()
+        self._history_lines = []
+        self._history_plies = 0
+        self.setup_initial_position()
     
     def undo_last_move(self) -> bool:
-        """Undo the last move (basic implementation)"""
-        if not self.board.move_history:
+        """Undo the last move, including its castling rook, en passant
+        capture or promotion
+        """
+        if self.board.undo_move() is None:
             return False
-        
-        last_move = self.board.move_history.pop()
-        
-        # Restore the piece to original position
-        piece = last_move['piece']
-        self.board.set_piece(last_move['from'], piece)
-        piece.position = last_move['from']
-        
-        # Restore captured piece if any
-        if last_move['captured']:
-            self.board.set_piece(last_move['to'], last_move['captured'])
-        else:
-            self.board.set_piece(last_move['to'], None)
-        
-        # Restore en passant target
-        self.board.en_passant_target = last_move['en_passant_target']
-        
-        # Switch back the current player
-        self.board.current_player = Color.BLACK if self.board.current_player == Color.WHITE else Color.WHITE
+        if self._history_plies == len(self.board.move_history) + 1:
+            self._remove_history()
         
         # Update game state
         self._update_game_state()
+        self.mark_changed()
         
         return True
\ No newline at end of file
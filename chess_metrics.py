@@ -0,0 +1,173 @@
+"""
+Chess Server Metrics
+Request latency histograms, request/error counters and hot-path timers,
+exposed in the Prometheus text format
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, Tuple
+
+# Set CHESS_METRICS=0 to disable the hot-path timers entirely
+METRICS_ENABLED = os.environ.get('CHESS_METRICS', '1') != '0'
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FUNCTION_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+class Histogram:
+    """Fixed-bucket latency histogram for one label set"""
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """Record one observation (caller holds the registry lock)"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Thread-safe store of histograms and counters keyed by label tuples"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, int]] = {}
+        self._meta: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+    
+    def register(self, name: str, kind: str, help_text: str, labels: Tuple[str, ...]):
+        """Declare a metric family so it is exported even before first use"""
+        self._meta[name] = (kind, help_text, labels)
+        if kind == 'histogram':
+            self._histograms.setdefault(name, {})
+        else:
+            self._counters.setdefault(name, {})
+    
+    def observe(self, name: str, labels: Tuple, value: float, buckets: Tuple[float, ...]):
+        """Record a histogram observation"""
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def increment(self, name: str, labels: Tuple, amount: int = 1):
+        """Increment a counter"""
+        with self._lock:
+            series = self._counters[name]
+            series[labels] = series.get(labels, 0) + amount
+    
+    def reset(self):
+        """Drop all recorded values (metric families stay registered)"""
+        with self._lock:
+            for series in self._histograms.values():
+                series.clear()
+            for series in self._counters.values():
+                series.clear()
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, label_names) in self._meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'histogram':
+                    for labels, histogram in sorted(self._histograms[name].items()):
+                        label_str = _format_labels(label_names, labels)
+                        cumulative = 0
+                        for bound, count in zip(histogram.buckets, histogram.counts):
+                            cumulative += count
+                            lines.append(f'{name}_bucket{{{label_str},le="{bound}"}} {cumulative}')
+                        lines.append(f'{name}_bucket{{{label_str},le="+Inf"}} {histogram.count}')
+                        lines.append(f'{name}_sum{{{label_str}}} {histogram.total:.9f}')
+                        lines.append(f'{name}_count{{{label_str}}} {histogram.count}')
+                else:
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f'{name}{{{_format_labels(label_names, labels)}}} {value}')
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value) -> str:
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    """Format a label set as name="value" pairs"""
+    return ','.join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+
+registry = MetricsRegistry()
+registry.register('http_request_duration_seconds', 'histogram',
+                  'HTTP request latency by route', ('route', 'method'))
+registry.register('http_requests_total', 'counter',
+                  'HTTP requests by route and status', ('route', 'method', 'status'))
+registry.register('http_request_errors_total', 'counter',
+                  'HTTP requests that raised or returned a 5xx status', ('route', 'method'))
+registry.register('chess_function_duration_seconds', 'histogram',
+                  'Time spent in rules engine hot paths', ('function',))
+
+def timed(name: str):
+    """Decorator recording the wall time of each call under the given name
+    
+    When metrics are disabled the function is returned unwrapped, so the
+    hot paths pay nothing.
+    """
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        labels = (name,)
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe('chess_function_duration_seconds', labels,
+                                 time.perf_counter() - start, FUNCTION_BUCKETS)
+        return wrapper
+    return decorator
+
+def init_app(app):
+    """Install request timing hooks and the /api/metrics endpoint on a Flask app"""
+    from flask import g, request
+    
+    def route_labels() -> Tuple[str, str]:
+        # Use the URL rule, not the raw path, to keep label cardinality bounded
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        return rule, request.method
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            route, method = route_labels()
+            registry.observe('http_request_duration_seconds', (route, method),
+                             time.perf_counter() - start, HTTP_BUCKETS)
+            registry.increment('http_requests_total', (route, method, response.status_code))
+            if response.status_code >= 500:
+                registry.increment('http_request_errors_total', (route, method))
+        return response
+    
+    @app.teardown_request
+    def record_exception(exc):
+        # after_request is skipped when a view raises; count the error here
+        if exc is not None and g.pop('metrics_start', None) is not None:
+            registry.increment('http_request_errors_total', route_labels())
+    
+    @app.route('/api/metrics')
+    def metrics():
+        """Prometheus metrics endpoint"""
+        return app.response_class(registry.render(),
+                                  content_type='text/plain; version=0.0.4; charset=utf-8')
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Chess Notation
+Standard Algebraic Notation (SAN), UCI move and FEN conversion
+"""
+
+import re
+from typing import Optional, Tuple
+from chess_game import (ChessBoard, Color, Position, PieceType, BLACK_FLAG, TYPE_MASK,
+                        PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, KING_CODE,
+                        WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE,
+                        square_index)
+
+PIECE_LETTERS = {
+    PieceType.KNIGHT: 'N',
+    PieceType.BISHOP: 'B',
+    PieceType.ROOK: 'R',
+    PieceType.QUEEN: 'Q',
+    PieceType.KING: 'K'
+}
+LETTER_PIECES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+
+PROMOTION_TYPES = (PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT)
+
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$')
+CASTLING_SAN = {'O-O': 2, '0-0': 2, 'O-O-O': -2, '0-0-0': -2}
+
+UCI_PATTERN = re.compile(r'^([a-h][1-8])([a-h][1-8])([nbrq])?$')
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+FEN_PIECE_CODES = {
+    'p': PAWN_CODE, 'n': KNIGHT_CODE, 'b': BISHOP_CODE,
+    'r': ROOK_CODE, 'q': QUEEN_CODE, 'k': KING_CODE
+}
+# Castling letters with their rights bit, king square, rook square and color flag
+FEN_CASTLING = (
+    ('K', WHITE_KINGSIDE, 60, 63, 0),
+    ('Q', WHITE_QUEENSIDE, 60, 56, 0),
+    ('k', BLACK_KINGSIDE, 4, 7, BLACK_FLAG),
+    ('q', BLACK_QUEENSIDE, 4, 0, BLACK_FLAG)
+)
+
+def _is_legal_for(board: ChessBoard, piece, to_pos: Position) -> bool:
+    """Legality of one move for a piece of the side to move"""
+    return board.is_legal(piece.position, to_pos)
+
+def san_prefix(board: ChessBoard, from_pos: Position, to_pos: Position,
+               promotion: Optional[PieceType] = None) -> str:
+    """SAN for a move, without the check/mate suffix
+    
+    Must be called on the position before the move is made, since
+    disambiguation depends on which other pieces can reach the target.
+    """
+    piece = board.get_piece(from_pos)
+    if piece.piece_type == PieceType.KING and abs(to_pos.col - from_pos.col) == 2:
+        return 'O-O' if to_pos.col > from_pos.col else 'O-O-O'
+    
+    target = to_pos.to_algebraic()
+    if piece.piece_type == PieceType.PAWN:
+        # A diagonal pawn move is always a capture (possibly en passant)
+        if from_pos.col != to_pos.col:
+            notation = f"{from_pos.to_algebraic()[0]}x{target}"
+        else:
+            notation = target
+        if to_pos.row in (0, 7):
+            notation += '=' + PIECE_LETTERS[promotion or PieceType.QUEEN]
+        return notation
+    
+    notation = PIECE_LETTERS[piece.piece_type]
+    # Other pieces with the same code that can also reach the target
+    code = piece.code
+    from_index = square_index(from_pos)
+    rivals = [
+        Position(index >> 3, index & 7) for index, other in enumerate(board.squares)
+        if other == code and index != from_index and
+        board.is_legal(Position(index >> 3, index & 7), to_pos)
+    ]
+    if rivals:
+        origin = from_pos.to_algebraic()
+        if all(other.col != from_pos.col for other in rivals):
+            notation += origin[0]
+        elif all(other.row != from_pos.row for other in rivals):
+            notation += origin[1]
+        else:
+            notation += origin
+    if board.get_piece(to_pos) is not None:
+        notation += 'x'
+    return notation + target
+
+def san_suffix(game) -> str:
+    """Check ('+') or mate ('#') marker for the position after a move"""
+    from chess_mechanics import GameState
+    if game.game_state == GameState.CHECKMATE:
+        return '#'
+    if game.game_state == GameState.CHECK:
+        return '+'
+    return ''
+
+def parse_san(board: ChessBoard, san: str) -> Tuple[Position, Position, Optional[PieceType]]:
+    """Resolve a SAN move for the side to move to (from, to, promotion)
+    
+    Raises ValueError if the move is malformed, illegal or ambiguous.
+    """
+    text = san.strip().rstrip('+#!?')
+    color = board.current_player
+    
+    if text in CASTLING_SAN:
+        king_pos = board.king_positions[color]
+        king = board.get_piece(king_pos)
+        to_pos = Position(king_pos.row, king_pos.col + CASTLING_SAN[text])
+        if (king is None or king.piece_type != PieceType.KING or
+                to_pos not in board.get_valid_moves(king)):
+            raise ValueError(f"Illegal move: {san}")
+        return king_pos, to_pos, None
+    
+    match = SAN_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Malformed SAN: {san}")
+    letter, from_file, from_rank, _, target, promotion_letter = match.groups()
+    piece_type = LETTER_PIECES[letter] if letter else PieceType.PAWN
+    to_pos = Position.from_algebraic(target)
+    
+    candidates = []
+    for piece in board.get_all_pieces(color):
+        if piece.piece_type != piece_type:
+            continue
+        if from_file and piece.position.col != ord(from_file) - ord('a'):
+            continue
+        if from_rank and piece.position.row != 8 - int(from_rank):
+            continue
+        if _is_legal_for(board, piece, to_pos):
+            candidates.append(piece)
+    if not candidates:
+        raise ValueError(f"Illegal move: {san}")
+    if len(candidates) > 1:
+        raise ValueError(f"Ambiguous move: {san}")
+    
+    promotion = None
+    if piece_type == PieceType.PAWN and to_pos.row in (0, 7):
+        promotion = LETTER_PIECES[promotion_letter] if promotion_letter else PieceType.QUEEN
+    elif promotion_letter:
+        raise ValueError(f"Promotion on a non-promoting move: {san}")
+    return candidates[0].position, to_pos, promotion
+
+def parse_uci(text: str) -> Tuple[Position, Position, Optional[PieceType]]:
+    """Split a UCI move (e.g. 'e2e4', 'e7e8q') into (from, to, promotion)
+    
+    Only the syntax is checked; legality is up to ChessGame.make_move.
+    """
+    match = UCI_PATTERN.match(text.strip().lower())
+    if not match:
+        raise ValueError(f"Malformed UCI move: {text}")
+    from_square, to_square, promotion_letter = match.groups()
+    promotion = LETTER_PIECES[promotion_letter.upper()] if promotion_letter else None
+    return Position.from_algebraic(from_square), Position.from_algebraic(to_square), promotion
+
+def move_to_uci(from_pos: Position, to_pos: Position,
+                promotion: Optional[PieceType] = None) -> str:
+    """UCI text for a move"""
+    suffix = PIECE_LETTERS[promotion].lower() if promotion else ''
+    return from_pos.to_algebraic() + to_pos.to_algebraic() + suffix
+
+def castling_rights(board: ChessBoard) -> str:
+    """FEN castling field for the board's castling rights"""
+    return ''.join(letter for letter, bit, _, _, _ in FEN_CASTLING if board.castling & bit) or '-'
+
+def board_to_fen(board: ChessBoard) -> str:
+    """Forsyth-Edwards Notation for a position"""
+    ranks = []
+    for rank in re.findall('.{8}', board.to_piece_string()):
+        ranks.append(re.sub(r'\.+', lambda m: str(len(m.group())), rank))
+    en_passant = board.en_passant_target.to_algebraic() if board.en_passant_target else '-'
+    return ' '.join((
+        '/'.join(ranks),
+        'w' if board.current_player == Color.WHITE else 'b',
+        castling_rights(board),
+        en_passant,
+        str(board.halfmove_clock),
+        str(board.fullmove_number)
+    ))
+
+def game_from_fen(fen: str):
+    """A ChessGame set up from a FEN string
+    
+    The move clocks are optional. Raises ValueError for malformed FEN.
+    """
+    from chess_mechanics import ChessGame
+    fields = fen.split()
+    if len(fields) not in (4, 6):
+        raise ValueError(f"FEN needs 4 or 6 fields: {fen}")
+    placement, side, castling, en_passant = fields[:4]
+    ranks = placement.split('/')
+    if len(ranks) != 8 or side not in ('w', 'b'):
+        raise ValueError(f"Malformed FEN: {fen}")
+    
+    game = ChessGame()
+    board = game.board
+    board.clear()
+    kings = []
+    for row, rank in enumerate(ranks):
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+                continue
+            code = FEN_PIECE_CODES.get(char.lower())
+            if code is None or col > 7:
+                raise ValueError(f"Malformed FEN: {fen}")
+            if char.islower():
+                code |= BLACK_FLAG
+            board.set_code(row * 8 + col, code)
+            if code & TYPE_MASK == KING_CODE:
+                kings.append(code)
+            col += 1
+        if col != 8:
+            raise ValueError(f"Malformed FEN: {fen}")
+    if sorted(kings) != [KING_CODE, KING_CODE | BLACK_FLAG]:
+        raise ValueError(f"FEN must have one king per side: {fen}")
+    
+    for letter, bit, king_index, rook_index, flag in FEN_CASTLING:
+        if letter not in castling:
+            continue
+        if (board.squares[king_index] != KING_CODE | flag or
+                board.squares[rook_index] != ROOK_CODE | flag):
+            raise ValueError(f"Castling right {letter} without king and rook: {fen}")
+        board.castling |= bit
+    
+    board.current_player = Color.WHITE if side == 'w' else Color.BLACK
+    board.en_passant_target = None if en_passant == '-' else Position.from_algebraic(en_passant)
+    if len(fields) == 6:
+        try:
+            board.halfmove_clock = int(fields[4])
+            board.fullmove_number = int(fields[5])
+        except ValueError:
+            raise ValueError(f"Malformed FEN move clocks: {fen}") from None
+    game._update_game_state()
+    game.mark_changed()
+    return game
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Chess PGN Support
+Streaming PGN reader and writer
+
+read_games() is a generator over lines, so a game database of any size is
+processed one game at a time with flat memory use:
+    
+    for pgn_game in iter_games('archive.pgn.gz'):
+        game = pgn_game.replay()
+
+A game with SetUp/FEN tags is replayed from its FEN position, and
+write_game() numbers its movetext from that position.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+from chess_game import Color
+from chess_mechanics import ChessGame, GameState
+from chess_notation import game_from_fen, parse_san
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+# Tags written first, in this order (the PGN "Seven Tag Roster")
+SEVEN_TAG_ROSTER = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+
+TAG_PATTERN = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN_PATTERN = re.compile(r'[^\s{}();]+')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+
+class PgnGame:
+    """A game read from PGN: tag pairs, SAN moves and the result"""
+    def __init__(self, headers: Optional[Dict[str, str]] = None,
+                 moves: Optional[List[str]] = None, result: str = '*'):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []
+        self.result = result
+    
+    def __repr__(self):
+        return f"PgnGame({self.headers.get('White', '?')} - {self.headers.get('Black', '?')}, {len(self.moves)} plies, {self.result})"
+    
+    @property
+    def start_fen(self) -> Optional[str]:
+        """The FEN of the position the game starts from (None for the standard start)"""
+        return setup_fen(self.headers)
+    
+    def replay(self) -> ChessGame:
+        """Play the moves on a new ChessGame, set up from the FEN tag if there is one
+        
+        Raises ValueError naming the first move that cannot be played, or
+        for a malformed FEN tag.
+        """
+        fen = self.start_fen
+        try:
+            game = game_from_fen(fen) if fen else ChessGame()
+        except ValueError as e:
+            raise ValueError(f"FEN tag: {e}") from None
+        for index, san in enumerate(self.moves):
+            try:
+                from_pos, to_pos, promotion = parse_san(game.board, san)
+            except ValueError as e:
+                raise ValueError(f"Move {index + 1} ({san}): {e}") from None
+            if not game.make_move(from_pos, to_pos, promotion):
+                raise ValueError(f"Move {index + 1} ({san}): illegal move")
+        return game
+
+def setup_fen(headers: Dict[str, str]) -> Optional[str]:
+    """The FEN tag of a game that starts from a set-up position, else None"""
+    if headers.get('SetUp', '1') == '0':
+        return None
+    return headers.get('FEN') or None
+
+def _unescape(value: str) -> str:
+    """Undo PGN tag value escaping"""
+    return re.sub(r'\\(.)', r'\1', value)
+
+def _escape(value: str) -> str:
+    """Escape a PGN tag value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+def read_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    """Parse PGN text line by line, yielding each game as soon as it ends
+    
+    Comments, variations, NAGs and move numbers are skipped. Only the
+    current game is held in memory.
+    """
+    headers: Dict[str, str] = {}
+    moves: List[str] = []
+    in_comment = False
+    variation_depth = 0
+    
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not in_comment:
+            if not line or line.startswith('%'):
+                continue
+            tag = TAG_PATTERN.match(line)
+            if tag:
+                if moves:
+                    # Movetext ended without a result token
+                    yield PgnGame(headers, moves, headers.get('Result', '*'))
+                    headers, moves, variation_depth = {}, [], 0
+                headers[tag.group(1)] = _unescape(tag.group(2))
+                continue
+        
+        pos = 0
+        length = len(line)
+        while pos < length:
+            if in_comment:
+                end = line.find('}', pos)
+                if end == -1:
+                    break
+                in_comment = False
+                pos = end + 1
+                continue
+            char = line[pos]
+            if char.isspace():
+                pos += 1
+            elif char == '{':
+                in_comment = True
+                pos += 1
+            elif char == ';':
+                break
+            elif char == '(':
+                variation_depth += 1
+                pos += 1
+            elif char == ')':
+                variation_depth = max(0, variation_depth - 1)
+                pos += 1
+            else:
+                token_match = TOKEN_PATTERN.match(line, pos)
+                pos = token_match.end()
+                if variation_depth:
+                    continue
+                token = token_match.group()
+                if token in RESULTS:
+                    yield PgnGame(headers, moves, token)
+                    headers, moves, variation_depth = {}, [], 0
+                    continue
+                if token.startswith('$'):
+                    continue
+                token = MOVE_NUMBER_PATTERN.sub('', token)
+                if token:
+                    moves.append(token)
+    
+    if headers or moves:
+        yield PgnGame(headers, moves, headers.get('Result', '*'))
+
+def open_pgn(path: str) -> TextIO:
+    """Open a PGN file for streaming, transparently decompressing .gz/.bz2/.xz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+def iter_games(path: str) -> Iterator[PgnGame]:
+    """Stream the games of a PGN file"""
+    with open_pgn(path) as f:
+        yield from read_games(f)
+
+def game_result(game: ChessGame) -> str:
+    """PGN result token for a ChessGame"""
+    if game.game_state == GameState.CHECKMATE:
+        return '1-0' if game.get_winner() == Color.WHITE else '0-1'
+    if game.game_state in (GameState.STALEMATE, GameState.DRAW):
+        return '1/2-1/2'
+    return '*'
+
+def format_movetext(san_moves: List[str], result: str, width: int = 79,
+                    first_ply: int = 0) -> List[str]:
+    """Numbered movetext wrapped to the given width
+    
+    first_ply counts the plies before the first move, so a game set up with
+    black to move on move 12 (first_ply 23) starts '12... '.
+    """
+    tokens = []
+    for index, san in enumerate(san_moves, first_ply):
+        if index % 2 == 0:
+            tokens.append(f"{index // 2 + 1}.")
+        elif index == first_ply:
+            tokens.append(f"{index // 2 + 1}...")
+        tokens.append(san)
+    tokens.append(result)
+    
+    lines = []
+    current = ''
+    for token in tokens:
+        if current and len(current) + 1 + len(token) > width:
+            lines.append(current)
+            current = token
+        else:
+            current = f"{current} {token}" if current else token
+    lines.append(current)
+    return lines
+
+def _first_ply(fen: Optional[str]) -> int:
+    """Plies played before a FEN position, from its side to move and move number"""
+    fields = fen.split() if fen else []
+    if len(fields) < 2:
+        return 0
+    fullmove = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() else 1
+    return 2 * (max(fullmove, 1) - 1) + (fields[1] == 'b')
+
+def write_game(game: ChessGame, out: TextIO, headers: Optional[Dict[str, str]] = None):
+    """Write a ChessGame's move history as one PGN game
+    
+    A game that did not start from the standard position needs its
+    SetUp/FEN tags in headers (as read_games() keeps them).
+    """
+    result = game_result(game)
+    tags = {'Event': '?', 'Site': '?', 'Date': '????.??.??', 'Round': '?',
+            'White': '?', 'Black': '?'}
+    tags.update(headers or {})
+    # Keep a recorded result (e.g. a resignation) for games still in progress here
+    if result == '*':
+        result = tags.get('Result', '*')
+    tags['Result'] = result
+    
+    for name in SEVEN_TAG_ROSTER:
+        out.write(f'[{name} "{_escape(tags[name])}"]\n')
+    for name, value in tags.items():
+        if name not in SEVEN_TAG_ROSTER:
+            out.write(f'[{name} "{_escape(value)}"]\n')
+    out.write('\n')
+    first_ply = _first_ply(setup_fen(tags))
+    for line in format_movetext(game.get_san_moves(), result, first_ply=first_ply):
+        out.write(line + '\n')
+    out.write('\n')
+
+def game_to_pgn(game: ChessGame, headers: Optional[Dict[str, str]] = None) -> str:
+    """PGN text for a ChessGame"""
+    buffer = io.StringIO()
+    write_game(game, buffer, headers)
+    return buffer.getvalue()
\ No newline at end of file
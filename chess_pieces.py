@@ -1,219 +1,297 @@
 """
 Chess Pieces Implementation
 Contains all individual piece classes with their movement logic
+
+Move generation works directly on the board's piece codes; the piece
+classes are the object facade that ChessBoard.get_piece() returns.
 """
 
-from chess_game import Piece, Position, Color, PieceType
-from typing import List
+from chess_game import (Piece, Position, PieceType, BLACK_FLAG, TYPE_MASK,
+                        PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, KING_CODE,
+                        WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE,
+                        square_index)
+from chess_tables import (SQUARES, KNIGHT_TARGETS, KING_TARGETS,
+                          ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS)
+from functools import lru_cache
+from typing import List, Tuple
 
-class Pawn(Piece):
-    """Pawn piece implementation"""
-    def __init__(self, color: Color, position: Position):
-        super().__init__(color, position)
-        self.piece_type = PieceType.PAWN
+# scan_king_ray() result for a ray with neither a check nor a pin
+NO_RAY: Tuple[int, int, Tuple[int, ...]] = (-1, -1, ())
+
+# Positions whose attack counts are kept
+ATTACK_CACHE_SIZE = 1024
+
+def _sliding_moves(squares: bytearray, side: int, rays: Tuple[Tuple[int, ...], ...]) -> List[Position]:
+    """Walk each ray until it leaves the board or hits a piece"""
+    moves = []
+    for ray in rays:
+        for target in ray:
+            occupant = squares[target]
+            if not occupant:
+                moves.append(SQUARES[target])
+            else:
+                if occupant & BLACK_FLAG != side:
+                    moves.append(SQUARES[target])
+                break
+    return moves
+
+def _step_moves(squares: bytearray, side: int, targets: Tuple[int, ...]) -> List[Position]:
+    """Single-step targets that are empty or hold an enemy piece"""
+    return [
+        SQUARES[target] for target in targets
+        if not squares[target] or squares[target] & BLACK_FLAG != side
+    ]
+
+def _pawn_moves(board, index: int, side: int) -> List[Position]:
+    """Pushes, captures and en passant for a pawn"""
+    squares = board.squares
+    row, col = divmod(index, 8)
+    direction = 1 if side else -1
+    start_row = 1 if side else 6
+    forward_row = row + direction
+    moves = []
+    if not 0 <= forward_row < 8:
+        return moves
     
-    def get_possible_moves(self, board) -> List[Position]:
-        moves = []
-        direction = -1 if self.color == Color.WHITE else 1
-        start_row = 6 if self.color == Color.WHITE else 1
-        
-        # Forward move
-        forward_pos = Position(self.position.row + direction, self.position.col)
-        if forward_pos.is_valid() and board.is_empty(forward_pos):
-            moves.append(forward_pos)
-            
-            # Double move from starting position
-            if self.position.row == start_row:
-                double_move = Position(self.position.row + 2 * direction, self.position.col)
-                if double_move.is_valid() and board.is_empty(double_move):
-                    moves.append(double_move)
-        
-        # Diagonal captures
-        for col_offset in [-1, 1]:
-            capture_pos = Position(self.position.row + direction, self.position.col + col_offset)
-            if capture_pos.is_valid() and board.is_enemy_piece(capture_pos, self.color):
-                moves.append(capture_pos)
+    # Forward move
+    forward = forward_row * 8 + col
+    if not squares[forward]:
+        moves.append(SQUARES[forward])
         
-        # En passant capture
-        if board.en_passant_target:
-            en_passant_pos = board.en_passant_target
-            if (abs(en_passant_pos.col - self.position.col) == 1 and 
-                en_passant_pos.row == self.position.row + direction):
-                moves.append(en_passant_pos)
-        
-        return moves
+        # Double move from starting position
+        if row == start_row and not squares[forward + direction * 8]:
+            moves.append(SQUARES[forward + direction * 8])
+    
+    # Diagonal captures
+    for col_offset in (-1, 1):
+        if 0 <= col + col_offset < 8:
+            occupant = squares[forward + col_offset]
+            if occupant and occupant & BLACK_FLAG != side:
+                moves.append(SQUARES[forward + col_offset])
+    
+    # En passant capture, onto the target the opponent's double move left
+    # (row 2 for white, row 5 for black)
+    en_passant_pos = board.en_passant_target
+    if (en_passant_pos and abs(en_passant_pos.col - col) == 1 and
+            en_passant_pos.row == forward_row == (5 if side else 2)):
+        moves.append(en_passant_pos)
+    
+    return moves
 
-class Rook(Piece):
-    """Rook piece implementation"""
-    def __init__(self, color: Color, position: Position):
-        super().__init__(color, position)
-        self.piece_type = PieceType.ROOK
+def possible_moves(board, index: int, code: int) -> List[Position]:
+    """Moves of the piece code on square index, ignoring checks and castling"""
+    piece_code = code & TYPE_MASK
+    side = code & BLACK_FLAG
+    if piece_code == PAWN_CODE:
+        return _pawn_moves(board, index, side)
+    if piece_code == KNIGHT_CODE:
+        return _step_moves(board.squares, side, KNIGHT_TARGETS[index])
+    if piece_code == BISHOP_CODE:
+        return _sliding_moves(board.squares, side, BISHOP_RAYS[index])
+    if piece_code == ROOK_CODE:
+        return _sliding_moves(board.squares, side, ROOK_RAYS[index])
+    if piece_code == QUEEN_CODE:
+        # Queen moves like both rook and bishop
+        return _sliding_moves(board.squares, side, QUEEN_RAYS[index])
+    return _step_moves(board.squares, side, KING_TARGETS[index])
+
+def castling_moves(board, index: int, code: int) -> List[Position]:
+    """Castling targets for a king, from the board's castling rights
     
-    def get_possible_moves(self, board) -> List[Position]:
-        moves = []
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Right, Left, Down, Up
-        
-        for dr, dc in directions:
-            for i in range(1, 8):
-                new_pos = Position(self.position.row + i * dr, self.position.col + i * dc)
-                if not new_pos.is_valid():
-                    break
-                
-                if board.is_empty(new_pos):
-                    moves.append(new_pos)
-                elif board.is_enemy_piece(new_pos, self.color):
-                    moves.append(new_pos)
-                    break
-                else:  # Friendly piece
+    Checks the rights, that the squares between king and rook are empty and
+    that the king is not in check and does not pass through an attacked
+    square. Whether the king's target square is attacked is left to the
+    king safety test every king move gets.
+    """
+    side = code & BLACK_FLAG
+    kingside, queenside = (BLACK_KINGSIDE, BLACK_QUEENSIDE) if side else (WHITE_KINGSIDE, WHITE_QUEENSIDE)
+    if not board.castling & (kingside | queenside) or index != (4 if side else 60):
+        return []
+    
+    squares = board.squares
+    rook = ROOK_CODE | side
+    enemy = side ^ BLACK_FLAG
+    moves = []
+    if (board.castling & kingside and squares[index + 3] == rook and
+            not squares[index + 1] and not squares[index + 2]):
+        moves.append(index + 2)
+    if (board.castling & queenside and squares[index - 4] == rook and
+            not squares[index - 1] and not squares[index - 2] and not squares[index - 3]):
+        moves.append(index - 2)
+    if not moves or is_attacked(board, index, enemy):
+        return []
+    # The square the king passes over lies between its start and target
+    return [SQUARES[target] for target in moves
+            if not is_attacked(board, (index + target) // 2, enemy)]
+
+def can_reach(board, index: int, target: int, code: int) -> bool:
+    """Whether the piece code on index can move to target, ignoring checks
+    
+    Tests only the one requested move: a table lookup for knights and kings,
+    a walk along the single ray through target for sliding pieces.
+    """
+    squares = board.squares
+    side = code & BLACK_FLAG
+    occupant = squares[target]
+    if occupant and occupant & BLACK_FLAG == side:
+        return False
+    
+    piece_code = code & TYPE_MASK
+    if piece_code == PAWN_CODE:
+        return SQUARES[target] in _pawn_moves(board, index, side)
+    if piece_code == KNIGHT_CODE:
+        return target in KNIGHT_TARGETS[index]
+    if piece_code == KING_CODE:
+        return (target in KING_TARGETS[index] or
+                SQUARES[target] in castling_moves(board, index, code))
+    
+    rays = ROOK_RAYS if piece_code == ROOK_CODE else BISHOP_RAYS if piece_code == BISHOP_CODE else QUEEN_RAYS
+    for ray in rays[index]:
+        if target in ray:
+            for square in ray:
+                if square == target:
+                    return True
+                if squares[square]:
+                    return False
+    return False
+
+def is_attacked(board, index: int, by_side: int) -> bool:
+    """Whether any piece of by_side (0 or BLACK_FLAG) attacks square index"""
+    squares = board.squares
+    knight = KNIGHT_CODE | by_side
+    for target in KNIGHT_TARGETS[index]:
+        if squares[target] == knight:
+            return True
+    king = KING_CODE | by_side
+    for target in KING_TARGETS[index]:
+        if squares[target] == king:
+            return True
+    
+    queen = QUEEN_CODE | by_side
+    for attacker, rays in ((ROOK_CODE | by_side, ROOK_RAYS), (BISHOP_CODE | by_side, BISHOP_RAYS)):
+        for ray in rays[index]:
+            for target in ray:
+                occupant = squares[target]
+                if occupant:
+                    if occupant == attacker or occupant == queen:
+                        return True
                     break
-        
-        return moves
+    
+    # Pawns attack diagonally forward, so look one row back from their side
+    row, col = divmod(index, 8)
+    pawn_row = row - 1 if by_side else row + 1
+    if 0 <= pawn_row < 8:
+        pawn = PAWN_CODE | by_side
+        for pawn_col in (col - 1, col + 1):
+            if 0 <= pawn_col < 8 and squares[pawn_row * 8 + pawn_col] == pawn:
+                return True
+    return False
+
+@lru_cache(maxsize=ATTACK_CACHE_SIZE)
+def attack_counts(squares: bytes) -> Tuple[bytes, bytes]:
+    """How many white and how many black pieces attack each square
+    
+    Computed in one pass over the pieces of a position's 64 piece codes,
+    and cached per position. On an occupied square the count of the
+    piece's own color is its defenders. Only direct attacks count: a
+    slider's line ends at the first piece, even one of its own color.
+    """
+    counts = (bytearray(64), bytearray(64))
+    for index, code in enumerate(squares):
+        if not code:
+            continue
+        side_counts = counts[code >> 3]
+        piece_code = code & TYPE_MASK
+        if piece_code == PAWN_CODE:
+            row, col = divmod(index, 8)
+            row += 1 if code & BLACK_FLAG else -1
+            if 0 <= row < 8:
+                for target_col in (col - 1, col + 1):
+                    if 0 <= target_col < 8:
+                        side_counts[row * 8 + target_col] += 1
+        elif piece_code == KNIGHT_CODE or piece_code == KING_CODE:
+            for target in (KNIGHT_TARGETS if piece_code == KNIGHT_CODE else KING_TARGETS)[index]:
+                side_counts[target] += 1
+        else:
+            rays = ROOK_RAYS if piece_code == ROOK_CODE else BISHOP_RAYS if piece_code == BISHOP_CODE else QUEEN_RAYS
+            for ray in rays[index]:
+                for target in ray:
+                    side_counts[target] += 1
+                    if squares[target]:
+                        break
+    return bytes(counts[0]), bytes(counts[1])
+
+def scan_king_ray(squares: bytearray, king_index: int, side: int,
+                  direction: int) -> Tuple[int, int, Tuple[int, ...]]:
+    """Check and pin along one QUEEN_RAYS direction from a king of side
+    
+    Returns (checker, pinned, line): the square of an enemy piece giving
+    check along the ray, or of the one friendly piece pinned on it (-1 when
+    there is none), and the ray squares from the king up to and including
+    the attacker - the squares a check can be blocked on, or a pinned piece
+    may still move to.
+    """
+    ray = QUEEN_RAYS[king_index][direction]
+    enemy = side ^ BLACK_FLAG
+    # QUEEN_RAYS holds the four rook directions, then the four bishop ones
+    slider = (ROOK_CODE if direction < 4 else BISHOP_CODE) | enemy
+    queen = QUEEN_CODE | enemy
+    blocker = -1
+    for distance, square in enumerate(ray):
+        occupant = squares[square]
+        if not occupant:
+            continue
+        if occupant & BLACK_FLAG == side:
+            if blocker >= 0:
+                return NO_RAY
+            blocker = square
+            continue
+        if occupant == slider or occupant == queen:
+            line = ray[:distance + 1]
+            return (-1, blocker, line) if blocker >= 0 else (square, -1, line)
+        # An adjacent enemy pawn checks from the two diagonals ahead of it
+        if (not distance and occupant == PAWN_CODE | enemy and
+                direction in ((4, 5) if side else (6, 7))):
+            return square, -1, (square,)
+        return NO_RAY
+    return NO_RAY
+
+def knight_checkers(squares: bytearray, king_index: int, side: int) -> List[int]:
+    """Squares of the enemy knights giving check to a king of side"""
+    knight = KNIGHT_CODE | side ^ BLACK_FLAG
+    return [square for square in KNIGHT_TARGETS[king_index] if squares[square] == knight]
+
+class Pawn(Piece):
+    """Pawn piece implementation"""
+    __slots__ = ()
+    piece_type = PieceType.PAWN
+
+class Rook(Piece):
+    """Rook piece implementation"""
+    __slots__ = ()
+    piece_type = PieceType.ROOK
 
 class Knight(Piece):
     """Knight piece implementation"""
-    def __init__(self, color: Color, position: Position):
-        super().__init__(color, position)
-        self.piece_type = PieceType.KNIGHT
-    
-    def get_possible_moves(self, board) -> List[Position]:
-        moves = []
-        knight_moves = [
-            (-2, -1), (-2, 1), (-1, -2), (-1, 2),
-            (1, -2), (1, 2), (2, -1), (2, 1)
-        ]
-        
-        for dr, dc in knight_moves:
-            new_pos = Position(self.position.row + dr, self.position.col + dc)
-            if (new_pos.is_valid() and 
-                (board.is_empty(new_pos) or board.is_enemy_piece(new_pos, self.color))):
-                moves.append(new_pos)
-        
-        return moves
+    __slots__ = ()
+    piece_type = PieceType.KNIGHT
 
 class Bishop(Piece):
     """Bishop piece implementation"""
-    def __init__(self, color: Color, position: Position):
-        super().__init__(color, position)
-        self.piece_type = PieceType.BISHOP
-    
-    def get_possible_moves(self, board) -> List[Position]:
-        moves = []
-        directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]  # Diagonals
-        
-        for dr, dc in directions:
-            for i in range(1, 8):
-                new_pos = Position(self.position.row + i * dr, self.position.col + i * dc)
-                if not new_pos.is_valid():
-                    break
-                
-                if board.is_empty(new_pos):
-                    moves.append(new_pos)
-                elif board.is_enemy_piece(new_pos, self.color):
-                    moves.append(new_pos)
-                    break
-                else:  # Friendly piece
-                    break
-        
-        return moves
+    __slots__ = ()
+    piece_type = PieceType.BISHOP
 
 class Queen(Piece):
     """Queen piece implementation"""
-    def __init__(self, color: Color, position: Position):
-        super().__init__(color, position)
-        self.piece_type = PieceType.QUEEN
-    
-    def get_possible_moves(self, board) -> List[Position]:
-        moves = []
-        # Queen moves like both rook and bishop
-        directions = [
-            (0, 1), (0, -1), (1, 0), (-1, 0),      # Rook moves
-            (1, 1), (1, -1), (-1, 1), (-1, -1)     # Bishop moves
-        ]
-        
-        for dr, dc in directions:
-            for i in range(1, 8):
-                new_pos = Position(self.position.row + i * dr, self.position.col + i * dc)
-                if not new_pos.is_valid():
-                    break
-                
-                if board.is_empty(new_pos):
-                    moves.append(new_pos)
-                elif board.is_enemy_piece(new_pos, self.color):
-                    moves.append(new_pos)
-                    break
-                else:  # Friendly piece
-                    break
-        
-        return moves
+    __slots__ = ()
+    piece_type = PieceType.QUEEN
 
 class King(Piece):
     """King piece implementation"""
-    def __init__(self, color: Color, position: Position):
-        super().__init__(color, position)
-        self.piece_type = PieceType.KING
-    
-    def get_possible_moves(self, board) -> List[Position]:
-        moves = []
-        directions = [
-            (0, 1), (0, -1), (1, 0), (-1, 0),      # Orthogonal
-            (1, 1), (1, -1), (-1, 1), (-1, -1)     # Diagonal
-        ]
-        
-        for dr, dc in directions:
-            new_pos = Position(self.position.row + dr, self.position.col + dc)
-            if (new_pos.is_valid() and 
-                (board.is_empty(new_pos) or board.is_enemy_piece(new_pos, self.color))):
-                moves.append(new_pos)
-        
-        return moves
+    __slots__ = ()
+    piece_type = PieceType.KING
     
     def get_possible_moves_with_castling(self, board) -> List[Position]:
         """Get moves including castling - used separately to avoid recursion"""
-        moves = self.get_possible_moves(board)
-        
-        # Castling - check separately to avoid recursion
-        if not self.has_moved:
-            # Simple check for castling without calling is_in_check
-            # Kingside castling
-            if self._can_castle_kingside(board):
-                moves.append(Position(self.position.row, self.position.col + 2))
-            
-            # Queenside castling
-            if self._can_castle_queenside(board):
-                moves.append(Position(self.position.row, self.position.col - 2))
-        
-        return moves
-    
-    def _can_castle_kingside(self, board) -> bool:
-        """Check if kingside castling is possible"""
-        row = self.position.row
-        
-        # Check if rook is in place and hasn't moved
-        rook_pos = Position(row, 7)
-        rook = board.get_piece(rook_pos)
-        if not rook or rook.piece_type != PieceType.ROOK or rook.has_moved:
-            return False
-        
-        # Check if squares between king and rook are empty
-        for col in range(self.position.col + 1, 7):
-            if not board.is_empty(Position(row, col)):
-                return False
-        
-        return True
-    
-    def _can_castle_queenside(self, board) -> bool:
-        """Check if queenside castling is possible"""
-        row = self.position.row
-        
-        # Check if rook is in place and hasn't moved
-        rook_pos = Position(row, 0)
-        rook = board.get_piece(rook_pos)
-        if not rook or rook.piece_type != PieceType.ROOK or rook.has_moved:
-            return False
-        
-        # Check if squares between king and rook are empty
-        for col in range(1, self.position.col):
-            if not board.is_empty(Position(row, col)):
-                return False
-        
-        return True
\ No newline at end of file
+        index = square_index(self.position)
+        return possible_moves(board, index, self.code) + castling_moves(board, index, self.code)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Chess Request Profiler
+Opt-in, rate-limited cProfile capture of individual requests, with the
+hotspots in the rules engine aggregated for an admin endpoint
+"""
+
+import hmac
+import os
+import random
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Optional
+
+# Modules whose functions are reported as hotspots
+PROFILED_MODULES = ('chess_game', 'chess_pieces', 'chess_mechanics')
+
+# Request header that asks for a profile in 'header' mode
+PROFILE_HEADER = 'X-Chess-Profile'
+
+# Request header carrying the admin token for the report endpoint
+ADMIN_TOKEN_HEADER = 'X-Chess-Admin-Token'
+
+class RequestProfiler:
+    """Profiles selected requests and aggregates per-function statistics
+    
+    Modes:
+        off     - never profile (the default, costs one attribute check)
+        header  - profile requests carrying the X-Chess-Profile header
+        sample  - profile a random fraction of requests
+    In every mode at most one request is profiled at a time, and at most
+    one per min_interval seconds.
+    """
+    
+    def __init__(self, mode: str = 'off', sample_rate: float = 0.01,
+                 min_interval: float = 1.0, admin_token: Optional[str] = None):
+        if mode not in ('off', 'header', 'sample'):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.mode = mode
+        self.enabled = mode != 'off'
+        self.sample_rate = sample_rate
+        self.min_interval = min_interval
+        self.admin_token = admin_token
+        self._active = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._last_profile = 0.0
+        self._functions: Dict[str, List[float]] = {}
+        self._endpoints: Dict[str, List[float]] = {}
+    
+    @classmethod
+    def from_env(cls) -> 'RequestProfiler':
+        """Build a profiler from CHESS_PROFILING* environment variables"""
+        return cls(
+            mode=os.environ.get('CHESS_PROFILING', 'off'),
+            sample_rate=float(os.environ.get('CHESS_PROFILE_SAMPLE_RATE', '0.01')),
+            min_interval=float(os.environ.get('CHESS_PROFILE_MIN_INTERVAL', '1.0')),
+            admin_token=os.environ.get('CHESS_ADMIN_TOKEN') or None
+        )
+    
+    def is_admin(self, token: Optional[str]) -> bool:
+        """Check an admin token (always False when no token is configured)"""
+        return bool(self.admin_token and token and hmac.compare_digest(token, self.admin_token))
+    
+    def wants_profile(self, headers) -> bool:
+        """Decide whether the current request should be profiled"""
+        if self.mode == 'header':
+            value = headers.get(PROFILE_HEADER)
+            if not value:
+                return False
+            # With an admin token configured, only admins may trigger profiles
+            if self.admin_token and not self.is_admin(value):
+                return False
+        elif random.random() >= self.sample_rate:
+            return False
+        return time.monotonic() - self._last_profile >= self.min_interval
+    
+    def run(self, endpoint: str, func, *args, **kwargs):
+        """Call func under cProfile, unless another profile is in progress"""
+        if not self._active.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            # Imported here so servers that never profile don't load them
+            import cProfile
+            self._last_profile = time.monotonic()
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._record(endpoint, profile, time.perf_counter() - start)
+        finally:
+            self._active.release()
+    
+    def _record(self, endpoint: str, profile, elapsed: float):
+        """Fold one profile into the aggregated statistics"""
+        import pstats
+        stats = pstats.Stats(profile).stats
+        with self._stats_lock:
+            totals = self._endpoints.setdefault(endpoint, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+            for (filename, lineno, funcname), (_, calls, tottime, cumtime, _) in stats.items():
+                module = os.path.splitext(os.path.basename(filename))[0]
+                if module not in PROFILED_MODULES:
+                    continue
+                entry = self._functions.setdefault(f"{module}.{funcname}:{lineno}", [0, 0.0, 0.0])
+                entry[0] += calls
+                entry[1] += tottime
+                entry[2] += cumtime
+    
+    def report(self, limit: int = 25, sort: str = 'tottime') -> dict:
+        """Aggregated hotspots, sorted by 'tottime', 'cumtime' or 'calls'"""
+        index = {'calls': 0, 'tottime': 1, 'cumtime': 2}.get(sort, 1)
+        with self._stats_lock:
+            functions = sorted(self._functions.items(), key=lambda item: item[1][index], reverse=True)
+            return {
+                'mode': self.mode,
+                'endpoints': {
+                    name: {'requests': count, 'total_seconds': round(total, 6)}
+                    for name, (count, total) in self._endpoints.items()
+                },
+                'hotspots': [
+                    {
+                        'function': name,
+                        'calls': calls,
+                        'tottime': round(tottime, 6),
+                        'cumtime': round(cumtime, 6)
+                    }
+                    for name, (calls, tottime, cumtime) in functions[:limit]
+                ]
+            }
+    
+    def reset(self):
+        """Discard the aggregated statistics"""
+        with self._stats_lock:
+            self._functions.clear()
+            self._endpoints.clear()
+
+profiler = RequestProfiler.from_env()
+
+def profiled(view):
+    """Decorator profiling a Flask view when the profiler selects the request"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if profiler.enabled:
+            from flask import request
+            if profiler.wants_profile(request.headers):
+                return profiler.run(request.endpoint or view.__name__, view, *args, **kwargs)
+        return view(*args, **kwargs)
+    return wrapper
+
+def init_app(app):
+    """Register the /api/admin/profile report endpoint on a Flask app"""
+    from flask import jsonify, request
+    
+    @app.route('/api/admin/profile', methods=['GET', 'DELETE'])
+    def profile_report():
+        """Aggregated profiling hotspots (requires the admin token)"""
+        if not profiler.is_admin(request.headers.get(ADMIN_TOKEN_HEADER)):
+            return jsonify({'error': 'Forbidden'}), 403
+        if request.method == 'DELETE':
+            profiler.reset()
+            return jsonify({'status': 'reset'})
+        limit = request.args.get('limit', 25, type=int)
+        return jsonify(profiler.report(limit=limit, sort=request.args.get('sort', 'tottime')))
\ No newline at end of file
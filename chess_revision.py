@@ -0,0 +1,19 @@
+"""
+Chess Revision
+The git commit of the source tree, recorded in benchmark and load-test
+reports so that runs from different commits can be told apart
+"""
+
+import os
+import subprocess
+from typing import Optional
+
+def git_commit() -> Optional[str]:
+    """The commit of the source tree, if it is a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Chess Self-Play
+Automated matches between move-selection policies, played across a pool of
+worker processes
+    
+    python chess_selfplay.py greedy random --games 200 --workers 8 -o games.jsonl
+
+Policies: 'random' (uniform over legal moves), 'greedy' (the capture of the
+most valuable piece, else a random move) and 'minimax' (the alpha-beta
+search of chess_analysis at --depth plies). With --alternate the two
+policies swap colors every game. ChessGame only ends games by checkmate or
+stalemate, so the runner also adjudicates the fifty-move rule, bare kings
+and a ply limit.
+
+Each game is seeded from --seed and its number, so a match replays
+identically whatever the worker count. A JSON summary with games/s,
+moves/s, the mean time to choose and play a move and the results per
+policy is printed to stdout; -o writes one JSON line per game.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from chess_analysis import DEFAULT_DEPTH, PIECE_VALUES, Move, legal_move_list, search
+from chess_batch import CHUNKS_PER_WORKER, bounded_map, chunked
+from chess_game import Color, Position, KING_CODE, TYPE_MASK
+from chess_mechanics import ChessGame
+from chess_notation import board_to_fen, move_to_uci
+from chess_pgn import game_result
+
+DEFAULT_GAMES = 100
+DEFAULT_MAX_PLIES = 400
+DEFAULT_CHUNK_SIZE = 4
+# Half-moves without a capture or pawn move before a game is drawn
+FIFTY_MOVE_PLIES = 100
+
+# policy(game, legal moves, rng, depth) -> move
+Policy = Callable[[ChessGame, List[Move], random.Random, int], Move]
+
+# (game number, white policy, black policy, seed, max plies, minimax depth)
+GameSpec = Tuple[int, str, str, int, int, int]
+
+def random_policy(game: ChessGame, moves: List[Move], rng: random.Random, depth: int) -> Move:
+    """Any legal move"""
+    return rng.choice(moves)
+
+def greedy_policy(game: ChessGame, moves: List[Move], rng: random.Random, depth: int) -> Move:
+    """A capture of the most valuable piece, else any legal move"""
+    squares = game.board.squares
+    best_value = 0
+    best = []
+    for move in moves:
+        victim = squares[move[1]]
+        if not victim:
+            # legal_move_list() puts captures first
+            break
+        value = PIECE_VALUES[victim & TYPE_MASK]
+        if value > best_value:
+            best_value, best = value, [move]
+        elif value == best_value:
+            best.append(move)
+    return rng.choice(best or moves)
+
+def minimax_policy(game: ChessGame, moves: List[Move], rng: random.Random, depth: int) -> Move:
+    """The best move of a depth-ply material search"""
+    _, best, _ = search(game, depth)
+    return best or rng.choice(moves)
+
+POLICIES: Dict[str, Policy] = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+    'minimax': minimax_policy
+}
+
+def _adjudicate(game: ChessGame, plies: int, max_plies: int) -> Optional[str]:
+    """Why the game is over, or None while it goes on"""
+    if game.is_game_over():
+        return game.game_state.value
+    board = game.board
+    if board.halfmove_clock >= FIFTY_MOVE_PLIES:
+        return 'fifty_moves'
+    if all(code & TYPE_MASK == KING_CODE for code in board.squares if code):
+        return 'insufficient_material'
+    if plies >= max_plies:
+        return 'max_plies'
+    return None
+
+def play_game(spec: GameSpec) -> dict:
+    """Play one game between two policies"""
+    number, white, black, seed, max_plies, depth = spec
+    rng = random.Random(seed)
+    policies = {Color.WHITE: POLICIES[white], Color.BLACK: POLICIES[black]}
+    game = ChessGame()
+    moves = []
+    move_seconds = make_seconds = 0.0
+    
+    while True:
+        termination = _adjudicate(game, len(moves), max_plies)
+        if termination:
+            break
+        start = time.perf_counter()
+        legal = legal_move_list(game.board)
+        from_index, to_index = policies[game.board.current_player](game, legal, rng, depth)
+        from_pos = Position(from_index >> 3, from_index & 7)
+        to_pos = Position(to_index >> 3, to_index & 7)
+        chosen = time.perf_counter()
+        if not game.make_move(from_pos, to_pos):
+            raise RuntimeError(f"Game {number}: legal move {move_to_uci(from_pos, to_pos)} was refused")
+        end = time.perf_counter()
+        move_seconds += end - start
+        make_seconds += end - chosen
+        moves.append(move_to_uci(from_pos, to_pos, game.board.move_history[-1].get('promotion')))
+    
+    result = game_result(game)
+    if result == '*' and termination != 'max_plies':
+        result = '1/2-1/2'
+    return {
+        'game': number,
+        'white': white,
+        'black': black,
+        'seed': seed,
+        'result': result,
+        'termination': termination,
+        'plies': len(moves),
+        'move_seconds': move_seconds,
+        'make_move_seconds': make_seconds,
+        'final_fen': board_to_fen(game.board),
+        'moves': ' '.join(moves)
+    }
+
+def play_chunk(chunk: List[GameSpec]) -> List[dict]:
+    """Worker entry point: play a chunk of games"""
+    return [play_game(spec) for spec in chunk]
+
+def game_specs(first: str, second: str, games: int, seed: int, max_plies: int,
+               depth: int, alternate: bool):
+    """The specs of a match's games, first playing White in game 0"""
+    for number in range(games):
+        white, black = (second, first) if alternate and number % 2 else (first, second)
+        yield number, white, black, seed + number, max_plies, depth
+
+def run_match(first: str, second: str, games: int = DEFAULT_GAMES, workers: Optional[int] = None,
+              seed: int = 0, max_plies: int = DEFAULT_MAX_PLIES, depth: int = DEFAULT_DEPTH - 1,
+              alternate: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE, out=None) -> dict:
+    """Play a match, writing a JSON line per game to the text stream out
+    
+    Returns a summary with throughput and result statistics.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(game_specs(first, second, games, seed, max_plies, depth, alternate), chunk_size)
+    results = {'1-0': 0, '0-1': 0, '1/2-1/2': 0, '*': 0}
+    terminations: Dict[str, int] = {}
+    # Points of the first and second player, whichever color they had
+    scores = [0.0, 0.0]
+    plies = 0
+    move_seconds = make_seconds = 0.0
+    
+    start = time.perf_counter()
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if executor:
+            played = bounded_map(executor, play_chunk, chunks, workers * CHUNKS_PER_WORKER)
+        else:
+            played = map(play_chunk, chunks)
+        for records in played:
+            for record in records:
+                if out is not None:
+                    out.write(json.dumps(record) + '\n')
+                results[record['result']] += 1
+                terminations[record['termination']] = terminations.get(record['termination'], 0) + 1
+                white = 1 if alternate and record['game'] % 2 else 0
+                if record['result'] == '1-0':
+                    scores[white] += 1
+                elif record['result'] == '0-1':
+                    scores[1 - white] += 1
+                elif record['result'] == '1/2-1/2':
+                    scores[0] += 0.5
+                    scores[1] += 0.5
+                plies += record['plies']
+                move_seconds += record['move_seconds']
+                make_seconds += record['make_move_seconds']
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    
+    seconds = time.perf_counter() - start
+    return {
+        'players': [first, second],
+        'games': games,
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'games_per_second': round(games / seconds, 2) if seconds else None,
+        'moves_per_second': round(plies / seconds, 1) if seconds else None,
+        'average_plies': round(plies / games, 1) if games else None,
+        'average_move_ms': round(move_seconds / plies * 1000, 3) if plies else None,
+        'average_make_move_ms': round(make_seconds / plies * 1000, 3) if plies else None,
+        'results': results,
+        'terminations': terminations,
+        'scores': scores
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Play automated games between move policies")
+    parser.add_argument('white', choices=sorted(POLICIES), help="policy playing White (in game 0)")
+    parser.add_argument('black', choices=sorted(POLICIES), help="policy playing Black (in game 0)")
+    parser.add_argument('-n', '--games', type=int, default=DEFAULT_GAMES, help="games to play")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count, 1 runs in-process)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of game 0")
+    parser.add_argument('-d', '--depth', type=int, default=DEFAULT_DEPTH - 1,
+                        help="search depth of the minimax policy")
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES,
+                        help="plies after which a game is stopped unfinished")
+    parser.add_argument('-a', '--alternate', action='store_true',
+                        help="swap colors every game")
+    parser.add_argument('-c', '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="games per task sent to a worker")
+    parser.add_argument('-o', '--output', default=None, help="JSON lines file of the games")
+    args = parser.parse_args(argv)
+    if args.games < 1 or args.chunk_size < 1 or args.depth < 1:
+        parser.error("--games, --chunk-size and --depth must be at least 1")
+    
+    options = dict(games=args.games, workers=args.workers, seed=args.seed,
+                   max_plies=args.max_plies, depth=args.depth, alternate=args.alternate,
+                   chunk_size=args.chunk_size)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            summary = run_match(args.white, args.black, out=out, **options)
+    else:
+        summary = run_match(args.white, args.black, **options)
+    print(json.dumps(summary))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Chess Serialization
+Fast JSON payloads for the chess web endpoints
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+from chess_game import ChessBoard
+from chess_pieces import attack_counts
+import chess_boot
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is the fallback
+    orjson = None
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    """Compact JSON encoding using the standard library"""
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def _orjson_dumps(obj: Any) -> bytes:
+    """JSON encoding using orjson"""
+    return orjson.dumps(obj)
+
+DEFAULT_ENCODER: Callable[[Any], bytes] = _orjson_dumps if orjson else _stdlib_dumps
+_encoder: Callable[[Any], bytes] = DEFAULT_ENCODER
+
+def set_json_encoder(encoder: Optional[Callable[[Any], bytes]]):
+    """Install a JSON encoder returning bytes (None restores the default)"""
+    global _encoder
+    _encoder = encoder or DEFAULT_ENCODER
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj to JSON bytes with the active encoder"""
+    return _encoder(obj)
+
+@lru_cache(maxsize=1024)
+def board_rows(piece_string: str) -> Tuple[Tuple[Optional[str], ...], ...]:
+    """Convert a 64-character piece string to the 8x8 board payload
+    
+    Rows are immutable tuples so the cached value can be shared between
+    requests; both encoders emit them as JSON arrays.
+    """
+    return tuple(
+        tuple(None if symbol == '.' else symbol for symbol in piece_string[row * 8:row * 8 + 8])
+        for row in range(8)
+    )
+
+def precomputed_key() -> str:
+    """Snapshot key for precomputed payloads"""
+    import chess_game
+    import chess_mechanics
+    return chess_boot.file_key(__file__, chess_game.__file__, chess_mechanics.__file__)
+
+def precompute(board) -> Dict[str, Dict[str, str]]:
+    """Payload text for a position, stored in the build-time snapshot"""
+    piece_string = board.to_piece_string()
+    return {
+        'board_json': {piece_string: board_json(piece_string)},
+        'board_text': {piece_string: board_text(piece_string)}
+    }
+
+_precomputed = chess_boot.snapshot_section('initial_position', precomputed_key()) or {}
+_precomputed_json: Dict[str, str] = _precomputed.get('board_json', {})
+_precomputed_text: Dict[str, str] = _precomputed.get('board_text', {})
+
+def board_json(piece_string: str) -> str:
+    """JSON text of the board payload, used to embed the board in the page"""
+    return _precomputed_json.get(piece_string) or _board_json(piece_string)
+
+@lru_cache(maxsize=1024)
+def _board_json(piece_string: str) -> str:
+    return dumps(board_rows(piece_string)).decode('utf-8')
+
+def board_text(piece_string: str) -> str:
+    """ASCII board diagram, identical to str(ChessBoard)"""
+    return _precomputed_text.get(piece_string) or _board_text(piece_string)
+
+@lru_cache(maxsize=1024)
+def _board_text(piece_string: str) -> str:
+    return ChessBoard._format_board(piece_string)
+
+def board_data(board) -> Tuple[Tuple[Optional[str], ...], ...]:
+    """Board payload for a ChessBoard"""
+    return board_rows(board.to_piece_string())
+
+@lru_cache(maxsize=1024)
+def attack_rows(squares: bytes) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...]]:
+    """White and black attack counts of a position as 8x8 rows, rank 8 first"""
+    return tuple(
+        tuple(tuple(counts[row * 8:row * 8 + 8]) for row in range(8))
+        for counts in attack_counts(squares)
+    )
+
+def attacks_payload(snapshot) -> dict:
+    """Payload for the chess attacks endpoint, from a GameSnapshot
+    
+    white and black hold, per square, how many pieces of that color attack
+    it; where a piece stands, the count of its own color is its defenders.
+    """
+    white, black = attack_rows(snapshot.squares)
+    return {'white': white, 'black': black}
+
+def status_payload(snapshot) -> dict:
+    """Payload for the chess status endpoint, from a GameSnapshot"""
+    return {
+        'current_player': snapshot.current_player.value,
+        'game_status': snapshot.status,
+        'board': board_text(snapshot.piece_string),
+        'move_count': snapshot.move_count
+    }
\ No newline at end of file
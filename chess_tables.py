@@ -0,0 +1,79 @@
+"""
+Chess Move Tables
+Precomputed per-square move targets and sliding rays
+
+Every table is indexed by square index (row * 8 + col), the same index
+ChessBoard uses for its piece codes, and holds target square indices, so
+move generation never has to build or bounds-check positions. SQUARES maps
+an index back to a shared Position instance. The tables are loaded from the
+build-time snapshot when one is available (see chess_boot.py).
+"""
+
+from typing import Dict, Tuple
+from chess_game import Position
+import chess_boot
+
+# Direction orders match the original piece implementations
+ROOK_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = (
+    (-2, -1), (-2, 1), (-1, -2), (-1, 2),
+    (1, -2), (1, 2), (2, -1), (2, 1)
+)
+
+def tables_key() -> str:
+    """Snapshot key for the tables (they depend on this module and Position)"""
+    import chess_game
+    return chess_boot.file_key(__file__, chess_game.__file__)
+
+def build_tables() -> Dict[str, tuple]:
+    """Compute all move tables"""
+    squares = tuple(Position(row, col) for row in range(8) for col in range(8))
+    
+    def targets(row: int, col: int, offsets) -> Tuple[int, ...]:
+        return tuple(
+            (row + dr) * 8 + col + dc
+            for dr, dc in offsets
+            if 0 <= row + dr < 8 and 0 <= col + dc < 8
+        )
+    
+    def rays(row: int, col: int, directions) -> Tuple[Tuple[int, ...], ...]:
+        result = []
+        for dr, dc in directions:
+            ray = []
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray.append(r * 8 + c)
+                r, c = r + dr, c + dc
+            result.append(tuple(ray))
+        return tuple(result)
+    
+    def ray_directions(row: int, col: int) -> Tuple[int, ...]:
+        directions = [-1] * 64
+        for direction, ray in enumerate(rays(row, col, QUEEN_DIRECTIONS)):
+            for square in ray:
+                directions[square] = direction
+        return tuple(directions)
+    
+    coords = [(row, col) for row in range(8) for col in range(8)]
+    return {
+        'squares': squares,
+        'knight_targets': tuple(targets(r, c, KNIGHT_OFFSETS) for r, c in coords),
+        'king_targets': tuple(targets(r, c, QUEEN_DIRECTIONS) for r, c in coords),
+        'rook_rays': tuple(rays(r, c, ROOK_DIRECTIONS) for r, c in coords),
+        'bishop_rays': tuple(rays(r, c, BISHOP_DIRECTIONS) for r, c in coords),
+        'queen_rays': tuple(rays(r, c, QUEEN_DIRECTIONS) for r, c in coords),
+        'ray_directions': tuple(ray_directions(r, c) for r, c in coords),
+    }
+
+_tables = chess_boot.snapshot_section('tables', tables_key()) or build_tables()
+
+SQUARES: Tuple[Position, ...] = _tables['squares']
+KNIGHT_TARGETS: Tuple[Tuple[int, ...], ...] = _tables['knight_targets']
+KING_TARGETS: Tuple[Tuple[int, ...], ...] = _tables['king_targets']
+ROOK_RAYS: Tuple[Tuple[Tuple[int, ...], ...], ...] = _tables['rook_rays']
+BISHOP_RAYS: Tuple[Tuple[Tuple[int, ...], ...], ...] = _tables['bishop_rays']
+QUEEN_RAYS: Tuple[Tuple[Tuple[int, ...], ...], ...] = _tables['queen_rays']
+# RAY_DIRECTIONS[a][b]: index of the QUEEN_RAYS[a] ray holding b, -1 if none
+RAY_DIRECTIONS: Tuple[Tuple[int, ...], ...] = _tables['ray_directions']
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""
+Chess UCI Engine
+Universal Chess Interface front-end over ChessGame for headless play
+    
+    python chess_uci.py        (or: python main_chess.py --uci)
+
+Speaks the subset of UCI that tournament and benchmark harnesses use:
+uci, isready, ucinewgame, position (startpos | fen ...) [moves ...],
+go [depth N] [movetime MS] [wtime/btime/winc/binc MS] [infinite] [perft N],
+stop, quit, plus the common extensions 'perft N' and 'd' (show the board).
+
+A 'position' command whose move list extends the previous one only plays
+the new moves, so a harness resending the whole game every turn costs one
+move per turn instead of a replay. 'go' searches on a copy of the game in a
+background thread, leaving stop/isready/quit answerable during the search.
+Input is read line by line from buffered stdin and each command's replies
+are written in one block and flushed once.
+"""
+
+import copy
+import sys
+import threading
+import time
+from typing import Iterator, List, Optional, TextIO, Tuple
+from chess_analysis import MATE_SCORE, MoveOrdering, SearchCancelled, legal_move_list, search
+from chess_game import ChessBoard, Color, Position, PieceType, PAWN_CODE, TYPE_MASK
+from chess_mechanics import ChessGame
+from chess_notation import board_to_fen, game_from_fen, move_to_uci, parse_uci
+
+ENGINE_NAME = "Python Chess"
+ENGINE_AUTHOR = "Python Chess contributors"
+
+DEFAULT_DEPTH = 3
+# Depth limit for searches bounded only by time or 'stop'
+MAX_DEPTH = 64
+# Share of the remaining clock spent on one move when no movetime is given
+CLOCK_FRACTION = 30
+
+PROMOTION_CHOICES = (PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT)
+
+# (from, to, promotion)
+UCIMove = Tuple[Position, Position, Optional[PieceType]]
+
+def legal_uci_moves(board: ChessBoard) -> Iterator[UCIMove]:
+    """Legal moves of the side to move, with one entry per promotion choice"""
+    squares = board.squares
+    for from_index, to_index in legal_move_list(board):
+        from_pos = Position(from_index >> 3, from_index & 7)
+        to_pos = Position(to_index >> 3, to_index & 7)
+        if squares[from_index] & TYPE_MASK == PAWN_CODE and to_pos.row in (0, 7):
+            for promotion in PROMOTION_CHOICES:
+                yield from_pos, to_pos, promotion
+        else:
+            yield from_pos, to_pos, None
+
+def perft(board: ChessBoard, depth: int) -> int:
+    """Number of leaf positions depth plies below the board's position
+    
+    The moves are made and taken back on board itself, which ends up as it
+    started.
+    """
+    if depth <= 0:
+        return 1
+    moves = list(legal_uci_moves(board))
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        board.make_move(*move)
+        total += perft(board, depth - 1)
+        board.undo_move()
+    return total
+
+def _search_move(game: ChessGame, from_index: int, to_index: int) -> str:
+    """UCI text of a search move (the search promotes to a queen)"""
+    from_pos = Position(from_index >> 3, from_index & 7)
+    to_pos = Position(to_index >> 3, to_index & 7)
+    promotion = None
+    if game.board.squares[from_index] & TYPE_MASK == PAWN_CODE and to_pos.row in (0, 7):
+        promotion = PieceType.QUEEN
+    return move_to_uci(from_pos, to_pos, promotion)
+
+def _score_text(score: int, depth: int) -> str:
+    """UCI score: 'cp N', or 'mate N' (in moves, negative when being mated)"""
+    if abs(score) < MATE_SCORE:
+        return f"cp {score}"
+    plies = depth - (abs(score) - MATE_SCORE)
+    moves = (plies + 1) // 2
+    return f"mate {moves if score > 0 else -moves}"
+
+class UCIEngine:
+    """UCI command interpreter around one ChessGame"""
+    def __init__(self, out: TextIO = None, default_depth: int = DEFAULT_DEPTH):
+        self.out = out or sys.stdout
+        self.default_depth = default_depth
+        self.game = ChessGame()
+        # The position command the game was built from: the start position
+        # ('startpos' or a FEN) and the moves played on it
+        self.start = 'startpos'
+        self.moves: List[str] = []
+        self.plies_played = 0
+        self._output_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._search_thread: Optional[threading.Thread] = None
+    
+    def send(self, *lines: str):
+        """Write reply lines as one block and flush once"""
+        with self._output_lock:
+            self.out.write(''.join(line + '\n' for line in lines))
+            self.out.flush()
+    
+    def handle(self, line: str) -> bool:
+        """Run one command line; False after 'quit'"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}", f"id author {ENGINE_AUTHOR}", "uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.stop_search()
+            self.set_position(['startpos'])
+        elif command == 'position':
+            self.stop_search()
+            self.set_position(args)
+        elif command == 'go':
+            self.go(args)
+        elif command == 'perft':
+            self.stop_search()
+            self.divide(int(args[0]) if args else 1)
+        elif command == 'stop':
+            self.stop_search()
+        elif command == 'd':
+            self.send(str(self.game.board), f"Fen: {board_to_fen(self.game.board)}")
+        elif command == 'quit':
+            self.stop_search()
+            return False
+        else:
+            self.send(f"info string unknown command: {command}")
+        return True
+    
+    def set_position(self, args: List[str]):
+        """Handle 'position', playing only the moves not already on the board"""
+        if 'moves' in args:
+            split = args.index('moves')
+            spec, moves = args[:split], args[split + 1:]
+        else:
+            spec, moves = args, []
+        if spec[:1] == ['startpos']:
+            start = 'startpos'
+        elif spec[:1] == ['fen'] and len(spec) > 1:
+            start = ' '.join(spec[1:])
+        else:
+            self.send(f"info string malformed position: {' '.join(args)}")
+            return
+        
+        if start == self.start and moves[:len(self.moves)] == self.moves:
+            new_moves = moves[len(self.moves):]
+        else:
+            try:
+                game = ChessGame() if start == 'startpos' else game_from_fen(start)
+            except ValueError as e:
+                self.send(f"info string {e}")
+                return
+            self.game, self.start, self.moves = game, start, []
+            new_moves = moves
+        
+        for text in new_moves:
+            try:
+                played = self.game.make_move(*parse_uci(text))
+            except ValueError:
+                played = False
+            if not played:
+                self.send(f"info string illegal move: {text}")
+                return
+            self.moves.append(text)
+            self.plies_played += 1
+    
+    def go(self, args: List[str]):
+        """Handle 'go': perft, or a search in the background"""
+        options = {}
+        infinite = 'infinite' in args
+        for name, value in zip(args, args[1:]):
+            if value.lstrip('-').isdigit():
+                options[name] = int(value)
+        if 'perft' in options:
+            self.stop_search()
+            self.divide(options['perft'])
+            return
+        
+        # Time budget: movetime, else a share of the clock of the side to move
+        movetime = options.get('movetime')
+        if movetime is None and not infinite:
+            side = 'w' if self.game.board.current_player == Color.WHITE else 'b'
+            if f'{side}time' in options:
+                movetime = options[f'{side}time'] // CLOCK_FRACTION + options.get(f'{side}inc', 0) // 2
+        depth = options.get('depth') or (MAX_DEPTH if movetime or infinite else self.default_depth)
+        deadline = time.perf_counter() + movetime / 1000 if movetime else None
+        
+        self.stop_search()
+        self._stop.clear()
+        self._search_thread = threading.Thread(
+            target=self._search, args=(copy.deepcopy(self.game), depth, deadline), daemon=True
+        )
+        self._search_thread.start()
+    
+    def stop_search(self):
+        """Stop a running search and wait for its bestmove"""
+        if self._search_thread:
+            self._stop.set()
+            self._search_thread.join()
+            self._search_thread = None
+    
+    def _search(self, game: ChessGame, max_depth: int, deadline: Optional[float]):
+        """Iterative deepening, reporting each depth, then 'bestmove'"""
+        start = time.perf_counter()
+        moves = legal_move_list(game.board)
+        if not moves:
+            self.send("bestmove (none)")
+            return
+        
+        def should_stop() -> bool:
+            return self._stop.is_set() or (deadline is not None and time.perf_counter() >= deadline)
+        
+        best = moves[0]
+        nodes = 0
+        # Shared by the iterations, so each is ordered by what the last learned
+        ordering = MoveOrdering()
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move, depth_nodes = search(game, depth, should_stop, ordering=ordering)
+            except SearchCancelled:
+                break
+            nodes += depth_nodes
+            best = move or best
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            self.send(f"info depth {depth} score {_score_text(score, depth)} nodes {nodes} "
+                      f"time {int(elapsed * 1000)} nps {int(nodes / elapsed)} "
+                      f"pv {_search_move(game, *best)}")
+            if abs(score) >= MATE_SCORE:
+                break
+        self.send(f"bestmove {_search_move(game, *best)}")
+    
+    def divide(self, depth: int):
+        """Handle 'perft': leaf counts per root move, then the total"""
+        start = time.perf_counter()
+        lines = []
+        total = 0
+        board = copy.deepcopy(self.game.board)
+        for move in list(legal_uci_moves(board)):
+            board.make_move(*move)
+            count = perft(board, depth - 1)
+            board.undo_move()
+            lines.append(f"{move_to_uci(*move)}: {count}")
+            total += count
+        elapsed = time.perf_counter() - start
+        self.send(*lines, "", f"Nodes searched: {total}",
+                  f"info string perft {depth} time {int(elapsed * 1000)} ms")
+
+def main(stdin: TextIO = None, stdout: TextIO = None) -> int:
+    """Read UCI commands until 'quit' or end of input"""
+    engine = UCIEngine(stdout)
+    for line in stdin or sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop_search()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
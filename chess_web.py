@@ -1,7 +1,18 @@
 # Chess game web interface for Flask
-from flask import Flask, render_template_string, request, jsonify
+import threading
+from flask import Flask, render_template, request, current_app
+import chess_boot
+from chess_analysis import DEFAULT_DEPTH, hints
 from chess_mechanics import ChessGame
-from chess_game import Position, Color, PieceType
+from chess_game import Position
+from chess_profiler import profiled
+from chess_notation import board_to_fen, game_from_fen
+from chess_serializer import dumps, board_data as serialize_board, board_json, status_payload, attacks_payload
+
+# /api/chess/hints defaults: moves returned, and the plies searched inline
+# (at most DEFAULT_DEPTH, which still answers in about 0.1 s)
+DEFAULT_HINT_COUNT = 5
+DEFAULT_HINT_DEPTH = 2
 
 # Enhanced HTML template for interactive chess game
 CHESS_TEMPLATE = """
@@ -462,46 +473,89 @@ CHESS_TEMPLATE = """
 </html>
 """
 
+def template_key() -> str:
+    """Snapshot key for the compiled page template"""
+    import jinja2
+    return chess_boot.source_key(CHESS_TEMPLATE, jinja2.__version__)
+
+def compile_template(env):
+    """Compile CHESS_TEMPLATE to a code object for a Jinja environment"""
+    return env.compile(CHESS_TEMPLATE)
+
+def load_template(env):
+    """The compiled chess page template, from the snapshot when available"""
+    import marshal
+    code = chess_boot.snapshot_section('chess_template', template_key())
+    if code is None:
+        return env.from_string(CHESS_TEMPLATE)
+    return env.template_class.from_code(env, marshal.loads(code), env.make_globals(None))
+
 def add_chess_routes(app):
     """Add chess game routes to Flask app"""
     
     # Initialize game session (in production, use proper session management)
     chess_game = ChessGame()
     
-    def get_board_data():
+    # Serializes moves and restarts. Readers take chess_game.snapshot instead,
+    # which is immutable, so they never wait on a move in progress.
+    move_lock = threading.Lock()
+    
+    # Compiled once on first render; render_template_string would recompile
+    # the page on every request
+    chess_template = None
+    
+    def render_page(**context):
+        """Render the chess page with the cached compiled template"""
+        nonlocal chess_template
+        if chess_template is None:
+            chess_template = load_template(current_app.jinja_env)
+        return render_template(chess_template, **context)
+    
+    def get_board_data(snapshot):
         """Convert board to 2D array for JavaScript"""
-        board_data = []
-        for row in range(8):
-            board_row = []
-            for col in range(8):
-                piece = chess_game.board.board[row][col]
-                if piece:
-                    # Convert piece to simple character representation
-                    symbols = {
-                        PieceType.PAWN: 'P',
-                        PieceType.ROOK: 'R',
-                        PieceType.KNIGHT: 'N',
-                        PieceType.BISHOP: 'B',
-                        PieceType.QUEEN: 'Q',
-                        PieceType.KING: 'K'
-                    }
-                    symbol = symbols.get(piece.piece_type, '?')
-                    board_row.append(symbol if piece.color == Color.WHITE else symbol.lower())
-                else:
-                    board_row.append(None)
-            board_data.append(board_row)
-        return board_data
+        return serialize_board(snapshot)
+    
+    def get_board_json(snapshot) -> str:
+        """Board as JSON text for embedding in the page template"""
+        return board_json(snapshot.piece_string)
+    
+    def json_response(payload, status: int = 200):
+        """JSON response encoded with the fast serializer"""
+        return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+    
+    def conditional_response(render):
+        """Serve render(snapshot) with an ETag, answering 304 if the client copy is current
+        
+        The ETag is the game's position hash, so render() is skipped entirely
+        when the client already has the current position. Everything comes
+        from one snapshot, so the body always matches the ETag. The game URLs
+        serve a new game after a restart, so clients always revalidate.
+        """
+        snapshot = chess_game.snapshot
+        etag = snapshot.position_hash
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(render(snapshot))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     
     @app.route('/chess')
     def chess_game_page():
         """Chess game web interface"""
+        return conditional_response(render_chess_page)
+    
+    def render_chess_page(snapshot):
+        """Render the chess page for a game snapshot"""
         try:
-            board_data = get_board_data()
-            current_player = chess_game.board.current_player.value.title()
-            game_status = chess_game.get_game_status()
+            board_data = get_board_json(snapshot)
+            current_player = snapshot.current_player.value.title()
+            game_status = snapshot.status
             
-            return render_template_string(
-                CHESS_TEMPLATE,
+            return render_page(
                 board_data=board_data,
                 current_player=current_player,
                 game_status=game_status,
@@ -512,6 +566,7 @@ def add_chess_routes(app):
             return f"Error loading chess game: {e}", 500
     
     @app.route('/chess/move', methods=['POST'])
+    @profiled
     def make_chess_move_ajax():
         """Handle chess moves via AJAX"""
         try:
@@ -520,7 +575,7 @@ def add_chess_routes(app):
             to_pos = data.get('to_pos', '').strip().lower()
             
             if not from_pos or not to_pos:
-                return jsonify({
+                return json_response({
                     'success': False,
                     'message': 'Please provide both from and to positions'
                 })
@@ -530,41 +585,44 @@ def add_chess_routes(app):
                 from_position = Position.from_algebraic(from_pos)
                 to_position = Position.from_algebraic(to_pos)
                 
-                # Make the move
-                if chess_game.make_move(from_position, to_position):
-                    return jsonify({
+                # Make the move, answering from the snapshot it published
+                with move_lock:
+                    moved = chess_game.make_move(from_position, to_position)
+                    snapshot = chess_game.snapshot
+                if moved:
+                    return json_response({
                         'success': True,
                         'message': f'Move {from_pos} to {to_pos} successful!',
-                        'board_data': get_board_data(),
-                        'current_player': chess_game.board.current_player.value.title(),
-                        'game_status': chess_game.get_game_status()
+                        'board_data': get_board_data(snapshot),
+                        'current_player': snapshot.current_player.value.title(),
+                        'game_status': snapshot.status
                     })
                 else:
-                    return jsonify({
+                    return json_response({
                         'success': False,
                         'message': f'Invalid move: {from_pos} to {to_pos}'
                     })
             except Exception as e:
-                return jsonify({
+                return json_response({
                     'success': False,
                     'message': f'Invalid position format: {e}'
                 })
                 
         except Exception as e:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'message': f'Error processing move: {e}'
-            }), 500
+            }, 500)
     
     @app.route('/chess', methods=['POST'])
+    @profiled
     def make_chess_move():
         """Handle chess moves from form submission"""
         try:
-            nonlocal chess_game
-            
             # Check if it's a restart request
             if request.form.get('action') == 'restart':
-                chess_game = ChessGame()
+                with move_lock:
+                    chess_game.reset_game()
                 message = "New game started!"
                 message_type = "success"
             else:
@@ -582,7 +640,9 @@ def add_chess_routes(app):
                         to_position = Position.from_algebraic(to_pos)
                         
                         # Make the move
-                        if chess_game.make_move(from_position, to_position):
+                        with move_lock:
+                            moved = chess_game.make_move(from_position, to_position)
+                        if moved:
                             message = f"Move {from_pos} to {to_pos} successful!"
                             message_type = "success"
                         else:
@@ -593,12 +653,12 @@ def add_chess_routes(app):
                         message_type = "error"
             
             # Render updated board
-            board_data = get_board_data()
-            current_player = chess_game.board.current_player.value.title()
-            game_status = chess_game.get_game_status()
+            snapshot = chess_game.snapshot
+            board_data = get_board_json(snapshot)
+            current_player = snapshot.current_player.value.title()
+            game_status = snapshot.status
             
-            return render_template_string(
-                CHESS_TEMPLATE,
+            return render_page(
                 board_data=board_data,
                 current_player=current_player,
                 game_status=game_status,
@@ -613,11 +673,42 @@ def add_chess_routes(app):
     def chess_api_status():
         """API endpoint for chess game status"""
         try:
-            return jsonify({
-                'current_player': chess_game.board.current_player.value,
-                'game_status': chess_game.get_game_status(),
-                'board': str(chess_game.board),
-                'move_count': len(chess_game.move_history)
-            })
+            return conditional_response(lambda snapshot: json_response(status_payload(snapshot)))
+        except Exception as e:
+            return json_response({'error': str(e)}, 500)
+    
+    @app.route('/api/chess/attacks')
+    def chess_api_attacks():
+        """Per-square attacker and defender counts of both colors, for threat overlays"""
+        try:
+            return conditional_response(lambda snapshot: json_response(attacks_payload(snapshot)))
+        except Exception as e:
+            return json_response({'error': str(e)}, 500)
+    
+    @app.route('/api/chess/hints')
+    @profiled
+    def chess_api_hints():
+        """The k most promising moves of the current position, best first
+        
+        ?k=N limits the moves returned; ?depth=N (0 to DEFAULT_DEPTH) sets
+        the plies searched to pick the best move, 0 for ordering only.
+        """
+        try:
+            count = request.args.get('k', DEFAULT_HINT_COUNT, type=int)
+            depth = request.args.get('depth', DEFAULT_HINT_DEPTH, type=int)
+            if count < 1 or not 0 <= depth <= DEFAULT_DEPTH:
+                return json_response({
+                    'error': f'k must be at least 1 and depth between 0 and {DEFAULT_DEPTH}'
+                }, 400)
+            
+            # Search a game rebuilt from the snapshot, so moves never wait.
+            # Each query builds its own killer and history tables, so the
+            # request threads share nothing the search mutates.
+            snapshot = chess_game.snapshot
+            payload = hints(game_from_fen(board_to_fen(snapshot)), count, depth)
+            payload['position_hash'] = snapshot.position_hash
+            response = json_response(payload)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
         except Exception as e:
-            return jsonify({'error': str(e)}), 500
\ No newline at end of file
+            return json_response({'error': str(e)}, 500)
\ No newline at end of file
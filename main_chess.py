@@ -1,6 +1,6 @@
 """
 Main Chess Game Entry Point
-Choose between GUI and console versions
+Choose between GUI and console versions, or run as a UCI engine with --uci
 """
 
 import sys
@@ -56,4 +56,7 @@ def main():
             print(f"An error occurred: {e}")
 
 if __name__ == "__main__":
+    if '--uci' in sys.argv[1:]:
+        from chess_uci import main as uci_main
+        sys.exit(uci_main())
     main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Chess Tests
+Move generation, notation round trips and the web API's conditional reads
+    
+    python -m pytest -q test_chess.py
+"""
+
+import io
+import pytest
+from chess_mechanics import ChessGame
+from chess_notation import board_to_fen, game_from_fen, parse_san, parse_uci
+from chess_pgn import game_to_pgn, read_games
+from chess_uci import perft
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+KIWIPETE_FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSITION_3_FEN = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+POSITION_4_FEN = "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"
+POSITION_5_FEN = "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8"
+
+# Published leaf counts (chessprogramming.org "Perft Results") by depth
+PERFT_COUNTS = [
+    (START_FEN, [20, 400, 8902]),
+    (KIWIPETE_FEN, [48, 2039, 97862]),
+    (POSITION_3_FEN, [14, 191, 2812, 43238]),
+    (POSITION_4_FEN, [6, 264, 9467]),
+    (POSITION_5_FEN, [44, 1486, 62379]),
+]
+
+# En passant (exd6), an underpromotion capture (cxb8=N) and both castlings
+SPECIAL_MOVES = "e2e4 g8f6 e4e5 d7d5 e5d6 e7e6 d6c7 f8e7 c7b8n a8b8 g1f3 e8g8 f1e2 b7b6 e1g1"
+
+def play_uci(game: ChessGame, moves: str):
+    for text in moves.split():
+        assert game.make_move(*parse_uci(text)), text
+
+def san_moves(game: ChessGame):
+    """The game's moves in SAN, without the move numbers"""
+    return [token for line in game.get_move_history_algebraic()
+            for token in line.split() if not token.endswith('.')]
+
+@pytest.mark.parametrize('fen, counts', PERFT_COUNTS,
+                         ids=['start', 'kiwipete', 'position3', 'position4', 'position5'])
+def test_perft(fen, counts):
+    board = game_from_fen(fen).board
+    for depth, expected in enumerate(counts, 1):
+        assert perft(board, depth) == expected, depth
+    assert board_to_fen(board) == fen
+
+@pytest.mark.parametrize('fen', [fen for fen, _ in PERFT_COUNTS])
+def test_fen_round_trip(fen):
+    assert board_to_fen(game_from_fen(fen).board) == fen
+
+def test_san_round_trip():
+    game = ChessGame()
+    play_uci(game, SPECIAL_MOVES)
+    sans = san_moves(game)
+    assert sans[4] == 'exd6' and sans[8] == 'cxb8=N' and sans[11] == 'O-O'
+    
+    replay = ChessGame()
+    for san in sans:
+        assert replay.make_move(*parse_san(replay.board, san)), san
+    assert board_to_fen(replay.board) == board_to_fen(game.board)
+    assert san_moves(replay) == sans
+
+def test_fen_round_trip_after_special_moves():
+    game = ChessGame()
+    play_uci(game, SPECIAL_MOVES)
+    fen = board_to_fen(game.board)
+    assert fen == "1rbq1rk1/p3bppp/1p2pn2/8/8/5N2/PPPPBPPP/RNBQ1RK1 b - - 1 8"
+    assert board_to_fen(game_from_fen(fen).board) == fen
+
+def test_pgn_round_trip_from_fen():
+    fen = KIWIPETE_FEN.replace(' w ', ' b ').replace(' 0 1', ' 3 12')
+    text = f'[Event "Set up"]\n[SetUp "1"]\n[FEN "{fen}"]\n\n12... O-O-O 13. O-O Qc5 14. d6 *\n'
+    pgn_game, = read_games(io.StringIO(text))
+    game = pgn_game.replay()
+    final_fen = "2kr3r/p1pp1pb1/bn1Ppnp1/2q1N3/1p2P3/2N2Q1p/PPPBBPPP/R4RK1 b - - 0 14"
+    assert board_to_fen(game.board) == final_fen
+    
+    written = game_to_pgn(game, pgn_game.headers)
+    assert f'[FEN "{fen}"]' in written
+    assert '12... O-O-O 13. O-O Qc5 14. d6 *' in written
+    again, = read_games(io.StringIO(written))
+    assert again.moves == pgn_game.moves
+    assert board_to_fen(again.replay().board) == final_fen
+
+@pytest.fixture
+def client():
+    from app import app
+    client = app.test_client()
+    client.post('/chess', data={'action': 'restart'})
+    yield client
+    client.post('/chess', data={'action': 'restart'})
+
+def test_status_etag(client):
+    response = client.get('/api/chess/status')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    
+    for if_none_match in (etag, 'W/' + etag, '"other", ' + etag):
+        cached = client.get('/api/chess/status', headers={'If-None-Match': if_none_match})
+        assert cached.status_code == 304, if_none_match
+        assert cached.headers['ETag'] == etag
+        assert not cached.get_data()
+    
+    assert client.post('/chess/move', json={'from_pos': 'e2', 'to_pos': 'e4'}).get_json()['success']
+    changed = client.get('/api/chess/status', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['current_player'] == 'black'
\ No newline at end of file